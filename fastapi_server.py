@@ -1,35 +1,63 @@
 import os
+import re
+import json
 import uuid
 import shutil
+import time
 from pathlib import Path
 from datetime import datetime  # Add this import
-from bs4 import BeautifulSoup
-import requests
 from pydantic import BaseModel
 
 from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Query, Request
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
+import asyncio
 import uvicorn
 from typing import Optional,List,Dict, Any
 from fastapi import Body
+from contextlib import asynccontextmanager
 
-# Import the service functions
-from python.llm import generate  # LLM service
-from python.imageGraphics.bgRemover import remove_background
-from python.imageGraphics.barcodeGenerator import generate_barcode  # Barcode generator service
-from python.textValidators.markdown_editor import validate_markdown, fix_markdown, markdown_to_html  # Markdown services
-from python.imageGraphics.qrGenerator import generate_qr  # QR code generator service
-from python.imageGraphics.imageGenerator import generate_image  # QR code generator service
-from python.textValidators.yaml_validator import validate_yaml, get_yaml_error, format_yaml  # YAML validator service
-from python.textValidators.json_validator import validate_json, get_json_error, format_json  # JSON validator service
-from python.textValidators.xml_validator import validate_xml, get_xml_error, format_xml   # JSON validator service
-from python.pdfs.pdfMerge import merge_pdfs  # PDF merger service
-from python.imageGraphics.colorPicker import hex_to_rgb, rgb_to_hex, generate_shades_and_tints
-from python.restApiClient import send_request  # REST API client service
-from python.UserFeedback import load_requests, save_request
-from python.imageGraphics.imageConvertor import convert_image  # Image conversion service
-from python.randomGenerator import (
+# Service functions are loaded lazily: each tool module (and its heavy
+# dependencies) is imported the first time its endpoint is hit, or at startup
+# when listed in UTILIX_WARMUP_MODULES
+from python.lazy_loader import lazy, warm_up, import_report, WARMUP_MODULES
+# LLM services (AI tool finder, web preview) behind the LLM response cache
+generate_recommendation, stream_recommendation = lazy("python.llm", "generate_cached", "stream_async")
+generate_web_preview, stream_web_preview = lazy("python.llm1", "generate_cached", "stream_async")
+remove_background, model_status = lazy("python.imageGraphics.bgRemover", "remove_background", "model_status")
+generate_barcode = lazy("python.imageGraphics.barcodeGenerator", "generate_barcode")  # Barcode generator service
+validate_markdown, fix_markdown, markdown_to_html = lazy(
+    "python.textValidators.markdown_editor", "validate_markdown", "fix_markdown", "markdown_to_html"
+)  # Markdown services
+generate_qr = lazy("python.imageGraphics.qrGenerator", "generate_qr")  # QR code generator service
+generate_image = lazy("python.imageGraphics.imageGenerator", "generate_image")  # Image generator service
+validate_yaml, get_yaml_error, format_yaml = lazy(
+    "python.textValidators.yaml_validator", "validate_yaml", "get_yaml_error", "format_yaml"
+)  # YAML validator service
+validate_json, get_json_error, format_json = lazy(
+    "python.textValidators.json_validator", "validate_json", "get_json_error", "format_json"
+)  # JSON validator service
+validate_xml, get_xml_error, format_xml = lazy(
+    "python.textValidators.xml_validator", "validate_xml", "get_xml_error", "format_xml"
+)  # XML validator service
+merge_pdfs = lazy("python.pdfs.pdfMerge", "merge_pdfs")  # PDF merger service
+compress_pdf = lazy("python.pdf_compress", "compress_pdf")  # PDF compression service
+compress_jpg = lazy("python.jpg_compress", "compress_jpg")  # JPEG compression service
+compress_png = lazy("python.png_compress", "compress_png")  # PNG compression service
+hex_to_rgb, rgb_to_hex, generate_shades_and_tints = lazy(
+    "python.imageGraphics.colorPicker", "hex_to_rgb", "rgb_to_hex", "generate_shades_and_tints"
+)
+send_request = lazy("python.restApiClient", "send_request")  # REST API client service
+load_requests, save_request = lazy("python.UserFeedback", "load_requests", "save_request")
+convert_image, convert_variants, iter_zip_images, output_name = lazy(
+    "python.imageGraphics.imageConvertor", "convert_image", "convert_variants", "iter_zip_images", "output_name"
+)  # Image conversion service
+ZipStream = lazy("python.imageGraphics.imageBuffers", "ZipStream")  # Incrementally streamed ZIP archives
+pixel_budget_error, ImageTooLarge = lazy(
+    "python.imageGraphics.imageBuffers", "pixel_budget_error", "ImageTooLarge"
+)  # Pixel budget checks from image headers
+(
     random_color,
     random_number,
     random_float,
@@ -38,13 +66,33 @@ from python.randomGenerator import (
     random_sentence,
     random_emoji,
     random_password,
+) = lazy(
+    "python.randomGenerator",
+    "random_color", "random_number", "random_float", "random_name",
+    "random_word", "random_sentence", "random_emoji", "random_password",
 )
-from python.palette_service import (
+(
     generate_random_palette,
     generate_harmony_palette,
     generate_ai_palette,
     create_gradient_css
+) = lazy(
+    "python.palette_service",
+    "generate_random_palette", "generate_harmony_palette", "generate_ai_palette", "create_gradient_css",
 )
+generate_uuid = lazy("python.randomUUID", "generate_uuid")
+ip_lookup, dns_lookup, ping_host = lazy("python.network", "ip_lookup", "dns_lookup", "ping_host")
+format_code = lazy("python.codeFormatter", "format_code")
+from python.executor import (run_cpu, run_cpu_timed, run_io, run_model, model_pool_busy, shutdown_pools,  # Process/thread pools for blocking work
+                             CPU_WORKERS, MODEL_WORKERS, MODEL_WARMUP)
+from python.result_cache import result_cache, make_key  # Cache for deterministic generators
+from python.artifact_store import artifact_store, RESULTS_TTL, UPLOADS_TTL  # TTL/quota storage manager
+from python.metrics import registry as metrics_registry, MetricsMiddleware  # Prometheus metrics
+from python.jobs import job_manager, job_view, JOB_TTL, FINISHED, SUCCEEDED  # Background jobs
+from python.concurrency import ConcurrencyLimiter, ConcurrencyMiddleware  # Per-route limits
+from python.json_stream import JsonItemStream, parse_json_response  # Parsing of LLM JSON output
+from python.llm_cache import llm_cache  # Cache + request coalescing for LLM answers
+from python.tool_index import tool_index  # Local BM25 search over the AI tool catalog
 BASE_DIR = Path(os.getcwd())
 UPLOAD_DIR = BASE_DIR / "public" / "uploads"
 OUTPUT_DIR = BASE_DIR / "public" / "results"
@@ -53,7 +101,109 @@ OUTPUT_DIR = BASE_DIR / "public" / "results"
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-app = FastAPI(title="Innovatrix Services API")
+# Expire and cap everything written to the public directories
+artifact_store.add_root(OUTPUT_DIR, RESULTS_TTL)
+artifact_store.add_root(UPLOAD_DIR, UPLOADS_TTL)
+
+# Long-running tools that can also be submitted as background jobs
+job_manager.register_kind("remove-background", remove_background, pool="model", media_type="image/png")
+job_manager.register_kind("compress-pdf", compress_pdf, pool="cpu", media_type="application/pdf")
+job_manager.register_kind("pdf-merger", merge_pdfs, pool="cpu", media_type="application/pdf")
+job_manager.register_kind("generate-image", generate_image, pool="io", media_type="image/png")
+
+# Readiness of the model worker, reported by /health: "warming" until the
+# worker has run its warm-up hooks, then "ready" or "failed"
+model_health: Dict[str, Any] = {"state": "warming" if MODEL_WARMUP else "ready",
+                                "error": None, "ready_seconds": None, "worker": None}
+
+async def refresh_model_health() -> Dict[str, Any]:
+    """Ask the model worker for its state; the first call waits for its warm-up."""
+    try:
+        status = await run_model(model_status)
+    except Exception as e:
+        model_health.update(state="failed", error=str(e))
+        return model_health
+    model_health.update(state="failed" if status["error"] else "ready", error=status["error"], worker=status)
+    return model_health
+
+async def warm_model() -> None:
+    """Start the model worker and record when its model is loaded."""
+    start = time.perf_counter()
+    await refresh_model_health()
+    model_health["ready_seconds"] = round(time.perf_counter() - start, 3)
+    print(f"Model worker {model_health['state']} after {model_health['ready_seconds']:.2f}s"
+          + (f": {model_health['error']}" if model_health["error"] else ""))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Import the configured tool modules before serving, then report timings
+    await run_io(warm_up, WARMUP_MODULES)
+    await run_io(tool_index.load)
+    for entry in import_report():
+        print(f"Imported {entry['module']} in {entry['seconds'] * 1000:.1f} ms")
+    sweeper = asyncio.create_task(artifact_store.run_sweeper())
+    await job_manager.start()
+    llm_cache_flusher = asyncio.create_task(llm_cache.run_flusher())
+    # Load the model in its worker while already serving; /health/ready says when it is done
+    model_warmer = asyncio.create_task(warm_model()) if MODEL_WARMUP else None
+    yield
+    if model_warmer is not None:
+        model_warmer.cancel()
+    llm_cache_flusher.cancel()
+    await run_io(llm_cache.save)
+    await job_manager.stop()
+    sweeper.cancel()
+    # Stop the worker pools so uvicorn exits cleanly
+    shutdown_pools()
+
+app = FastAPI(title="Innovatrix Services API", lifespan=lifespan)
+
+# Concurrency class of each route (see python/concurrency.py); routes not
+# listed, such as the monitoring endpoints and job event streams, are never
+# limited. Override with UTILIX_CONCURRENCY_ROUTES.
+ROUTE_CONCURRENCY = {
+    "/generate2": "llm",
+    "/generate2/stream": "llm",
+    "/web-preview": "llm",
+    "/web-preview/stream": "llm",
+    "/ColorPaletteGenerator": "llm",
+    "/generate-image/": "llm",
+    "/remove-background": "model-inference",
+    "/convert-image": "cpu-heavy",
+    "/convert-images": "cpu-heavy",
+    "/convert-image/variants": "cpu-heavy",
+    "/compress-jpg": "cpu-heavy",
+    "/compress-png": "cpu-heavy",
+    "/compress-pdf": "cpu-heavy",
+    "/barcode-generator": "cpu-heavy",
+    "/qr-generator": "cpu-heavy",
+    "/markdown-validator": "cpu-heavy",
+    "/json-validator": "cpu-heavy",
+    "/xml-validator": "cpu-heavy",
+    "/yaml-validator": "cpu-heavy",
+    "/pdf-merger": "cpu-heavy",
+    "/format-code": "cpu-heavy",
+    "/api-client": "outbound-network",
+    "/network-tool": "outbound-network",
+    "/web-scraper": "outbound-network",
+    "/color-picker/": "trivial",
+    "/user-feedback/submit": "trivial",
+    "/user-feedback/view": "trivial",
+    "/random-generator": "trivial",
+    "/random-uuid": "trivial",
+    "/tool-index/search": "trivial",
+    "/jobs/remove-background": "trivial",
+    "/jobs/compress-pdf": "trivial",
+    "/jobs/pdf-merger": "trivial",
+    "/jobs/generate-image": "trivial",
+    "/jobs/{job_id}": "trivial",
+    "/jobs/{job_id}/result": "trivial",
+}
+concurrency_limiter = ConcurrencyLimiter(ROUTE_CONCURRENCY)
+metrics_registry.register_gauge_source(concurrency_limiter.gauges)
+
+# Innermost, so requests shed with 503 still get CORS headers and metrics
+app.add_middleware(ConcurrencyMiddleware, limiter=concurrency_limiter)
 
 # Add CORS middleware
 app.add_middleware(
@@ -62,7 +212,185 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "X-Original-Size", "X-Compressed-Size", "X-Size-Reduction", "X-Encode-Time-Ms",
+                    "X-Image-Format", "X-Format-Candidates", "Server-Timing", "X-SSIM", "X-PSNR",
+                    "X-Metrics-Time-Ms", "X-Metrics-Pages"],
 )
+# Outermost, so it also times CORS handling and sees every response
+app.add_middleware(MetricsMiddleware)
+def image_response(content: bytes, filename: str, media_type: str = "image/png",
+                   headers: Optional[Dict[str, str]] = None) -> Response:
+    """Send an encoded image from memory as a downloadable attachment."""
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', **(headers or {})}
+    )
+
+def metrics_headers(metrics: Optional[Dict[str, Any]], encode_seconds: Optional[float] = None) -> Dict[str, str]:
+    """
+    SSIM/PSNR of the metrics option as X-SSIM, X-PSNR and X-Metrics-Time-Ms
+    (X-Metrics-Pages for PDFs), and as Server-Timing next to the encode time.
+    """
+    if not metrics:
+        return {}
+    timings = [f"encode;dur={encode_seconds * 1000:.1f}"] if encode_seconds is not None else []
+    timings.append(f'metrics;dur={metrics["metrics_ms"]};desc="SSIM {metrics["ssim"]}, PSNR {metrics["psnr"]} dB"')
+    headers = {
+        "X-SSIM": str(metrics["ssim"]),
+        "X-PSNR": str(metrics["psnr"]),
+        "X-Metrics-Time-Ms": str(metrics["metrics_ms"]),
+        "Server-Timing": ", ".join(timings),
+    }
+    if "pages" in metrics:
+        headers["X-Metrics-Pages"] = ",".join(str(page) for page in metrics["pages"])
+    return headers
+
+async def cached_bytes(namespace: str, params: Dict[str, Any], compute, *blobs: Optional[bytes]) -> Optional[bytes]:
+    """Return a cached encoded result, running compute() only on a cache miss."""
+    return await result_cache.get_or_compute(make_key(namespace, params, *blobs), compute)
+
+async def cached_json(namespace: str, params: Dict[str, Any], compute) -> Any:
+    """Like cached_bytes, for JSON-serializable results."""
+    async def compute_encoded():
+        return json.dumps(await compute()).encode("utf-8")
+    return json.loads(await cached_bytes(namespace, params, compute_encoded))
+
+def job_response(job: Dict[str, Any], status_code: int = 200) -> JSONResponse:
+    """Public job state plus the URLs to poll, stream and download it."""
+    view = job_view(job)
+    view["links"] = {
+        "status": f"/jobs/{job['id']}",
+        "events": f"/jobs/{job['id']}/events",
+        "result": f"/jobs/{job['id']}/result",
+    }
+    return JSONResponse(view, status_code=status_code)
+
+def job_workspace(job_id: str):
+    """Create and track the upload and output directories of a job."""
+    upload_dir = UPLOAD_DIR / f"job-{job_id}"
+    output_dir = OUTPUT_DIR / f"job-{job_id}"
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    # Inputs must outlive the time the job may wait in the queue
+    artifact_store.register(upload_dir, ttl=JOB_TTL)
+    artifact_store.register(output_dir, ttl=JOB_TTL)
+    return upload_dir, output_dir
+
+def save_upload(file: UploadFile, directory: Path) -> str:
+    """Write an uploaded file into directory and return its path."""
+    file_path = directory / os.path.basename(file.filename)
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
+    return str(file_path)
+
+def sse_event(name: str, data: Any) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+async def llm_event_stream(pieces):
+    """
+    Relay streamed LLM text as Server-Sent Events.
+
+    "chunk" events forward the raw text as it arrives, "item" events carry
+    each array element object as soon as it closes, and a final "result"
+    (or "error") event carries the whole parsed response.
+    """
+    parser = JsonItemStream()
+    try:
+        async for piece in pieces:
+            yield sse_event("chunk", {"text": piece})
+            for item in parser.feed(piece):
+                yield sse_event("item", item)
+        yield sse_event("result", parser.result())
+    except Exception as e:
+        yield sse_event("error", {"detail": str(e)})
+
+def llm_streaming_response(pieces) -> StreamingResponse:
+    return StreamingResponse(
+        llm_event_stream(pieces),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def compression_response(original: bytes, compressed: bytes, seconds: float, filename: str, media_type: str,
+                         metrics: Optional[Dict[str, Any]] = None) -> Response:
+    """
+    A compressed file with its before/after sizes and encode time as headers,
+    plus its quality metrics if measured (see metrics_headers). If
+    compression made the file larger (e.g. a text-only PDF rendered to
+    images), the original is returned unchanged, without metrics.
+    """
+    if len(compressed) >= len(original):
+        compressed = original
+        metrics = None
+    if metrics:
+        # run_cpu_timed timed the encode and the measurement together
+        seconds = max(seconds - metrics["metrics_ms"] / 1000, 0.0)
+    reduction = (1 - len(compressed) / len(original)) * 100 if original else 0.0
+    return Response(
+        content=compressed,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Original-Size": str(len(original)),
+            "X-Compressed-Size": str(len(compressed)),
+            "X-Size-Reduction": f"{reduction:.1f}%",
+            "X-Encode-Time-Ms": f"{seconds * 1000:.1f}",
+            **metrics_headers(metrics, seconds),
+        }
+    )
+
+async def reject_oversized_image(data: Any, whole: bool = False) -> None:
+    """
+    413 if the image header reports more pixels than UTILIX_MAX_IMAGE_PIXELS
+    (or, for tools that decode the whole image, than Pillow's decompression
+    bomb limit), before the upload is queued for decoding.
+    """
+    problem = await run_io(pixel_budget_error, data, whole=whole)
+    if problem:
+        raise HTTPException(status_code=413, detail=problem)
+
+def image_error_status(e: Exception) -> int:
+    """413 for images over the pixel or memory budget, 400 for other invalid input."""
+    return 413 if isinstance(e, ImageTooLarge.resolve()) else 400
+
+def auto_format_response(content: bytes, report: Dict[str, Any], base_name: str) -> Response:
+    """The winner of an auto-format race, with every candidate's size, SSIM and timings as headers."""
+    fmt = report["format"].lower()
+    timings = ", ".join(
+        f'{c["name"]};dur={c["encode_ms"] + c["score_ms"]:.1f};desc="{c["bytes"]} bytes, SSIM {c["ssim"]}"'
+        for c in report["candidates"]
+    )
+    measured = metrics_headers(report.get("metrics"))
+    if measured:
+        timings = f'{timings}, {measured.pop("Server-Timing")}'
+    return Response(
+        content=content,
+        media_type=f"image/{fmt}",
+        headers={
+            "Content-Disposition": f'attachment; filename="{base_name}.{fmt}"',
+            "X-Image-Format": report["format"],
+            "X-Format-Candidates": json.dumps(report["candidates"], separators=(",", ":")),
+            **measured,
+            "Server-Timing": timings,
+        }
+    )
+
+def catalog_recommendation(tool: Dict[str, Any]) -> Dict[str, Any]:
+    """A local tool index match in the shape of an LLM recommendation."""
+    return {
+        "name": tool["name"],
+        "url": tool["url"],
+        "description": tool["description"],
+        "category": tool.get("category"),
+        "source": "catalog",
+    }
+
+async def catalog_pieces(recommendation: Dict[str, Any]):
+    """Stream a local match through llm_event_stream like a one-chunk LLM answer."""
+    yield json.dumps(recommendation)
+
 def save_binary_file(file_name, data):
     try:
         with open(file_name, "wb") as f:
@@ -77,22 +405,35 @@ async def generate_tool_recommendation(request: Dict[str, Any] = Body(...)):
     if not query:
         raise HTTPException(status_code=400, detail="Missing 'query' in request body.")
 
-    try:
-        # Call the generate function with the user query
-        response_text = generate(query)
+    # Answer from the local tool catalog when it has a confident match
+    match = tool_index.best_match(query, request.get("category"))
+    if match is not None:
+        return catalog_recommendation(match)
 
-        # Parse the response text into JSON if it's in JSON format
-        if response_text.startswith("```json") and response_text.endswith("```"):
-            response_text = response_text.strip("```json").strip("```")
+    try:
+        # Call the generate function with the user query (cached, coalesced)
         try:
-            response_json = eval(response_text)  # Use json.loads if safer input is ensured
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Invalid JSON response: {str(e)}")
+            response_text = await generate_recommendation(query)
+            # Parse the response as JSON (code fences are skipped)
+            response_json = parse_json_response(response_text)
+        except ValueError as e:
+            raise HTTPException(status_code=500, detail=str(e))
 
         return response_json
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating recommendation: {str(e)}")
-from python.llm1 import generate  # Import the generate function from llm1.py
+@app.post("/generate2/stream")
+async def generate_tool_recommendation_stream(request: Dict[str, Any] = Body(...)):
+    """
+    Streaming /generate2: Server-Sent Events with each recommendation as it completes.
+    """
+    query = request.get("query")
+    if not query:
+        raise HTTPException(status_code=400, detail="Missing 'query' in request body.")
+    match = tool_index.best_match(query, request.get("category"))
+    if match is not None:
+        return llm_streaming_response(catalog_pieces(catalog_recommendation(match)))
+    return llm_streaming_response(stream_recommendation(query))
 
 @app.post("/web-preview")
 async def web_preview_endpoint(request: Dict[str, Any] = Body(...)):
@@ -101,21 +442,28 @@ async def web_preview_endpoint(request: Dict[str, Any] = Body(...)):
         raise HTTPException(status_code=400, detail="Missing 'query' in request body.")
 
     try:
-        # Call the generate function with the user query
-        response_text = generate(query)
-
-        # Parse the response text into JSON if it's in JSON format
-        if response_text.startswith("```json") and response_text.endswith("```"):
-            response_text = response_text.strip("```json").strip("```")
+        # Call the generate function with the user query (cached, coalesced)
         try:
-            response_json = eval(response_text)  # Use json.loads if safer input is ensured
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Invalid JSON response: {str(e)}")
+            response_text = await generate_web_preview(query)
+            # Parse the response as JSON (code fences are skipped)
+            response_json = parse_json_response(response_text)
+        except ValueError as e:
+            raise HTTPException(status_code=500, detail=str(e))
 
         return response_json
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating web preview: {str(e)}")
     
+@app.post("/web-preview/stream")
+async def web_preview_stream_endpoint(request: Dict[str, Any] = Body(...)):
+    """
+    Streaming /web-preview: Server-Sent Events ending with the parsed preview.
+    """
+    query = request.get("query")
+    if not query:
+        raise HTTPException(status_code=400, detail="Missing 'query' in request body.")
+    return llm_streaming_response(stream_web_preview(query))
+
 @app.post("/ColorPaletteGenerator")
 async def color_palette_generator_endpoint(request: Dict[str, Any] = Body(...)):
     try:
@@ -132,10 +480,10 @@ async def color_palette_generator_endpoint(request: Dict[str, Any] = Body(...)):
         
         # Method 2: Harmony-based palette from base color
         elif base_color and harmony_type:
-            colors = generate_harmony_palette(
-                base_color, 
-                harmony_type,
-                count
+            colors = await cached_json(
+                "harmony-palette",
+                {"baseColor": base_color.lower(), "harmonyType": harmony_type, "count": count},
+                lambda: run_cpu(generate_harmony_palette, base_color, harmony_type, count)
             )
             gradient_css = create_gradient_css(colors)
             return {"palette": colors, "gradientCss": gradient_css}
@@ -161,26 +509,45 @@ async def convert_image_endpoint(
     file: UploadFile = File(...),
     format: str = Form(...),
     quality: Optional[int] = Form(95),
-    resize: Optional[float] = Form(None)
+    resize: Optional[float] = Form(None),
+    target_bytes: Optional[int] = Form(None),
+    min_ssim: Optional[float] = Form(None),
+    metrics: bool = Form(False)
 ):
+    """
+    Convert one image. With target_bytes (JPEG/WebP only), quality is
+    searched up to `quality` and the image downscaled if needed so the
+    output is no larger than target_bytes.
+
+    format=auto encodes WebP, JPEG, PNG and quantized PNG concurrently and
+    returns the smallest whose SSIM against the original is at least
+    min_ssim (default UTILIX_AUTO_MIN_SSIM). The chosen format is in
+    X-Image-Format, and every candidate's size, SSIM and timings are in
+    X-Format-Candidates (JSON) and Server-Timing.
+
+    Images over the pixel budget get a 413 from their header alone. PNG and
+    TIFF inputs too large to decode within the memory limit can still be
+    downscaled (resize below 100), which is done in strips.
+
+    metrics adds the output's SSIM and PSNR against the (resized) source as
+    X-SSIM, X-PSNR and Server-Timing (not measured for animations).
+    """
+    if target_bytes is not None:
+        if format.upper() not in ('JPEG', 'JPG', 'WEBP'):
+            raise HTTPException(status_code=400, detail="target_bytes is supported for JPEG and WEBP output only")
+        if target_bytes < 100:
+            raise HTTPException(status_code=400, detail="target_bytes must be at least 100")
+    if min_ssim is not None and not 0 < min_ssim <= 1:
+        raise HTTPException(status_code=400, detail="min_ssim must be between 0 and 1")
+
     # Validate file type
     supported_formats = ['.png', '.jpg', '.jpeg', '.webp', '.gif', '.bmp', '.tiff', '.ico']
     if not any(file.filename.lower().endswith(ext) for ext in supported_formats):
         raise HTTPException(status_code=400, detail=f"Invalid file type. Supported formats: {', '.join(supported_formats)}")
     
-    # Create a unique filename for the uploaded file
-    unique_id = str(uuid.uuid4())
-    file_ext = file.filename.split('.')[-1]
-    input_filename = f"{unique_id}.{file_ext}"
-    input_path = UPLOAD_DIR / input_filename
-
-    # Save the uploaded file to disk
-    with open(input_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    # Define the output filename and path
-    output_filename = f"{unique_id}.{format.lower()}"
-    output_path = OUTPUT_DIR / output_filename
+    # Read the upload into memory; nothing is written to UPLOAD_DIR
+    input_data = await file.read()
+    await reject_oversized_image(input_data)
 
     # Process quality (make sure it's within valid range)
     quality_value = min(max(quality, 1), 100) if quality is not None else 95
@@ -189,60 +556,287 @@ async def convert_image_endpoint(
     resize_value = float(resize) if resize is not None else None
     
     # Call the convert_image function
-    result = convert_image(
-        input_path=str(input_path),
-        output_path=str(output_path),
-        output_format=format.upper(),
-        quality=quality_value,
-        resize=resize_value
-    )
+    try:
+        result = await run_cpu(
+            convert_image,
+            input_data,
+            output_format=format.upper(),
+            quality=quality_value,
+            resize=resize_value,
+            as_bytes=True,
+            target_bytes=target_bytes,
+            min_ssim=min_ssim,
+            metrics=metrics
+        )
+    except ValueError as e:
+        # Too large to decode within the memory limit without a strip-mode downscale
+        raise HTTPException(status_code=image_error_status(e), detail=str(e))
     
     if result is None:
-        # Clean up the input file
-        try:
-            os.remove(input_path)
-        except Exception:
-            pass
         raise HTTPException(status_code=500, detail="Image conversion failed")
 
-    # Clean up the input file after processing
-    try:
-        os.remove(input_path)
-    except Exception:
-        pass
+    if format.upper() == "AUTO":
+        return auto_format_response(*result, base_name=os.path.splitext(file.filename)[0])
 
-    # Return the resulting file as a response
-    return FileResponse(
-        path=str(output_path), 
+    measured = None
+    if metrics:
+        result, measured = result
+
+    # Return the encoded image straight from memory
+    return image_response(
+        result,
         filename=f"{os.path.splitext(file.filename)[0]}.{format.lower()}",
-        media_type=f"image/{format.lower()}"
+        media_type=f"image/{format.lower()}",
+        headers=metrics_headers(measured)
     )
+@app.post("/convert-image/variants")
+async def convert_image_variants_endpoint(
+    file: UploadFile = File(...),
+    targets: Optional[str] = Form(None),
+    favicon: bool = Form(False),
+    metrics: bool = Form(False)
+):
+    """
+    Responsive variants of one image from a single upload and decode.
+
+    targets is a JSON list of {"width", "format", "quality"} objects (or
+    [width, format, quality] lists); by default 320/640/1280/2048 px wide WebP
+    and JPEG. favicon adds favicon.ico (16/32/48) and 180/192/512 px PNG icons.
+    Returns a ZIP of the variants with a manifest.json describing each one;
+    metrics adds each variant's SSIM and PSNR to its manifest entry.
+    """
+    supported_formats = ['.png', '.jpg', '.jpeg', '.webp', '.gif', '.bmp', '.tiff', '.ico']
+    if not any(file.filename.lower().endswith(ext) for ext in supported_formats):
+        raise HTTPException(status_code=400, detail=f"Invalid file type. Supported formats: {', '.join(supported_formats)}")
+
+    target_list = None
+    if targets:
+        try:
+            target_list = json.loads(targets)
+        except json.JSONDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"targets is not valid JSON: {e}")
+        if not isinstance(target_list, list) or len(target_list) > 32:
+            raise HTTPException(status_code=400, detail="targets must be a list of at most 32 targets")
+
+    input_data = await file.read()
+    await reject_oversized_image(input_data)
+    base_name = os.path.splitext(os.path.basename(file.filename))[0]
+    try:
+        manifest, files = await run_cpu(convert_variants, input_data, target_list, favicon, base_name,
+                                        metrics=metrics)
+    except ValueError as e:
+        raise HTTPException(status_code=image_error_status(e), detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Image conversion failed: {e}")
+
+    archive = ZipStream()
+    chunks = [archive.add(entry["name"], files[entry["name"]]) for entry in manifest]
+    chunks.append(archive.add("manifest.json", json.dumps({"source": file.filename, "variants": manifest}, indent=2)))
+    chunks.append(archive.close())
+    return Response(
+        content=b"".join(chunks),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{base_name}_variants.zip"'}
+    )
+
+@app.post("/compress-jpg")
+async def compress_jpg_endpoint(
+    file: UploadFile = File(...),
+    quality: int = Form(60),
+    resize_factor: float = Form(1.0),
+    target_bytes: Optional[int] = Form(None),
+    metrics: bool = Form(False)
+):
+    """
+    Compress a JPEG in memory. With target_bytes, quality is searched up to
+    `quality` (and the image downscaled if needed) to fit that size. metrics
+    reports the output's SSIM and PSNR (see metrics_headers).
+    """
+    if not file.filename.lower().endswith(('.jpg', '.jpeg')):
+        raise HTTPException(status_code=400, detail="Invalid file type. Supported formats: .jpg, .jpeg")
+    if not 0 < resize_factor <= 1:
+        raise HTTPException(status_code=400, detail="resize_factor must be between 0 and 1")
+    if target_bytes is not None and target_bytes < 100:
+        raise HTTPException(status_code=400, detail="target_bytes must be at least 100")
+
+    input_data = await file.read()
+    await reject_oversized_image(input_data)
+    try:
+        result, seconds = await run_cpu_timed(
+            compress_jpg, input_data, quality=min(max(quality, 1), 95), resize_factor=resize_factor,
+            target_bytes=target_bytes, as_bytes=True, metrics=metrics
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=image_error_status(e), detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"JPEG compression failed: {e}")
+    result, measured = result if metrics else (result, None)
+    return compression_response(input_data, result, seconds, f"compressed_{os.path.basename(file.filename)}",
+                                "image/jpeg", measured)
+
+@app.post("/compress-png")
+async def compress_png_endpoint(
+    file: UploadFile = File(...),
+    resize_factor: float = Form(1.0),
+    quantize: bool = Form(True),
+    colors: int = Form(256),
+    dither: bool = Form(True),
+    method: str = Form("auto"),
+    metrics: bool = Form(False)
+):
+    """
+    Compress a PNG in memory. quantize (default on) converts it to a palette
+    of at most `colors` colors (method: auto, mediancut, octree,
+    libimagequant), with optional dithering; turn it off for lossless
+    optimization only. metrics reports the output's SSIM and PSNR (see
+    metrics_headers).
+    """
+    if not file.filename.lower().endswith('.png'):
+        raise HTTPException(status_code=400, detail="Invalid file type. Supported formats: .png")
+    if not 0 < resize_factor <= 1:
+        raise HTTPException(status_code=400, detail="resize_factor must be between 0 and 1")
+    if not 2 <= colors <= 256:
+        raise HTTPException(status_code=400, detail="colors must be between 2 and 256")
+
+    input_data = await file.read()
+    await reject_oversized_image(input_data)
+    try:
+        result, seconds = await run_cpu_timed(
+            compress_png, input_data, resize_factor=resize_factor, quantize=quantize,
+            colors=colors, dither=dither, method=method.lower(), as_bytes=True, metrics=metrics
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=image_error_status(e), detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"PNG compression failed: {e}")
+    result, measured = result if metrics else (result, None)
+    return compression_response(input_data, result, seconds, f"compressed_{os.path.basename(file.filename)}",
+                                "image/png", measured)
+
+@app.post("/compress-pdf")
+async def compress_pdf_endpoint(file: UploadFile = File(...), zoom: float = Form(0.5), metrics: bool = Form(False)):
+    """
+    Compress a PDF in memory by re-rendering its pages at `zoom` scale. For
+    large documents, /jobs/compress-pdf runs the same work in the background
+    with progress events. metrics compares up to five pages, rendered at
+    72 dpi, with the original and reports the worst (see metrics_headers).
+    """
+    if not file.filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Invalid file type. Supported formats: .pdf")
+    if not 0 < zoom <= 4:
+        raise HTTPException(status_code=400, detail="zoom must be between 0 and 4")
+
+    input_data = await file.read()
+    try:
+        result, seconds = await run_cpu_timed(compress_pdf, input_data, zoom_x=zoom, zoom_y=zoom, as_bytes=True,
+                                              metrics=metrics)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"PDF compression failed: {e}")
+    result, measured = result if metrics else (result, None)
+    return compression_response(input_data, result, seconds, f"compressed_{os.path.basename(file.filename)}",
+                                "application/pdf", measured)
+
+async def convert_images_zip(inputs, output_format: str, quality: int, resize: Optional[float]):
+    """
+    Convert (name, bytes) inputs in the process pool and yield a ZIP archive
+    of the results as each one finishes.
+
+    A bounded number of conversions is in flight at a time, so the next
+    uploads are only read once earlier ones are done. Files that fail are
+    listed in errors.txt at the end of the archive.
+    """
+    archive = ZipStream()
+    window = 2 * max(CPU_WORKERS, 1)
+    pending = set()
+    failed = []
+
+    async def convert(name, data):
+        try:
+            result = await run_cpu(convert_image, data, output_format=output_format,
+                                   quality=quality, resize=resize, as_bytes=True)
+        except Exception as e:
+            print(f"Error converting {name}: {e}")
+            result = None
+        return name, result
+
+    try:
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < window:
+                item = await run_io(next, inputs, None)
+                if item is None:
+                    exhausted = True
+                else:
+                    pending.add(asyncio.ensure_future(convert(*item)))
+            if not pending:
+                break
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name, result = task.result()
+                if result is None:
+                    failed.append(name)
+                elif isinstance(result, tuple):
+                    # Auto format: (bytes, report), named for the format that won
+                    yield archive.add(output_name(name, result[1]["format"]), result[0])
+                else:
+                    yield archive.add(output_name(name, output_format), result)
+        if failed:
+            yield archive.add("errors.txt", "Could not convert:\n" + "\n".join(failed) + "\n")
+        yield archive.close()
+    finally:
+        # Client went away: drop conversions that have not started
+        for task in pending:
+            task.cancel()
+
+@app.post("/convert-images")
+async def convert_images_endpoint(
+    files: List[UploadFile] = File(...),
+    format: str = Form(...),
+    quality: Optional[int] = Form(95),
+    resize: Optional[float] = Form(None)
+):
+    """
+    Batch /convert-image: convert many images, or the images inside uploaded
+    ZIP archives, and stream back a ZIP of the results while later files are
+    still encoding.
+    """
+    supported_formats = ['.png', '.jpg', '.jpeg', '.webp', '.gif', '.bmp', '.tiff', '.ico', '.zip']
+    for file in files:
+        if not any(file.filename.lower().endswith(ext) for ext in supported_formats):
+            raise HTTPException(status_code=400, detail=f"Invalid file type: {file.filename}. Supported formats: {', '.join(supported_formats)}")
+
+    quality_value = min(max(quality, 1), 100) if quality is not None else 95
+    resize_value = float(resize) if resize is not None else None
+
+    def batch_inputs():
+        # Uploads are read one at a time as conversion slots free up
+        for file in files:
+            file.file.seek(0)
+            if file.filename.lower().endswith(".zip"):
+                yield from iter_zip_images(file.file)
+            else:
+                yield file.filename, file.file.read()
+
+    return StreamingResponse(
+        convert_images_zip(batch_inputs(), format.upper(), quality_value, resize_value),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="converted_{format.lower()}.zip"'}
+    )
+
 @app.post("/remove-background")
 async def remove_background_endpoint(file: UploadFile = File(...)):
     if not file.filename.lower().endswith(('.png', '.jpg', '.jpeg', '.webp')):
         raise HTTPException(status_code=400, detail="Invalid file type. Supported formats: png, jpg, jpeg, webp")
     
-    unique_id = str(uuid.uuid4())
-    file_ext = file.filename.split('.')[-1]
-    input_filename = f"{unique_id}.{file_ext}"
-    input_path = UPLOAD_DIR / input_filename
-
-    with open(input_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    input_data = await file.read()
+    await reject_oversized_image(input_data, whole=True)
+    output_filename = f"{os.path.splitext(file.filename)[0]}_no_bg.png"
 
-    output_filename = f"{unique_id}_no_bg.png"
-    output_path = OUTPUT_DIR / output_filename
-
-    result = remove_background(str(input_path), str(output_path))
+    result = await run_model(remove_background, input_data, as_bytes=True)
     if result is None:
         raise HTTPException(status_code=500, detail="Background removal failed from the service.")
 
-    try:
-        os.remove(input_path)
-    except Exception:
-        pass
-
-    return FileResponse(path=str(output_path), filename=output_filename)
+    return image_response(result, filename=output_filename)
 
 @app.post("/barcode-generator")
 async def barcode_generator_endpoint(
@@ -262,18 +856,15 @@ async def barcode_generator_endpoint(
     if not data:
         raise HTTPException(status_code=400, detail="Data is required to generate a barcode")
     
-    unique_id = str(uuid.uuid4())
-    output_filename = f"barcode_{unique_id}.png"
-    output_path = OUTPUT_DIR / output_filename
+    output_filename = f"barcode_{symbology}.png"
     
     barcode_color = color.lstrip('#') if color.startswith('#') else color
     bg_color = bgColor.lstrip('#') if bgColor.startswith('#') else bgColor
     border_color = borderColor.lstrip('#') if borderColor and borderColor.startswith('#') else borderColor
     
-    result = generate_barcode(
+    barcode_params = dict(
         data=data,
         symbology=symbology,
-        filename=str(output_path),
         text_show=textShow,
         color=barcode_color,
         bg_color=bg_color,
@@ -285,11 +876,16 @@ async def barcode_generator_endpoint(
         height=height,
         quiet_zone=quietZone
     )
+    result = await cached_bytes(
+        "barcode",
+        barcode_params,
+        lambda: run_cpu(generate_barcode, **barcode_params, as_bytes=True)
+    )
     
     if result is None:
         raise HTTPException(status_code=500, detail="Failed to generate barcode")
     
-    return FileResponse(path=str(output_path), filename=output_filename)
+    return image_response(result, filename=output_filename)
 
 @app.post("/markdown-validator")
 async def markdown_validator(request: Request):
@@ -308,7 +904,7 @@ async def markdown_validator(request: Request):
             formatted = fix_markdown(md)
             return JSONResponse({"formatted": formatted})
         elif action == "preview":
-            html = markdown_to_html(md)
+            html = await run_cpu(markdown_to_html, md)
             return JSONResponse({"html": html})
         else:
             raise HTTPException(status_code=400, detail="Invalid action specified")
@@ -332,23 +928,12 @@ async def qr_generator_endpoint(
     if not data:
         raise HTTPException(status_code=400, detail="Data is required to generate a QR code")
     
-    # Create a unique filename
-    unique_id = str(uuid.uuid4())
-    output_filename = f"qrcode_{unique_id}.png"
-    output_path = OUTPUT_DIR / output_filename
+    output_filename = "qrcode.png"
     
-    # Handle logo upload if provided
-    logo_path = None
-    if logo:
-        logo_ext = logo.filename.split('.')[-1]
-        logo_filename = f"logo_{unique_id}.{logo_ext}"
-        logo_path = UPLOAD_DIR / logo_filename
-        
-        # Save the uploaded logo
-        with open(logo_path, "wb") as buffer:
-            shutil.copyfileobj(logo.file, buffer)
-        
-        logo_path = str(logo_path)
+    # Read the logo upload into memory if provided
+    logo_data = await logo.read() if logo else None
+    if logo_data:
+        await reject_oversized_image(logo_data, whole=True)
     
     # Process color values
     qr_color = color.lstrip('#') if color.startswith('#') else color
@@ -356,40 +941,30 @@ async def qr_generator_endpoint(
     border_color = borderColor.lstrip('#') if borderColor and borderColor.startswith('#') else borderColor
     
     try:
-        # Generate the QR code
-        result = generate_qr(
-        data=data,
-        filename=str(output_path),
-        logo=logo_path,
-        color=color,  # Pass the original color value
-        bg_color=bgColor,  # Pass the original bg_color value
-        transparent=transparent,
-        border_style=borderStyle,
-        border_width=borderWidth,
-        border_color=borderColor,  # Pass the original border_color value
-        box_size=boxSize,
-        rounded=rounded,
-        quiet_zone=quietZone
-    )
-        
-        # Clean up the logo file if it was uploaded
-        if logo_path and os.path.exists(logo_path):
-            try:
-                os.remove(logo_path)
-            except Exception:
-                pass
+        qr_params = dict(
+            data=data,
+            color=color,  # Pass the original color value
+            bg_color=bgColor,  # Pass the original bg_color value
+            transparent=transparent,
+            border_style=borderStyle,
+            border_width=borderWidth,
+            border_color=borderColor,  # Pass the original border_color value
+            box_size=boxSize,
+            rounded=rounded,
+            quiet_zone=quietZone
+        )
+        # Generate the QR code, or reuse an identical earlier one
+        result = await cached_bytes(
+            "qr",
+            qr_params,
+            lambda: run_cpu(generate_qr, **qr_params, logo=logo_data, as_bytes=True),
+            logo_data
+        )
         
-        # Return the resulting QR code file
-        return FileResponse(path=str(output_path), filename=output_filename)
+        # Return the resulting QR code straight from memory
+        return image_response(result, filename=output_filename)
     
     except Exception as e:
-        # Clean up any files in case of error
-        if logo_path and os.path.exists(logo_path):
-            try:
-                os.remove(logo_path)
-            except Exception:
-                pass
-        
         raise HTTPException(status_code=500, detail=f"Failed to generate QR code: {str(e)}")
 
 @app.post("/generate-image/")
@@ -397,9 +972,10 @@ async def generate_image_endpoint(prompt: str = Form(...)):
     if not prompt:
         raise HTTPException(status_code=400, detail="Prompt is required")
     try:
-        output_path = generate_image(prompt)
+        output_path = await run_io(generate_image, prompt)
         if not output_path or not os.path.exists(output_path):
             raise HTTPException(status_code=500, detail="Failed to generate image")
+        artifact_store.register(output_path)
         image_url = f"/results/{os.path.basename(output_path)}"
         return JSONResponse({"image_url": image_url, "message": "Image generated successfully!"})
     except Exception as e:
@@ -437,7 +1013,11 @@ async def json_validator_endpoint(request: Request):
             try:
                 # Get optional indent parameter and ensure it's an integer
                 indent = int(payload.get("indent", 2))
-                formatted = format_json(json_content, indent=indent)
+                formatted = await cached_json(
+                    "format-json",
+                    {"content": json_content, "indent": indent},
+                    lambda: run_cpu(format_json, json_content, indent=indent)
+                )
                 return JSONResponse({"formatted": formatted})
             except ValueError as e:
                 # This should rarely happen since we already validated the JSON
@@ -461,14 +1041,16 @@ async def color_picker_endpoint(color: str = Form(...)):
             raise HTTPException(status_code=400, detail="Invalid color format. Use #hex or rgb(r,g,b).")
 
         # Generate shades and tints
-        shades, tints = generate_shades_and_tints(rgb)
-
-        return JSONResponse({
-            "hex": rgb_to_hex(rgb),
-            "rgb": rgb,
-            "shades": [rgb_to_hex(shade) for shade in shades],
-            "tints": [rgb_to_hex(tint) for tint in tints]
-        })
+        async def compute():
+            shades, tints = generate_shades_and_tints(rgb)
+            return {
+                "hex": rgb_to_hex(rgb),
+                "rgb": rgb,
+                "shades": [rgb_to_hex(shade) for shade in shades],
+                "tints": [rgb_to_hex(tint) for tint in tints]
+            }
+
+        return JSONResponse(await cached_json("color-picker", {"rgb": list(rgb)}, compute))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to process color: {str(e)}")
 
@@ -503,7 +1085,11 @@ async def xml_validator_endpoint(request: Request):
             try:
                 # Get optional indent parameter or use default (2)
                 indent = payload.get("indent", 2)
-                formatted = format_xml(xml_content, indent=indent)
+                formatted = await cached_json(
+                    "format-xml",
+                    {"content": xml_content, "indent": indent},
+                    lambda: run_cpu(format_xml, xml_content, indent=indent)
+                )
                 return JSONResponse({"formatted": formatted})
             except ValueError as e:
                 return JSONResponse({"error": str(e)}, status_code=400)
@@ -521,6 +1107,8 @@ async def pdf_merger_endpoint(files: List[UploadFile] = File(...)):
     session_id = str(uuid.uuid4())
     session_dir = UPLOAD_DIR / session_id
     session_dir.mkdir(parents=True, exist_ok=True)
+    # Tracked so the sweeper removes it even if cleanup below fails
+    artifact_store.register(session_dir)
     
     pdf_paths = []
     
@@ -541,13 +1129,16 @@ async def pdf_merger_endpoint(files: List[UploadFile] = File(...)):
         output_path = OUTPUT_DIR / output_filename
         
         # Merge the PDFs
-        merge_pdfs(pdf_paths, str(output_path))
+        await run_cpu(merge_pdfs, pdf_paths, str(output_path))
         
-        # Return the merged PDF file
+        # Return the merged PDF file; it is downloaded once, so delete it
+        # as soon as the response has been sent
+        artifact_store.acquire(output_path)
         return FileResponse(
             path=str(output_path), 
             filename=output_filename,
-            media_type="application/pdf"
+            media_type="application/pdf",
+            background=BackgroundTask(artifact_store.release, output_path, delete=True)
         )
     
     finally:
@@ -578,7 +1169,11 @@ async def yaml_validator_endpoint(request: Request):
         
         elif action == "format":
             try:
-                formatted = format_yaml(yaml_content)
+                formatted = await cached_json(
+                    "format-yaml",
+                    {"content": yaml_content},
+                    lambda: run_cpu(format_yaml, yaml_content)
+                )
                 return JSONResponse({"formatted": formatted})
             except ValueError as e:
                 return JSONResponse({"error": str(e)}, status_code=400)
@@ -612,7 +1207,8 @@ async def api_client_endpoint(request: Request):
         follow_redirects = data.get("followRedirects", True)
         
         # Send the request
-        result = send_request(
+        result = await run_io(
+            send_request,
             method=method,
             url=url,
             headers=headers,
@@ -651,7 +1247,7 @@ async def submit_feedback(request: Request):
             "timestamp": datetime.now().isoformat()
         }
 
-        save_request(request_data)
+        await run_io(save_request, request_data)
         print("Feedback Saved:", request_data)  # Debugging
         return JSONResponse({"message": "Feedback submitted successfully!"})
     except Exception as e:
@@ -663,7 +1259,7 @@ async def view_feedback():
     Endpoint to retrieve all user feedback.
     """
     try:
-        feedback_list = load_requests()
+        feedback_list = await run_io(load_requests)
         print("Feedback List:", feedback_list)  # Debugging
         return JSONResponse({"feedback": feedback_list})
     except Exception as e:
@@ -705,8 +1301,6 @@ async def random_generator_endpoint(request: Request):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate random value: {str(e)}")
     
-from python.randomUUID import generate_uuid
-
 @app.post("/random-uuid")
 async def random_uuid_endpoint():
     """
@@ -718,8 +1312,6 @@ async def random_uuid_endpoint():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate UUID: {str(e)}")
 
-from python.network import ip_lookup, dns_lookup, ping_host
-
 @app.post("/network-tool")
 async def network_tool_endpoint(request: Request):
     """
@@ -734,15 +1326,15 @@ async def network_tool_endpoint(request: Request):
             raise HTTPException(status_code=400, detail="Host is required.")
         
         if action == "ping":
-            result = ping_host(host)
+            result = await run_io(ping_host, host)
             return JSONResponse({"result": "\n".join(result)})
         
         elif action == "ip-lookup":
-            result = ip_lookup(host)
+            result = await run_io(ip_lookup, host)
             return JSONResponse({"result": result})
         
         elif action == "dns-lookup":
-            result = dns_lookup(host)
+            result = await run_io(dns_lookup, host)
             return JSONResponse({"result": result})
         
         else:
@@ -766,8 +1358,7 @@ async def format_code_endpoint(request: Request):
             raise HTTPException(status_code=400, detail="Code and language are required.")
 
         # Call the format_code function from codeFormatter.py
-        from python.codeFormatter import format_code
-        formatted_code = format_code(code, language)
+        formatted_code = await run_cpu(format_code, code, language)
 
         return JSONResponse({"formatted_code": formatted_code})
     except Exception as e:
@@ -779,9 +1370,13 @@ async def web_scraper_endpoint(url: str = Form(...), element: Optional[str] = Fo
     """
     Scrape a webpage and return the content of a specific HTML element.
     """
+    # Imported here so the scraper's dependencies load on first use
+    import requests
+    from bs4 import BeautifulSoup
+
     try:
         # Fetch the webpage
-        response = requests.get(url, timeout=10)
+        response = await run_io(requests.get, url, timeout=10)
         response.raise_for_status()  # Raise an error for bad status codes
 
         # Parse the HTML content
@@ -800,6 +1395,235 @@ async def web_scraper_endpoint(url: str = Form(...), element: Optional[str] = Fo
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
+@app.post("/jobs/remove-background", status_code=202)
+async def remove_background_job(file: UploadFile = File(...)):
+    """
+    Queue background removal; returns the job id and its status/events/result URLs.
+    """
+    if not file.filename.lower().endswith(('.png', '.jpg', '.jpeg', '.webp')):
+        raise HTTPException(status_code=400, detail="Invalid file type. Supported formats: png, jpg, jpeg, webp")
+    await reject_oversized_image(file.file, whole=True)
+    file.file.seek(0)
+    job_id = uuid.uuid4().hex
+    upload_dir, output_dir = job_workspace(job_id)
+    input_path = save_upload(file, upload_dir)
+    output_path = output_dir / f"{os.path.splitext(os.path.basename(file.filename))[0]}_no_bg.png"
+    job = await job_manager.submit("remove-background",
+                                   {"image_path": input_path, "output_path": str(output_path)},
+                                   cleanup=[str(upload_dir)], job_id=job_id)
+    return job_response(job, status_code=202)
+
+@app.post("/jobs/compress-pdf", status_code=202)
+async def compress_pdf_job(file: UploadFile = File(...), zoom: float = Form(0.5)):
+    """
+    Queue PDF compression; progress events report pages done.
+    """
+    if not file.filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail=f"File {file.filename} is not a PDF")
+    if not 0 < zoom <= 4:
+        raise HTTPException(status_code=400, detail="zoom must be between 0 and 4")
+    job_id = uuid.uuid4().hex
+    upload_dir, output_dir = job_workspace(job_id)
+    input_path = save_upload(file, upload_dir)
+    output_path = output_dir / f"compressed_{os.path.basename(file.filename)}"
+    job = await job_manager.submit("compress-pdf",
+                                   {"input_path": input_path, "output_path": str(output_path),
+                                    "zoom_x": zoom, "zoom_y": zoom},
+                                   cleanup=[str(upload_dir)], job_id=job_id)
+    return job_response(job, status_code=202)
+
+@app.post("/jobs/pdf-merger", status_code=202)
+async def pdf_merger_job(files: List[UploadFile] = File(...)):
+    """
+    Queue a PDF merge; progress events report files merged.
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="No PDF files provided")
+    for file in files:
+        if not file.filename.lower().endswith('.pdf'):
+            raise HTTPException(status_code=400, detail=f"File {file.filename} is not a PDF")
+    job_id = uuid.uuid4().hex
+    upload_dir, output_dir = job_workspace(job_id)
+    # Number the inputs so files with the same name do not overwrite each other
+    pdf_paths = []
+    for index, file in enumerate(files):
+        file_path = upload_dir / f"{index:03d}_{os.path.basename(file.filename)}"
+        with open(file_path, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer)
+        pdf_paths.append(str(file_path))
+    output_path = output_dir / f"merged_{job_id}.pdf"
+    job = await job_manager.submit("pdf-merger", {"pdf_paths": pdf_paths, "output_path": str(output_path)},
+                                   cleanup=[str(upload_dir)], job_id=job_id)
+    return job_response(job, status_code=202)
+
+@app.post("/jobs/generate-image", status_code=202)
+async def generate_image_job(prompt: str = Form(...)):
+    """
+    Queue AI image generation.
+    """
+    if not prompt:
+        raise HTTPException(status_code=400, detail="Prompt is required")
+    job = await job_manager.submit("generate-image", {"prompt": prompt})
+    return job_response(job, status_code=202)
+
+@app.get("/jobs/stats")
+async def job_stats_endpoint():
+    """
+    Broker, worker count and job counters.
+    """
+    return JSONResponse(await run_io(job_manager.stats))
+
+@app.get("/jobs/{job_id}")
+async def job_status_endpoint(job_id: str):
+    """
+    Current status and progress of a job.
+    """
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job_response(job)
+
+@app.get("/jobs/{job_id}/events")
+async def job_events_endpoint(job_id: str):
+    """
+    Server-Sent Events stream of a job's progress, ending with its final status.
+    """
+    if await job_manager.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return StreamingResponse(
+        job_manager.events(job_id),
+        media_type="text/event-stream",
+        # Disable proxy buffering so events arrive as they happen
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/jobs/{job_id}/result")
+async def job_result_endpoint(job_id: str):
+    """
+    Download the output of a succeeded job.
+    """
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    if job["status"] not in FINISHED:
+        return job_response(job, status_code=409)
+    if job["status"] != SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job {job['status']}: {job.get('error')}")
+    result = job["result"]
+    if not os.path.exists(result["path"]):
+        raise HTTPException(status_code=410, detail="Job result has expired")
+    # Lease the file so the sweeper cannot delete it mid-download
+    artifact_store.acquire(result["path"])
+    return FileResponse(
+        path=result["path"],
+        filename=result["filename"],
+        media_type=result["media_type"],
+        background=BackgroundTask(artifact_store.release, result["path"])
+    )
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job_endpoint(job_id: str):
+    """
+    Cancel a queued or running job.
+    """
+    job = await job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job_response(job)
+
+@app.get("/cache/stats")
+async def cache_stats_endpoint():
+    """
+    Hit/miss counters and tier sizes of the result cache.
+    """
+    return JSONResponse(result_cache.stats())
+
+@app.get("/llm-cache/stats")
+async def llm_cache_stats_endpoint():
+    """
+    Hit rate, coalesced requests and size of the LLM response cache.
+    """
+    return JSONResponse(llm_cache.stats())
+
+@app.get("/tool-index/stats")
+async def tool_index_stats_endpoint():
+    """
+    Queries answered from the local tool catalog vs. sent to the LLM.
+    """
+    return JSONResponse(tool_index.stats())
+
+@app.get("/tool-index/search")
+async def tool_index_search_endpoint(q: str = Query(...), category: Optional[str] = Query(None), limit: int = Query(5, ge=1, le=50)):
+    """
+    Ranked catalog matches for a query, with their BM25 scores and confidence.
+    """
+    return JSONResponse({"results": tool_index.search(q, category, limit), "threshold": tool_index.threshold,
+                         "margin": tool_index.margin})
+
+@app.get("/storage/stats")
+async def storage_stats_endpoint():
+    """
+    Usage, quota and sweep counters for public/results and public/uploads.
+    """
+    return JSONResponse(artifact_store.stats())
+
+@app.get("/concurrency/stats")
+async def concurrency_stats_endpoint():
+    """
+    Limit, queue size, in-flight and waiting requests of each concurrency class.
+    """
+    return JSONResponse(concurrency_limiter.stats())
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """
+    Per-route latency, size, in-flight and error metrics plus service-call
+    timings, in Prometheus text format.
+    """
+    # Off the loop: job counts come from a database query with the sqlite broker
+    return PlainTextResponse(await run_io(metrics_registry.render), media_type="text/plain; version=0.0.4")
+
+@app.get("/health")
+async def health_endpoint():
+    """
+    Liveness and model readiness. Always 200 while the server is up; the
+    model worker's state (loaded, load/warm-up times, idle time, releases)
+    is refreshed when the worker is not busy with a request.
+    """
+    busy = model_pool_busy()
+    if model_health["state"] != "warming" and MODEL_WARMUP and not busy:
+        try:
+            await asyncio.wait_for(asyncio.shield(refresh_model_health()), timeout=2)
+        except asyncio.TimeoutError:
+            busy = True
+    ready = model_health["state"] == "ready"
+    return JSONResponse({
+        "status": "ok" if ready else model_health["state"],
+        "ready": ready,
+        "model": {**model_health, "busy": busy, "workers": MODEL_WORKERS},
+        "cpu_workers": CPU_WORKERS,
+    })
+
+@app.get("/health/ready")
+async def readiness_endpoint():
+    """
+    200 once the background-removal model is loaded in its worker, 503
+    (with Retry-After while it is still warming up) before that or if
+    loading it failed.
+    """
+    if model_health["state"] == "ready":
+        return JSONResponse({"ready": True})
+    headers = {"Retry-After": "5"} if model_health["state"] == "warming" else None
+    return JSONResponse({"ready": False, "state": model_health["state"], "error": model_health["error"]},
+                        status_code=503, headers=headers)
+
+@app.get("/startup-report")
+async def startup_report_endpoint():
+    """
+    Import time of every lazily loaded tool module so far, slowest first.
+    """
+    return JSONResponse({"warmup": WARMUP_MODULES, "imports": import_report()})
+
 class UploadResponse(BaseModel):
     fileId: str
     webViewLink: str
@@ -0,0 +1,233 @@
+"""
+Artifact Storage Manager
+------------------------
+Keeps public/results and public/uploads bounded. Every artifact (file or
+directory directly under a managed root) gets an expiry time, the roots
+share a total byte quota, and a background sweeper deletes expired
+artifacts and then the least recently used ones until usage fits the quota.
+
+Artifacts that are being sent to a client are leased and never deleted
+while the lease is held, so the sweeper cannot race an active download.
+
+Configuration (environment):
+    UTILIX_RESULTS_TTL        default TTL in seconds for public/results (default: 3600)
+    UTILIX_UPLOADS_TTL        default TTL in seconds for public/uploads (default: 900)
+    UTILIX_ARTIFACT_QUOTA_MB  total quota across both roots (default: 1024)
+    UTILIX_SWEEP_INTERVAL     seconds between sweeps (default: 60)
+"""
+import asyncio
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from python.executor import run_io
+
+RESULTS_TTL = float(os.getenv("UTILIX_RESULTS_TTL", "3600"))
+UPLOADS_TTL = float(os.getenv("UTILIX_UPLOADS_TTL", "900"))
+ARTIFACT_QUOTA_BYTES = int(float(os.getenv("UTILIX_ARTIFACT_QUOTA_MB", "1024")) * 1024 * 1024)
+SWEEP_INTERVAL = float(os.getenv("UTILIX_SWEEP_INTERVAL", "60"))
+
+PathLike = Union[str, Path]
+
+
+def _disk_usage(path: Path) -> int:
+    """Size of a file, or the total size of the files inside a directory."""
+    try:
+        if path.is_dir():
+            return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def _delete(path: Path) -> None:
+    try:
+        if path.is_dir():
+            shutil.rmtree(path)
+        else:
+            path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class Artifact:
+    """Bookkeeping for one file or directory under a managed root."""
+
+    __slots__ = ("path", "size", "expires_at", "last_access", "leases", "delete_on_release")
+
+    def __init__(self, path: Path, size: int, expires_at: float, last_access: float):
+        self.path = path
+        self.size = size
+        self.expires_at = expires_at
+        self.last_access = last_access
+        self.leases = 0
+        self.delete_on_release = False
+
+
+class ArtifactStore:
+    """TTL- and quota-managed storage for generated and uploaded files."""
+
+    def __init__(self, quota_bytes: int = ARTIFACT_QUOTA_BYTES):
+        self.quota_bytes = quota_bytes
+        self.roots: Dict[Path, float] = {}
+        self._artifacts: Dict[Path, Artifact] = {}
+        self._lock = threading.Lock()
+        self.counters = {"expired": 0, "evicted": 0, "released": 0}
+
+    def add_root(self, root: PathLike, default_ttl: float) -> None:
+        """Manage every entry directly under root with the given default TTL."""
+        root = Path(root).resolve()
+        root.mkdir(parents=True, exist_ok=True)
+        self.roots[root] = default_ttl
+
+    def _key(self, path: PathLike) -> Path:
+        """Map a path to the top-level entry under its managed root."""
+        path = Path(path).resolve()
+        for root in self.roots:
+            if root in path.parents:
+                return root / path.relative_to(root).parts[0]
+        raise ValueError(f"{path} is not under a managed artifact root")
+
+    def register(self, path: PathLike, ttl: Optional[float] = None) -> Path:
+        """
+        Start tracking an artifact.
+
+        Args:
+            path: File or directory under a managed root
+            ttl: Seconds until the artifact may be swept (default: the root's TTL)
+
+        Returns:
+            The tracked path
+        """
+        key = self._key(path)
+        now = time.time()
+        if ttl is None:
+            ttl = self.roots[key.parent]
+        with self._lock:
+            artifact = self._artifacts.get(key)
+            if artifact is None:
+                artifact = self._artifacts[key] = Artifact(key, 0, now + ttl, now)
+            else:
+                artifact.expires_at = max(artifact.expires_at, now + ttl)
+                artifact.last_access = now
+        artifact.size = _disk_usage(key)
+        return key
+
+    def acquire(self, path: PathLike) -> Path:
+        """Lease an artifact so the sweeper leaves it alone until release()."""
+        key = self._key(path)
+        if key not in self._artifacts:
+            self.register(key)
+        with self._lock:
+            artifact = self._artifacts[key]
+            artifact.leases += 1
+            artifact.last_access = time.time()
+        return key
+
+    def release(self, path: PathLike, delete: bool = False) -> None:
+        """
+        Drop a lease taken with acquire().
+
+        With delete=True the artifact is removed as soon as no other lease
+        holds it, which is how download-once results are cleaned up right
+        after their response finishes.
+        """
+        key = self._key(path)
+        remove = False
+        with self._lock:
+            artifact = self._artifacts.get(key)
+            if artifact is None:
+                return
+            artifact.leases = max(artifact.leases - 1, 0)
+            artifact.delete_on_release = artifact.delete_on_release or delete
+            if artifact.leases == 0 and artifact.delete_on_release:
+                del self._artifacts[key]
+                self.counters["released"] += 1
+                remove = True
+        if remove:
+            _delete(key)
+
+    def _scan(self) -> None:
+        """Pick up entries written outside the store (other processes, old runs)."""
+        for root, ttl in self.roots.items():
+            try:
+                entries = list(root.iterdir())
+            except OSError:
+                continue
+            seen = set(entries)
+            sizes = {path: _disk_usage(path) for path in entries}
+            with self._lock:
+                for path in entries:
+                    artifact = self._artifacts.get(path)
+                    if artifact is not None:
+                        # Directories and late writes change size after registration
+                        artifact.size = sizes[path]
+                        continue
+                    try:
+                        mtime = path.stat().st_mtime
+                    except OSError:
+                        continue
+                    self._artifacts[path] = Artifact(path, sizes[path], mtime + ttl, mtime)
+                # Forget entries deleted by someone else
+                for path in [p for p in self._artifacts if p.parent == root and p not in seen]:
+                    if self._artifacts[path].leases == 0 and not path.exists():
+                        del self._artifacts[path]
+
+    def sweep(self) -> Dict[str, int]:
+        """Delete expired artifacts, then LRU artifacts until under quota."""
+        now = time.time()
+        self._scan()
+        doomed = []
+        with self._lock:
+            for artifact in list(self._artifacts.values()):
+                if artifact.leases == 0 and artifact.expires_at <= now:
+                    doomed.append(artifact)
+                    del self._artifacts[artifact.path]
+                    self.counters["expired"] += 1
+
+            total = sum(a.size for a in self._artifacts.values())
+            if total > self.quota_bytes:
+                for artifact in sorted(self._artifacts.values(), key=lambda a: a.last_access):
+                    if total <= self.quota_bytes:
+                        break
+                    if artifact.leases:
+                        continue
+                    doomed.append(artifact)
+                    del self._artifacts[artifact.path]
+                    total -= artifact.size
+                    self.counters["evicted"] += 1
+
+        for artifact in doomed:
+            _delete(artifact.path)
+        return {"deleted": len(doomed), "bytes": total}
+
+    async def run_sweeper(self, interval: float = SWEEP_INTERVAL) -> None:
+        """Sweep forever; started as a task from the FastAPI lifespan."""
+        while True:
+            try:
+                result = await run_io(self.sweep)
+                if result["deleted"]:
+                    print(f"Artifact sweep removed {result['deleted']} item(s), {result['bytes']} bytes in use")
+            except Exception as e:
+                print(f"Artifact sweep failed: {e}")
+            await asyncio.sleep(interval)
+
+    def stats(self) -> Dict[str, object]:
+        """Usage and sweep counters for each managed root."""
+        with self._lock:
+            artifacts = list(self._artifacts.values())
+            return {
+                **self.counters,
+                "artifacts": len(artifacts),
+                "leased": sum(1 for a in artifacts if a.leases),
+                "bytes": sum(a.size for a in artifacts),
+                "quota_bytes": self.quota_bytes,
+                "roots": {str(root): ttl for root, ttl in self.roots.items()},
+            }
+
+
+# Process-wide store used by fastapi_server.py; roots are added at startup
+artifact_store = ArtifactStore()
@@ -0,0 +1,262 @@
+"""
+Gemini Stand-in Server
+----------------------
+A local HTTP server speaking the part of the Gemini REST API used through
+python/llm_gateway.py (generateContent and streamGenerateContent with
+alt=sse), so the FastAPI server can be load-tested and benchmarked without
+network access or quota. Point the gateway at it with GEMINI_BASE_URL.
+
+Modes:
+    replay   answer from recorded responses (default)
+    record   forward each request to the real API (GEMINI_API_KEY), save the
+             streamed chunks and return them
+
+Recordings are keyed by a hash of the model and the request body, one JSON
+file per request in the recordings directory. A request with no recording
+gets a synthetic answer (--on-miss synthetic, the default): --synthetic-text
+for text requests and a generated PNG for image requests. With
+--on-miss error it gets a 404 instead.
+
+Timing of replayed responses:
+    --latency      seconds before the first chunk (time to first token)
+    --chunk-delay  seconds between chunks
+    --jitter       random +/- fraction applied to both delays
+    --chunk-chars  re-split text into pieces of this many characters (0 keeps
+                   the recorded chunking)
+
+Usage (from the repository root):
+    python -m python.benchmarks.gemini_standin --mode record --port 8090   # capture real answers
+    python -m python.benchmarks.gemini_standin --latency 0.4 --chunk-delay 0.03 --port 8090
+    GEMINI_BASE_URL=http://127.0.0.1:8090 uvicorn fastapi_server:app
+"""
+import argparse
+import asyncio
+import base64
+import copy
+import hashlib
+import json
+import os
+import random
+from typing import Any, Dict, List, Optional
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+UPSTREAM_URL = "https://generativelanguage.googleapis.com"
+DEFAULT_RECORDINGS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+DEFAULT_SYNTHETIC_TEXT = ('[{"url": "https://example.com", '
+                          '"description": "Synthetic response from the Gemini stand-in server."}]')
+
+
+def request_key(model: str, body: Dict[str, Any]) -> str:
+    """Stable hash of a request, independent of JSON key order."""
+    material = json.dumps({"model": model, "body": body}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def wants_image(body: Dict[str, Any]) -> bool:
+    modalities = (body.get("generationConfig") or {}).get("responseModalities") or []
+    return any(str(m).upper() == "IMAGE" for m in modalities)
+
+
+def _png_bytes() -> bytes:
+    # Imported here so the server starts without Pillow when images are never requested
+    from python.benchmarks.synthetic_inputs import encoded, photo_image
+    return encoded(photo_image(512, 512), "PNG")
+
+
+def response_chunk(parts: List[Dict[str, Any]], finish: bool = False) -> Dict[str, Any]:
+    """One GenerateContentResponse with a single candidate."""
+    candidate = {"content": {"role": "model", "parts": parts}, "index": 0}
+    if finish:
+        candidate["finishReason"] = "STOP"
+    return {"candidates": [candidate], "modelVersion": "stand-in"}
+
+
+def split_text(chunks: List[Dict[str, Any]], size: int) -> List[Dict[str, Any]]:
+    """Re-chunk the text parts of a response into pieces of `size` characters."""
+    pieces = []
+    for chunk in chunks:
+        parts = chunk.get("candidates", [{}])[0].get("content", {}).get("parts", [])
+        if len(parts) != 1 or "text" not in parts[0]:
+            pieces.append(chunk)
+            continue
+        text = parts[0]["text"]
+        for start in range(0, max(len(text), 1), size):
+            piece = copy.deepcopy(chunk)
+            piece["candidates"][0]["content"]["parts"][0]["text"] = text[start:start + size]
+            if start + size < len(text):
+                piece["candidates"][0].pop("finishReason", None)
+                piece.pop("usageMetadata", None)
+            pieces.append(piece)
+    return pieces
+
+
+def merge_chunks(chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine streamed chunks into the single response of generateContent."""
+    if not chunks:
+        return response_chunk([], finish=True)
+    merged = copy.deepcopy(chunks[-1])
+    parts: List[Dict[str, Any]] = []
+    for chunk in chunks:
+        for part in chunk.get("candidates", [{}])[0].get("content", {}).get("parts", []):
+            if "text" in part and parts and "text" in parts[-1]:
+                parts[-1]["text"] += part["text"]
+            else:
+                parts.append(dict(part))
+    merged.setdefault("candidates", [{}])[0].setdefault("content", {"role": "model"})["parts"] = parts
+    return merged
+
+
+class StandIn:
+    """Recording store, timing settings and counters of one server."""
+
+    def __init__(self, recordings: str = DEFAULT_RECORDINGS, mode: str = "replay", on_miss: str = "synthetic",
+                 latency: float = 0.0, chunk_delay: float = 0.0, jitter: float = 0.0, chunk_chars: int = 0,
+                 synthetic_text: str = DEFAULT_SYNTHETIC_TEXT, upstream: str = UPSTREAM_URL):
+        self.recordings = recordings
+        self.mode = mode
+        self.on_miss = on_miss
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.jitter = jitter
+        self.chunk_chars = chunk_chars
+        self.synthetic_text = synthetic_text
+        self.upstream = upstream.rstrip("/")
+        self._png: Optional[str] = None
+        self.counters = {"requests": 0, "replayed": 0, "recorded": 0, "synthetic": 0, "missing": 0}
+        os.makedirs(recordings, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.recordings, f"{key}.json")
+
+    def load(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)["chunks"]
+        except FileNotFoundError:
+            return None
+
+    def save(self, key: str, model: str, body: Dict[str, Any], chunks: List[Dict[str, Any]]) -> None:
+        tmp_path = f"{self._path(key)}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"model": model, "request": body, "chunks": chunks}, f, indent=1)
+        os.replace(tmp_path, self._path(key))
+
+    def synthetic(self, body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if wants_image(body):
+            if self._png is None:
+                self._png = base64.b64encode(_png_bytes()).decode("ascii")
+            return [response_chunk([{"inlineData": {"mimeType": "image/png", "data": self._png}}], finish=True)]
+        return [response_chunk([{"text": self.synthetic_text}], finish=True)]
+
+    def delay(self, seconds: float) -> float:
+        if self.jitter:
+            seconds *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(seconds, 0.0)
+
+    async def record(self, model: str, body: Dict[str, Any], api_key: Optional[str]):
+        """Stream a request from the real API, yielding chunks and saving them at the end."""
+        url = f"{self.upstream}/v1beta/models/{model}:streamGenerateContent?alt=sse"
+        # The stand-in's own key wins: clients pointed at it may send a placeholder
+        headers = {"x-goog-api-key": os.getenv("GEMINI_API_KEY") or api_key or ""}
+        chunks = []
+        async with httpx.AsyncClient(timeout=120) as client:
+            async with client.stream("POST", url, json=body, headers=headers) as upstream:
+                if upstream.status_code != 200:
+                    detail = (await upstream.aread()).decode("utf-8", "replace")
+                    raise HTTPException(status_code=upstream.status_code, detail=detail)
+                async for line in upstream.aiter_lines():
+                    if line.startswith("data:"):
+                        chunk = json.loads(line[5:])
+                        chunks.append(chunk)
+                        yield chunk
+        self.save(request_key(model, body), model, body, chunks)
+        self.counters["recorded"] += 1
+
+    async def replay(self, model: str, body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        chunks = self.load(request_key(model, body))
+        if chunks is not None:
+            self.counters["replayed"] += 1
+        elif self.on_miss == "synthetic":
+            chunks = self.synthetic(body)
+            self.counters["synthetic"] += 1
+        else:
+            self.counters["missing"] += 1
+            raise HTTPException(status_code=404, detail=f"No recording for this {model} request")
+        return split_text(chunks, self.chunk_chars) if self.chunk_chars else chunks
+
+    async def timed(self, chunks: List[Dict[str, Any]]):
+        """Yield chunks with the configured first-chunk latency and spacing."""
+        await asyncio.sleep(self.delay(self.latency))
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep(self.delay(self.chunk_delay))
+            yield chunk
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "mode": self.mode, "on_miss": self.on_miss, "latency": self.latency,
+                "chunk_delay": self.chunk_delay, "jitter": self.jitter, "chunk_chars": self.chunk_chars}
+
+
+def create_app(standin: StandIn) -> FastAPI:
+    app = FastAPI(title="Gemini stand-in")
+
+    @app.post("/{version}/models/{target}")
+    async def generate_content(version: str, target: str, request: Request):
+        model, _, method = target.partition(":")
+        if method not in ("generateContent", "streamGenerateContent"):
+            raise HTTPException(status_code=404, detail=f"Unsupported method: {method}")
+        body = await request.json()
+        standin.counters["requests"] += 1
+        api_key = request.headers.get("x-goog-api-key") or request.query_params.get("key")
+
+        if standin.mode == "record":
+            chunks = standin.record(model, body, api_key)
+        else:
+            chunks = standin.timed(await standin.replay(model, body))
+
+        if method == "generateContent":
+            return JSONResponse(merge_chunks([chunk async for chunk in chunks]))
+
+        async def events():
+            async for chunk in chunks:
+                yield f"data: {json.dumps(chunk)}\r\n\r\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/standin/stats")
+    async def stats():
+        return standin.stats()
+
+    return app
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Local record/replay stand-in for the Gemini API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--mode", choices=["replay", "record"], default="replay")
+    parser.add_argument("--recordings", default=DEFAULT_RECORDINGS, help="Directory of recorded responses")
+    parser.add_argument("--on-miss", choices=["synthetic", "error"], default="synthetic",
+                        help="Answer for requests without a recording (default: synthetic)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before the first chunk")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Seconds between chunks")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- fraction applied to delays")
+    parser.add_argument("--chunk-chars", type=int, default=0, help="Re-split text into pieces of this size")
+    parser.add_argument("--synthetic-text", default=DEFAULT_SYNTHETIC_TEXT, help="Text of synthetic answers")
+    parser.add_argument("--upstream", default=UPSTREAM_URL, help="API recorded from in record mode")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    standin = StandIn(
+        recordings=args.recordings, mode=args.mode, on_miss=args.on_miss, latency=args.latency,
+        chunk_delay=args.chunk_delay, jitter=args.jitter, chunk_chars=args.chunk_chars,
+        synthetic_text=args.synthetic_text, upstream=args.upstream,
+    )
+    uvicorn.run(create_app(standin), host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
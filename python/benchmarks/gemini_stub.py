@@ -0,0 +1,88 @@
+"""
+Gemini Stub
+-----------
+Offline stand-ins for google.genai and google.generativeai so modules that
+import Gemini (e.g. python/palette_service.py through python/llm_gateway.py)
+can be benchmarked without network access or an API key.
+
+install() replaces the real packages (if any) so benchmarks never reach the
+network, and every call returns a fixed canned response.
+"""
+import sys
+import types
+
+CANNED_TEXT = '["#1A2B3C", "#4D5E6F", "#7A8B9C", "#ABCDEF", "#FEDCBA"]'
+
+
+class _Response:
+    def __init__(self, text=CANNED_TEXT):
+        self.text = text
+        self.candidates = []
+
+
+class _GenerativeModel:
+    def __init__(self, model_name=None, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, *args, **kwargs):
+        return _Response()
+
+    async def generate_content_async(self, *args, **kwargs):
+        return _Response()
+
+
+class _Models:
+    def generate_content(self, *args, **kwargs):
+        return _Response()
+
+    def generate_content_stream(self, *args, **kwargs):
+        yield _Response()
+
+
+class _AsyncModels:
+    async def generate_content(self, *args, **kwargs):
+        return _Response()
+
+    async def generate_content_stream(self, *args, **kwargs):
+        async def chunks():
+            yield _Response()
+        return chunks()
+
+
+class _Client:
+    def __init__(self, *args, **kwargs):
+        self.models = _Models()
+        self.aio = types.SimpleNamespace(models=_AsyncModels())
+
+
+class _Types(types.ModuleType):
+    """Any attribute of google.genai.types is a permissive record type."""
+
+    def __getattr__(self, name):
+        record = type(name, (), {
+            "__init__": lambda self, *args, **kwargs: self.__dict__.update(kwargs),
+            "from_text": classmethod(lambda cls, **kwargs: cls(**kwargs)),
+        })
+        setattr(self, name, record)
+        return record
+
+
+def install():
+    """Register the stub modules in sys.modules (before any service import)."""
+    google = sys.modules.get("google") or types.ModuleType("google")
+    google.__path__ = getattr(google, "__path__", [])
+
+    generativeai = types.ModuleType("google.generativeai")
+    generativeai.configure = lambda **kwargs: None
+    generativeai.GenerativeModel = _GenerativeModel
+
+    genai = types.ModuleType("google.genai")
+    genai.Client = _Client
+    genai.types = _Types("google.genai.types")
+
+    google.generativeai = generativeai
+    google.genai = genai
+    sys.modules["google"] = google
+    sys.modules["google.generativeai"] = generativeai
+    sys.modules["google.genai"] = genai
+    sys.modules["google.genai.types"] = genai.types
@@ -0,0 +1,395 @@
+"""
+Service Micro-Benchmarks
+------------------------
+Times the hot service functions under python/ on fixed synthetic inputs and
+writes a JSON report with wall time, peak RSS and allocation figures per
+benchmark. The report can be compared against a stored baseline so
+regressions are flagged before deploying.
+
+Each benchmark runs in a fresh spawned process, so peak RSS is that of a
+single benchmark and no import or cache state leaks between them. Gemini is
+replaced by python/benchmarks/gemini_stub.py in every worker.
+
+Usage (from the repository root):
+    python -m python.benchmarks.run_benchmarks                     # run all, compare to baseline
+    python -m python.benchmarks.run_benchmarks --only generate_qr_plain format_json
+    python -m python.benchmarks.run_benchmarks --save-baseline     # store this run as the baseline
+
+Report fields per benchmark:
+    wall_seconds       min / median / mean over --repeat timed calls (after one warm-up call)
+    peak_rss_kb        peak resident set size of the benchmark process
+    traced_peak_bytes  peak Python heap allocation during one call (tracemalloc)
+    allocated_blocks   Python heap blocks allocated during one call and still alive after it
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_THRESHOLD = 0.15
+# Metrics compared against the baseline (report key, value path)
+COMPARED_METRICS = (
+    ("wall_seconds.median", ("wall_seconds", "median")),
+    ("peak_rss_kb", ("peak_rss_kb",)),
+    ("traced_peak_bytes", ("traced_peak_bytes",)),
+)
+
+
+# ---------------------------------------------------------------------------
+# Benchmark definitions. Each setup function receives a scratch directory and
+# returns a zero-argument callable performing exactly one unit of work.
+# ---------------------------------------------------------------------------
+
+def _write(workdir: str, name: str, data: bytes) -> str:
+    path = os.path.join(workdir, name)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def setup_convert_image(workdir: str) -> Callable[[], Any]:
+    from python.benchmarks.synthetic_inputs import photo_image, encoded
+    from python.imageGraphics.imageConvertor import convert_image
+    source = encoded(photo_image(), "PNG")
+    return lambda: convert_image(source, output_format="WEBP", quality=85, resize=50, as_bytes=True)
+
+
+def setup_convert_image_thumbnail(workdir: str) -> Callable[[], Any]:
+    from python.benchmarks.synthetic_inputs import photo_image, encoded
+    from python.imageGraphics.imageConvertor import convert_image
+    # 24 MP camera-sized JPEG shrunk to 25% (draft decoding + reduce path)
+    source = encoded(photo_image(6000, 4000), "JPEG", quality=92)
+    return lambda: convert_image(source, output_format="JPEG", quality=85, resize=25, as_bytes=True)
+
+
+def setup_convert_image_auto(workdir: str) -> Callable[[], Any]:
+    from python.benchmarks.synthetic_inputs import photo_image, encoded
+    from python.imageGraphics.imageConvertor import convert_image
+    # WebP/JPEG/PNG/quantized PNG encoded and SSIM-scored concurrently
+    source = encoded(photo_image(), "PNG")
+    return lambda: convert_image(source, output_format="AUTO", quality=80, resize=50, as_bytes=True)
+
+
+def setup_convert_image_animated(workdir: str) -> Callable[[], Any]:
+    from python.benchmarks.synthetic_inputs import animated_gif
+    from python.imageGraphics.imageConvertor import convert_image
+    # Frames decoded lazily, cropped to the changed region over a shared palette
+    source = animated_gif()
+    return lambda: convert_image(source, output_format="GIF", as_bytes=True)
+
+
+def setup_compress_jpg(workdir: str) -> Callable[[], Any]:
+    from python.benchmarks.synthetic_inputs import photo_image, encoded
+    from python.jpg_compress import compress_jpg
+    source = _write(workdir, "photo.jpg", encoded(photo_image(), "JPEG", quality=95))
+    output = os.path.join(workdir, "photo_compressed.jpg")
+    return lambda: compress_jpg(source, output, quality=60, resize_factor=0.7)
+
+
+def setup_compress_png(workdir: str) -> Callable[[], Any]:
+    from python.benchmarks.synthetic_inputs import screenshot_image, encoded
+    from python.png_compress import compress_png
+    source = _write(workdir, "screenshot.png", encoded(screenshot_image(), "PNG"))
+    output = os.path.join(workdir, "screenshot_compressed.png")
+    return lambda: compress_png(source, output, resize_factor=0.7)
+
+
+def setup_compress_pdf(workdir: str) -> Callable[[], Any]:
+    from python.benchmarks.synthetic_inputs import pdf_document
+    from python.pdf_compress import compress_pdf
+    source = _write(workdir, "document.pdf", pdf_document())
+    output = os.path.join(workdir, "document_compressed.pdf")
+    return lambda: compress_pdf(source, output)
+
+
+def setup_merge_pdfs(workdir: str) -> Callable[[], Any]:
+    from python.benchmarks.synthetic_inputs import pdf_document
+    from python.pdfs.pdfMerge import merge_pdfs
+    sources = [_write(workdir, f"part{i}.pdf", pdf_document(seed=i)) for i in range(4)]
+    output = os.path.join(workdir, "merged.pdf")
+    return lambda: merge_pdfs(sources, output)
+
+
+def setup_generate_qr_plain(workdir: str) -> Callable[[], Any]:
+    from python.imageGraphics.qrGenerator import generate_qr
+    return lambda: generate_qr("https://example.com/benchmarks/qr?plain=1", as_bytes=True)
+
+
+def setup_generate_qr_rounded(workdir: str) -> Callable[[], Any]:
+    from python.imageGraphics.qrGenerator import generate_qr
+    return lambda: generate_qr("https://example.com/benchmarks/qr?rounded=1", color="#1a2b3c",
+                               rounded=True, border_style="solid", as_bytes=True)
+
+
+def setup_generate_barcode(workdir: str) -> Callable[[], Any]:
+    from python.imageGraphics.barcodeGenerator import generate_barcode
+    return lambda: generate_barcode("UTILIX-BENCH-0001", as_bytes=True)
+
+
+def setup_generate_barcode_transparent(workdir: str) -> Callable[[], Any]:
+    from python.imageGraphics.barcodeGenerator import generate_barcode
+    return lambda: generate_barcode("UTILIX-BENCH-0001", transparent=True, as_bytes=True)
+
+
+def setup_format_json(workdir: str) -> Callable[[], Any]:
+    from python.benchmarks.synthetic_inputs import json_document
+    from python.textValidators.json_validator import format_json
+    content = json_document()
+    return lambda: format_json(content)
+
+
+def setup_format_xml(workdir: str) -> Callable[[], Any]:
+    from python.benchmarks.synthetic_inputs import xml_document
+    from python.textValidators.xml_validator import format_xml
+    content = xml_document()
+    return lambda: format_xml(content)
+
+
+def setup_format_yaml(workdir: str) -> Callable[[], Any]:
+    from python.benchmarks.synthetic_inputs import yaml_document
+    from python.textValidators.yaml_validator import format_yaml
+    content = yaml_document()
+    return lambda: format_yaml(content)
+
+
+def setup_markdown_to_html(workdir: str) -> Callable[[], Any]:
+    from python.benchmarks.synthetic_inputs import markdown_document
+    from python.textValidators.markdown_editor import markdown_to_html
+    content = markdown_document()
+    return lambda: markdown_to_html(content)
+
+
+def setup_generate_harmony_palette(workdir: str) -> Callable[[], Any]:
+    from python.palette_service import generate_harmony_palette
+    cases = [(f"#{(i * 2654435761) & 0xFFFFFF:06x}", harmony, count)
+             for i in range(100)
+             for harmony in ("complementary", "analogous", "triadic", "tetradic", "monochromatic")
+             for count in (5, 8)]
+    # A single palette takes microseconds, so one unit is the whole case table
+    return lambda: [generate_harmony_palette(*case) for case in cases]
+
+
+def setup_format_code(workdir: str) -> Callable[[], Any]:
+    from python.benchmarks.synthetic_inputs import javascript_source
+    from python.codeFormatter import format_code
+    content = javascript_source()
+    return lambda: format_code(content, "javascript")
+
+
+BENCHMARKS: Dict[str, Callable[[str], Callable[[], Any]]] = {
+    "convert_image": setup_convert_image,
+    "convert_image_thumbnail": setup_convert_image_thumbnail,
+    "convert_image_auto": setup_convert_image_auto,
+    "convert_image_animated": setup_convert_image_animated,
+    "compress_jpg": setup_compress_jpg,
+    "compress_png": setup_compress_png,
+    "compress_pdf": setup_compress_pdf,
+    "merge_pdfs": setup_merge_pdfs,
+    "generate_qr_plain": setup_generate_qr_plain,
+    "generate_qr_rounded": setup_generate_qr_rounded,
+    "generate_barcode": setup_generate_barcode,
+    "generate_barcode_transparent": setup_generate_barcode_transparent,
+    "format_json": setup_format_json,
+    "format_xml": setup_format_xml,
+    "format_yaml": setup_format_yaml,
+    "markdown_to_html": setup_markdown_to_html,
+    "generate_harmony_palette": setup_generate_harmony_palette,
+    "format_code": setup_format_code,
+}
+
+
+# ---------------------------------------------------------------------------
+# Measurement (runs inside the spawned worker)
+# ---------------------------------------------------------------------------
+
+def run_one(name: str, repeat: int) -> Dict[str, Any]:
+    """
+    Run a single benchmark in the current (fresh) process.
+
+    Args:
+        name: Key in BENCHMARKS
+        repeat: Number of timed calls
+
+    Returns:
+        The benchmark's report entry
+    """
+    from python.benchmarks import gemini_stub
+    gemini_stub.install()
+
+    with tempfile.TemporaryDirectory(prefix="utilix-bench-") as workdir:
+        # Service functions print progress; keep the benchmark output readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            try:
+                func = BENCHMARKS[name](workdir)
+            except ImportError as e:
+                return {"status": "skipped", "reason": f"missing dependency: {e}"}
+
+            # Warm-up: lazy imports, codec initialisation, caches
+            func()
+
+            tracemalloc.start()
+            blocks_before = sys.getallocatedblocks()
+            result = func()
+            blocks_after = sys.getallocatedblocks()
+            _, traced_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del result
+
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                func()
+                timings.append(time.perf_counter() - start)
+
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak_rss //= 1024
+
+    return {
+        "status": "ok",
+        "repeat": repeat,
+        "wall_seconds": {
+            "min": min(timings),
+            "median": statistics.median(timings),
+            "mean": statistics.fmean(timings),
+        },
+        "peak_rss_kb": peak_rss,
+        "traced_peak_bytes": traced_peak,
+        "allocated_blocks": blocks_after - blocks_before,
+    }
+
+
+def run_isolated(name: str, repeat: int) -> Dict[str, Any]:
+    """Run one benchmark in its own spawned process."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        try:
+            return pool.submit(run_one, name, repeat).result()
+        except Exception as e:
+            return {"status": "error", "reason": f"{type(e).__name__}: {e}"}
+
+
+# ---------------------------------------------------------------------------
+# Baseline comparison
+# ---------------------------------------------------------------------------
+
+def _metric(entry: Dict[str, Any], path: Tuple[str, ...]) -> Any:
+    for key in path:
+        if not isinstance(entry, dict) or key not in entry:
+            return None
+        entry = entry[key]
+    return entry
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            threshold: float) -> List[Dict[str, Any]]:
+    """
+    Compare benchmark results against a baseline report.
+
+    Args:
+        results: Benchmark entries of the current run
+        baseline: Benchmark entries of the baseline run
+        threshold: Allowed relative increase (0.15 = 15%) before flagging
+
+    Returns:
+        One record per metric that got worse by more than the threshold
+    """
+    regressions = []
+    for name, entry in results.items():
+        previous = baseline.get(name)
+        if entry.get("status") != "ok" or not previous or previous.get("status") != "ok":
+            continue
+        for label, path in COMPARED_METRICS:
+            current, before = _metric(entry, path), _metric(previous, path)
+            if not current or not before:
+                continue
+            change = (current - before) / before
+            entry.setdefault("change", {})[label] = round(change, 4)
+            if change > threshold:
+                regressions.append({"benchmark": name, "metric": label, "baseline": before,
+                                    "current": current, "change": round(change, 4)})
+    return regressions
+
+
+def _format_row(name: str, entry: Dict[str, Any]) -> str:
+    if entry.get("status") != "ok":
+        return f"{name:<30} {entry.get('status')}: {entry.get('reason', '')}"
+    wall = entry["wall_seconds"]
+    change = entry.get("change", {}).get("wall_seconds.median")
+    delta = f" ({change:+.1%})" if change is not None else ""
+    return (f"{name:<30} median {wall['median'] * 1000:9.2f} ms{delta:<10} "
+            f"rss {entry['peak_rss_kb'] / 1024:7.1f} MB  "
+            f"heap peak {entry['traced_peak_bytes'] / 1024:9.1f} KB  "
+            f"blocks {entry['allocated_blocks']:+d}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Utilix service functions")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Run only these benchmarks")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed calls per benchmark (default: 5)")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline report to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative increase flagged as a regression (default: 0.15)")
+    args = parser.parse_args(argv)
+
+    names = args.only or list(BENCHMARKS)
+    results: Dict[str, Dict[str, Any]] = {}
+    for name in names:
+        results[name] = run_isolated(name, max(args.repeat, 1))
+        print(_format_row(name, results[name]), flush=True)
+
+    report: Dict[str, Any] = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeat": args.repeat,
+        "benchmarks": results,
+    }
+
+    regressions = []
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline.get("benchmarks", {}), args.threshold)
+        report["baseline"] = {"path": args.baseline, "created": baseline.get("created"),
+                              "threshold": args.threshold, "regressions": regressions}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+    elif "baseline" not in report:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one.")
+    elif regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+        for r in regressions:
+            print(f"  {r['benchmark']}: {r['metric']} {r['baseline']} -> {r['current']} ({r['change']:+.1%})")
+        return 1
+    else:
+        print("\nNo regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
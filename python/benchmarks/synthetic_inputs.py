@@ -0,0 +1,175 @@
+"""
+Synthetic Benchmark Inputs
+--------------------------
+Fixed, seeded inputs for the micro-benchmarks, so every run measures the
+same work regardless of machine or checkout.
+"""
+import io
+import json
+import random
+from PIL import Image, ImageDraw
+
+SEED = 1234
+
+
+def photo_image(width=2400, height=1600, seed=SEED):
+    """Photo-like RGB image: smooth gradients, shapes and fine noise"""
+    rng = random.Random(seed)
+    base = Image.merge("RGB", (
+        Image.linear_gradient("L").resize((width, height)),
+        Image.radial_gradient("L").resize((width, height)),
+        Image.linear_gradient("L").rotate(90).resize((width, height)),
+    ))
+    draw = ImageDraw.Draw(base)
+    for _ in range(60):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = x0 + rng.randrange(40, 400), y0 + rng.randrange(40, 400)
+        color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        if rng.random() < 0.5:
+            draw.ellipse([x0, y0, x1, y1], fill=color)
+        else:
+            draw.rectangle([x0, y0, x1, y1], fill=color)
+    noise = Image.frombytes("L", (width, height), rng.randbytes(width * height))
+    noise_rgb = Image.merge("RGB", (noise, noise, noise))
+    return Image.blend(base, noise_rgb, 0.08)
+
+
+def screenshot_image(width=1440, height=900, seed=SEED):
+    """Flat-color UI screenshot with text-like strokes (few distinct colors)"""
+    rng = random.Random(seed)
+    img = Image.new("RGB", (width, height), (245, 246, 248))
+    draw = ImageDraw.Draw(img)
+    palette = [(33, 37, 41), (13, 110, 253), (25, 135, 84), (220, 53, 69), (255, 255, 255), (108, 117, 125)]
+    draw.rectangle([0, 0, width, 56], fill=palette[1])
+    draw.rectangle([0, 56, 220, height], fill=(233, 236, 239))
+    for row in range(60, height - 20, 28):
+        x = 240
+        while x < width - 80:
+            word = rng.randrange(20, 90)
+            draw.rectangle([x, row + 8, x + word, row + 18], fill=rng.choice(palette))
+            x += word + rng.randrange(6, 14)
+    return img
+
+
+def animated_gif(width=480, height=320, frames=48, seed=SEED):
+    """Animated GIF: a screenshot background with a box moving across it"""
+    rng = random.Random(seed)
+    background = screenshot_image(width, height, seed)
+    images = []
+    for i in range(frames):
+        frame = background.copy()
+        x = i * (width - 60) // frames
+        y = height // 2 + rng.randrange(-4, 5)
+        ImageDraw.Draw(frame).rectangle([x, y, x + 60, y + 40], fill=(220, 53, 69))
+        images.append(frame)
+    return encoded(images[0], "GIF", save_all=True, append_images=images[1:], duration=40, loop=0)
+
+
+def encoded(img, format, **save_kwargs):
+    """Encode an image to bytes"""
+    buffer = io.BytesIO()
+    img.save(buffer, format=format, **save_kwargs)
+    return buffer.getvalue()
+
+
+def pdf_document(pages=20, seed=SEED):
+    """
+    Minimal multi-page PDF with text and vector shapes, built by hand so no
+    PDF library is needed to create benchmark inputs
+    """
+    rng = random.Random(seed)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page ids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for page in range(pages):
+        ops = [b"BT /F1 18 Tf 72 760 Td (Benchmark page %d) Tj ET" % (page + 1)]
+        for line in range(40):
+            words = " ".join(f"w{rng.randrange(10000)}" for _ in range(10))
+            ops.append(b"BT /F1 10 Tf 72 %d Td (%s) Tj ET" % (730 - line * 16, words.encode()))
+        for _ in range(20):
+            ops.append(b"%.3f %.3f %.3f rg %d %d %d %d re f" % (
+                rng.random(), rng.random(), rng.random(),
+                rng.randrange(500), rng.randrange(700), rng.randrange(20, 100), rng.randrange(20, 100)))
+        stream = b"\n".join(ops)
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def json_document(items=2000, seed=SEED):
+    """Compact JSON array of nested records"""
+    rng = random.Random(seed)
+    records = [
+        {
+            "id": i,
+            "sku": f"SKU-{rng.randrange(10**8):08d}",
+            "price": round(rng.random() * 500, 2),
+            "tags": [f"tag{rng.randrange(50)}" for _ in range(4)],
+            "dimensions": {"w": rng.randrange(100), "h": rng.randrange(100), "d": rng.randrange(100)},
+            "active": rng.random() < 0.8,
+        }
+        for i in range(items)
+    ]
+    return json.dumps(records, separators=(",", ":"))
+
+
+def xml_document(items=2000, seed=SEED):
+    """Unindented XML catalog"""
+    rng = random.Random(seed)
+    parts = ["<catalog>"]
+    for i in range(items):
+        parts.append(
+            f'<product id="{i}"><sku>SKU-{rng.randrange(10**8):08d}</sku>'
+            f"<price>{rng.random() * 500:.2f}</price>"
+            f'<dimensions w="{rng.randrange(100)}" h="{rng.randrange(100)}"/></product>'
+        )
+    parts.append("</catalog>")
+    return "".join(parts)
+
+
+def yaml_document(items=500, seed=SEED):
+    """Flow-style YAML (valid YAML that format_yaml rewrites to block style)"""
+    return json_document(items, seed)
+
+
+def markdown_document(sections=200, seed=SEED):
+    """Markdown with headings, lists, tables and fenced code"""
+    rng = random.Random(seed)
+    parts = []
+    for s in range(sections):
+        parts.append(f"## Section {s}\n")
+        parts.append(" ".join(f"word{rng.randrange(1000)}" for _ in range(60)) + " **bold** *em* `code`\n")
+        parts.append("\n".join(f"- item {rng.randrange(100)} [link](https://example.com/{s})" for _ in range(5)))
+        parts.append("\n| a | b | c |\n|---|---|---|\n| 1 | 2 | 3 |\n")
+        parts.append("```python\nprint('hello')\n```\n")
+    return "\n".join(parts)
+
+
+def javascript_source(functions=300, seed=SEED):
+    """Minified-looking JavaScript"""
+    rng = random.Random(seed)
+    return "".join(
+        f"function f{i}(a,b){{var c=a+b*{rng.randrange(100)};if(c>{rng.randrange(100)}){{return c}}"
+        f"else{{for(var j=0;j<10;j++){{c+=j}}return c}}}}"
+        for i in range(functions)
+    )
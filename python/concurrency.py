@@ -0,0 +1,216 @@
+"""
+Concurrency Limits & Load Shedding
+----------------------------------
+Routes are assigned to named concurrency classes. Each class admits at most
+``limit`` requests at a time and lets at most ``queue`` more wait for a
+slot; anything beyond that is rejected at once with 503 and a Retry-After
+header instead of piling up work (and memory) behind a saturated tool.
+Classes are independent, so a burst of model calls never delays the cheap
+endpoints.
+
+Default classes:
+    cpu-heavy          image/PDF/text processing in the process pool
+    model-inference    CarveKit background removal (the model worker pool)
+    outbound-network   calls to user-supplied URLs and hosts
+    llm                Gemini requests
+    trivial            cheap in-process endpoints
+
+Configuration (environment, JSON):
+    UTILIX_CONCURRENCY_CLASSES  per-class overrides, e.g.
+                                {"model-inference": {"limit": 1, "queue": 2, "timeout": 20}}
+    UTILIX_CONCURRENCY_ROUTES   route -> class overrides, e.g. {"/web-scraper": "llm"};
+                                a class of null removes the limit for that route
+
+``timeout`` is the longest a request waits in the queue before it is shed.
+"""
+import asyncio
+import json
+import math
+import os
+import time
+from typing import Dict, Optional
+
+from starlette.routing import Match
+
+from python.executor import CPU_WORKERS
+from python.metrics import registry
+
+DEFAULT_CLASSES = {
+    "cpu-heavy": {"limit": max(CPU_WORKERS, 1), "queue": 4 * max(CPU_WORKERS, 1), "timeout": 30.0},
+    "model-inference": {"limit": 2, "queue": 4, "timeout": 60.0},
+    "outbound-network": {"limit": 32, "queue": 64, "timeout": 10.0},
+    "llm": {"limit": 8, "queue": 16, "timeout": 30.0},
+    "trivial": {"limit": 256, "queue": 512, "timeout": 5.0},
+}
+
+
+def _env_json(name: str) -> dict:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return {}
+    try:
+        value = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"{name} is not valid JSON: {e}")
+    if not isinstance(value, dict):
+        raise ValueError(f"{name} must be a JSON object")
+    return value
+
+
+class Overloaded(Exception):
+    """Raised when a concurrency class cannot admit another request."""
+
+    def __init__(self, class_name: str, retry_after: int):
+        super().__init__(f"{class_name} is at capacity")
+        self.class_name = class_name
+        self.retry_after = retry_after
+
+
+class ConcurrencyClass:
+    """A max in-flight count with a bounded, time-limited wait queue."""
+
+    def __init__(self, name: str, limit: int, queue: int, timeout: float):
+        self.name = name
+        self.limit = max(int(limit), 1)
+        self.queue = max(int(queue), 0)
+        self.timeout = float(timeout)
+        self.in_flight = 0
+        self.waiting = 0
+        # Moving average of how long a request holds a slot, for Retry-After
+        self.avg_seconds = 1.0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _slots(self) -> asyncio.Semaphore:
+        # Created on first use so it belongs to the server's event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        return self._semaphore
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to be free for a new request."""
+        backlog = (self.waiting + self.in_flight) / self.limit
+        return max(1, math.ceil(backlog * self.avg_seconds))
+
+    def _reject(self) -> Overloaded:
+        registry.inc("utilix_concurrency_rejected_total", 1,
+                     "Requests shed because their concurrency class was full", **{"class": self.name})
+        return Overloaded(self.name, self.retry_after())
+
+    async def acquire(self) -> None:
+        """Take a slot, waiting in the queue if allowed; raise Overloaded otherwise."""
+        slots = self._slots()
+        if slots.locked() or self.waiting:
+            if self.waiting >= self.queue:
+                raise self._reject()
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(slots.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                raise self._reject()
+            finally:
+                self.waiting -= 1
+        else:
+            await slots.acquire()
+        self.in_flight += 1
+
+    def release(self, held_seconds: float) -> None:
+        self.in_flight -= 1
+        self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * held_seconds
+        self._slots().release()
+
+    def stats(self) -> Dict[str, float]:
+        return {"limit": self.limit, "queue": self.queue, "timeout": self.timeout,
+                "in_flight": self.in_flight, "waiting": self.waiting,
+                "avg_seconds": round(self.avg_seconds, 4)}
+
+
+class ConcurrencyLimiter:
+    """The configured classes and the route -> class assignment."""
+
+    def __init__(self, route_classes: Dict[str, Optional[str]]):
+        settings = {name: dict(values) for name, values in DEFAULT_CLASSES.items()}
+        for name, overrides in _env_json("UTILIX_CONCURRENCY_CLASSES").items():
+            settings.setdefault(name, dict(DEFAULT_CLASSES["cpu-heavy"])).update(overrides)
+        self.classes = {name: ConcurrencyClass(name, **values) for name, values in settings.items()}
+
+        self.routes = dict(route_classes)
+        self.routes.update(_env_json("UTILIX_CONCURRENCY_ROUTES"))
+        unknown = {c for c in self.routes.values() if c is not None and c not in self.classes}
+        if unknown:
+            raise ValueError(f"Routes refer to unknown concurrency classes: {', '.join(sorted(unknown))}")
+
+    def class_for(self, path: str) -> Optional[ConcurrencyClass]:
+        name = self.routes.get(path)
+        return self.classes[name] if name else None
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {name: c.stats() for name, c in self.classes.items()}
+
+    def gauges(self):
+        """In-flight, queued and limit per class, for the metrics registry."""
+        for name, c in self.classes.items():
+            labels = {"class": name}
+            yield "utilix_concurrency_in_flight", labels, c.in_flight
+            yield "utilix_concurrency_queue_depth", labels, c.waiting
+            yield "utilix_concurrency_limit", labels, c.limit
+
+
+class ConcurrencyMiddleware:
+    """
+    ASGI middleware applying the limiter to each request by route template.
+
+    The route is matched here (the router has not run yet), so limits are
+    keyed by the same path templates used in the metrics labels.
+    """
+
+    def __init__(self, app, limiter: ConcurrencyLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    @staticmethod
+    def _match_route(scope):
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        route = self._match_route(scope)
+        path = getattr(route, "path", None)
+        limit = self.limiter.class_for(path) if path else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await limit.acquire()
+        except Overloaded as e:
+            # The router never runs for shed requests; label their metrics here
+            scope["route"] = route
+            await self._reject(send, e)
+            return
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limit.release(time.perf_counter() - start)
+
+    @staticmethod
+    async def _reject(send, error: Overloaded) -> None:
+        body = json.dumps({"detail": f"Server busy ({error.class_name}), retry later",
+                           "retry_after": error.retry_after}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(error.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,204 @@
+"""
+Shared Executor Layer
+---------------------
+Runs blocking service calls off the event loop. CPU-bound tool work goes to a
+bounded process pool, blocking I/O (outbound HTTP, DNS, file access) goes to a
+thread pool.
+
+Model inference (background removal) goes to a third, separate process pool.
+Its workers are never recycled and run the UTILIX_MODEL_WARMUP hooks when
+they start, so model weights are loaded once per worker, before the first
+request, instead of once per call; keeping the model out of the CPU pool
+also means one copy in memory rather than one per CPU worker.
+
+Pool sizes are read from the environment:
+    UTILIX_CPU_WORKERS        processes for CPU-bound work (default: CPU count)
+    UTILIX_IO_WORKERS         threads for blocking I/O (default: 32)
+    UTILIX_CPU_START_METHOD   multiprocessing start method (default: spawn)
+    UTILIX_CPU_MAX_TASKS      recycle a worker after N tasks (default: unlimited)
+    UTILIX_MODEL_WORKERS      processes for model inference (default: 1)
+    UTILIX_MODEL_WARMUP       comma-separated module:function hooks model workers
+                              call at startup (default: the background removal
+                              model's warm_up_model; empty to load on first use)
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, List, Optional, Tuple
+
+from python.lazy_loader import load_module, warm_up, WARMUP_MODULES
+from python.metrics import record_service
+
+CPU_WORKERS = int(os.getenv("UTILIX_CPU_WORKERS", os.cpu_count() or 1))
+IO_WORKERS = int(os.getenv("UTILIX_IO_WORKERS", "32"))
+CPU_START_METHOD = os.getenv("UTILIX_CPU_START_METHOD", "spawn")
+CPU_MAX_TASKS = int(os.getenv("UTILIX_CPU_MAX_TASKS", "0")) or None
+MODEL_WORKERS = int(os.getenv("UTILIX_MODEL_WORKERS", "1"))
+MODEL_WARMUP = [h.strip() for h in os.getenv(
+    "UTILIX_MODEL_WARMUP", "python.imageGraphics.bgRemover:warm_up_model").split(",") if h.strip()]
+
+_cpu_pool: Optional[ProcessPoolExecutor] = None
+_io_pool: Optional[ThreadPoolExecutor] = None
+_model_pool: Optional[ProcessPoolExecutor] = None
+_model_in_flight = 0
+_lock = threading.Lock()
+
+
+def get_cpu_pool() -> ProcessPoolExecutor:
+    """Return the shared process pool, creating it on first use."""
+    global _cpu_pool
+    with _lock:
+        if _cpu_pool is None:
+            kwargs = {"max_workers": max(CPU_WORKERS, 1),
+                      "mp_context": multiprocessing.get_context(CPU_START_METHOD),
+                      # Workers import the warm-up modules before their first task
+                      "initializer": warm_up,
+                      "initargs": (WARMUP_MODULES,)}
+            # max_tasks_per_child is not allowed with the fork start method
+            if CPU_MAX_TASKS and CPU_START_METHOD != "fork":
+                kwargs["max_tasks_per_child"] = CPU_MAX_TASKS
+            _cpu_pool = ProcessPoolExecutor(**kwargs)
+        return _cpu_pool
+
+
+def _init_model_worker(modules: List[str], hooks: List[str]) -> None:
+    """Model worker initializer: import the warm-up modules, then run the warm-up hooks."""
+    warm_up(modules)
+    for hook in hooks:
+        module, _, name = hook.partition(":")
+        try:
+            getattr(load_module(module), name)()
+        except Exception as e:
+            # An initializer that raises breaks the whole pool; report instead
+            print(f"Model warm-up {hook} failed: {e}")
+
+
+def get_model_pool() -> ProcessPoolExecutor:
+    """Return the model inference pool, creating it on first use."""
+    global _model_pool
+    with _lock:
+        if _model_pool is None:
+            # No max_tasks_per_child: recycling a worker would throw its model away
+            _model_pool = ProcessPoolExecutor(max_workers=max(MODEL_WORKERS, 1),
+                                              mp_context=multiprocessing.get_context(CPU_START_METHOD),
+                                              initializer=_init_model_worker,
+                                              initargs=(WARMUP_MODULES, MODEL_WARMUP))
+        return _model_pool
+
+
+def get_io_pool() -> ThreadPoolExecutor:
+    """Return the shared thread pool, creating it on first use."""
+    global _io_pool
+    with _lock:
+        if _io_pool is None:
+            _io_pool = ThreadPoolExecutor(max_workers=max(IO_WORKERS, 1),
+                                          thread_name_prefix="utilix-io")
+        return _io_pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken process pool so the next call starts a fresh one."""
+    global _cpu_pool, _model_pool
+    with _lock:
+        if _cpu_pool is pool:
+            _cpu_pool = None
+        if _model_pool is pool:
+            _model_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _timed_call(func: Callable[..., Any], args: tuple, kwargs: dict) -> Tuple[Any, float]:
+    """Run func inside the worker and return its result with its run time."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+async def _submit(pool_name: str, pool, func: Callable[..., Any], args: tuple, kwargs: dict) -> Tuple[Any, float]:
+    """
+    Submit a call to a pool and record service time and queueing overhead.
+
+    Returns:
+        (result, seconds func ran in the worker)
+    """
+    loop = asyncio.get_running_loop()
+    name = getattr(func, "__qualname__", None) or getattr(func, "__name__", repr(func))
+    start = time.perf_counter()
+    try:
+        result, elapsed = await loop.run_in_executor(pool, _timed_call, func, args, kwargs)
+    except Exception:
+        record_service(name, pool_name, time.perf_counter() - start, 0.0, ok=False)
+        raise
+    record_service(name, pool_name, elapsed, time.perf_counter() - start - elapsed, ok=True)
+    return result, elapsed
+
+
+async def run_cpu(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a CPU-bound function in the process pool and await its result.
+
+    The function and its arguments must be picklable, so pass module-level
+    functions and plain data (paths, bytes, numbers, strings).
+    """
+    result, _ = await run_cpu_timed(func, *args, **kwargs)
+    return result
+
+
+async def run_cpu_timed(func: Callable[..., Any], *args, **kwargs) -> Tuple[Any, float]:
+    """
+    Like run_cpu, but also return how long the function ran in the worker
+    (excluding queueing and transfer), e.g. to report encode times.
+    """
+    pool = get_cpu_pool()
+    try:
+        return await _submit("cpu", pool, func, args, kwargs)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM-killed); replace the pool for later requests
+        _discard_pool(pool)
+        raise
+
+
+async def run_model(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a model inference function in the model pool and await its result.
+
+    Same rules as run_cpu; the worker keeps models loaded between calls.
+    """
+    global _model_in_flight
+    pool = get_model_pool()
+    _model_in_flight += 1
+    try:
+        result, _ = await _submit("model", pool, func, args, kwargs)
+        return result
+    except BrokenProcessPool:
+        # The worker died (e.g. OOM-killed); the next call starts and warms a new one
+        _discard_pool(pool)
+        raise
+    finally:
+        _model_in_flight -= 1
+
+
+def model_pool_busy() -> bool:
+    """True while any run_model call is queued or running."""
+    return _model_in_flight > 0
+
+
+async def run_io(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking I/O function in the thread pool and await its result."""
+    result, _ = await _submit("io", get_io_pool(), func, args, kwargs)
+    return result
+
+
+def shutdown_pools(wait: bool = True) -> None:
+    """Shut down all pools. Called from the FastAPI lifespan on exit."""
+    global _cpu_pool, _io_pool, _model_pool
+    with _lock:
+        pools = (_cpu_pool, _model_pool, _io_pool)
+        _cpu_pool = _io_pool = _model_pool = None
+    for pool in pools:
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
@@ -1,12 +1,14 @@
+import io
 import os
 from PIL import Image, ImageDraw, ImageFont
 import barcode
 from barcode.writer import ImageWriter
+from python.imageGraphics.imageBuffers import encode_image
 
 def generate_barcode(data, symbology="code128", filename=None, text_show=True,
                      color="black", bg_color="white", transparent=False, 
                      border_style=None, border_width=4, border_color=None,
-                     width=300, height=100, quiet_zone=True):
+                     width=300, height=100, quiet_zone=True, as_bytes=False):
     """
     Generate a customized barcode
     
@@ -24,6 +26,7 @@ def generate_barcode(data, symbology="code128", filename=None, text_show=True,
         width: Barcode width (default: 300)
         height: Barcode height (default: 100)
         quiet_zone: Include quiet zone (default: True)
+        as_bytes: Return the PNG as bytes instead of writing a file (default: False)
     """
     # Set default filename if none provided
     if not filename:
@@ -83,11 +86,13 @@ def generate_barcode(data, symbology="code128", filename=None, text_show=True,
         # Create the barcode
         barcode_image = barcode_class(data, writer=ImageWriter())
         
-        # Save the barcode with given options
-        temp_filename = barcode_image.save('temp_barcode', options=writer_options)
+        # Render the barcode in memory with given options
+        rendered = io.BytesIO()
+        barcode_image.write(rendered, options=writer_options)
+        rendered.seek(0)
         
         # Open the generated image
-        img = Image.open(temp_filename)
+        img = Image.open(rendered)
         
         # Resize to specified dimensions, maintaining aspect ratio
         if width and height:
@@ -155,13 +160,11 @@ def generate_barcode(data, symbology="code128", filename=None, text_show=True,
             
             img = bordered_img
         
-        # Save the final image
+        # Return the encoded barcode, or save the final image
+        if as_bytes:
+            return encode_image(img, "PNG")
         img.save(filename)
         
-        # Remove temporary file
-        if os.path.exists(temp_filename):
-            os.remove(temp_filename)
-        
         print(f"Barcode created successfully: {filename}")
         return filename
         
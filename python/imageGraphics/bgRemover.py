@@ -1,41 +1,250 @@
+"""
+Background Removal
+------------------
+CarveKit segmentation + matting. Building a HiInterface loads both models'
+weights from disk, so each process builds one interface per distinct set of
+settings, on first use, and keeps it: after that a call costs only the
+inference. The server runs these calls in a dedicated model worker whose
+initializer calls warm_up_model (see python/executor.py), so the weights are
+loaded, and a first inference has run, before any request arrives.
+
+A cached interface is released again when it has been idle for
+UTILIX_MODEL_IDLE_SECONDS while the machine is under memory pressure (less
+than UTILIX_MODEL_MIN_AVAILABLE_MB available, per /proc/meminfo; where that
+cannot be read, idleness alone releases it). The next call reloads it.
+
+    remove_background("photo.jpg")                      # writes photo_no_bg.png
+    remove_background(data, as_bytes=True)              # PNG bytes
+    remove_background(data, as_bytes=True, settings={"seg_mask_size": 640})
+
+Configuration (environment):
+    UTILIX_MODEL_IDLE_SECONDS      idle time before a loaded model may be released (default: 600; 0 = never)
+    UTILIX_MODEL_MIN_AVAILABLE_MB  available memory below which idle models are released (default: 1024)
+"""
 import os
 import argparse
+import gc
+import threading
+import time
 from PIL import Image
 from carvekit.api.high import HiInterface
+from python.imageGraphics.imageBuffers import is_path, open_image, encode_image
+
+# HiInterface settings remove_background uses unless overridden
+DEFAULT_SETTINGS = {
+    "object_type": "auto",            # Auto-detect if it's a human or object
+    "seg_mask_size": 1024,            # Higher resolution mask
+    "trimap_prob_threshold": 231,
+    "trimap_dilation": 30,
+    "trimap_erosion_iters": 5,
+    # model_type removed - not supported in your CarveKit version
+}
+
+MODEL_IDLE_SECONDS = float(os.getenv("UTILIX_MODEL_IDLE_SECONDS", "600"))
+MODEL_MIN_AVAILABLE_MB = int(os.getenv("UTILIX_MODEL_MIN_AVAILABLE_MB", "1024"))
+
+# How often the idle check runs while a model is loaded (seconds)
+IDLE_CHECK_INTERVAL = min(30.0, MODEL_IDLE_SECONDS) if MODEL_IDLE_SECONDS > 0 else 0
+
+# Interfaces of this process by settings; _lock is held while one is built,
+# used or released, so the idle check never frees a model mid-inference
+_interfaces = {}
+_lock = threading.RLock()
+_stats = {"loads": 0, "releases": 0, "load_seconds": None, "warmup_seconds": None,
+          "last_used": None, "error": None}
+_idle_checker = None
+
+
+def _settings_key(settings):
+    return tuple(sorted(settings.items()))
+
+
+def resolve_settings(settings=None):
+    """DEFAULT_SETTINGS overridden by settings, with the device filled in"""
+    resolved = {**DEFAULT_SETTINGS, **(settings or {})}
+    if not resolved.get("device"):
+        resolved["device"] = "cuda" if is_cuda_available() else "cpu"  # Auto-detect GPU
+    return resolved
+
+
+def get_interface(settings=None):
+    """
+    The HiInterface for these settings, built on first use and then reused
+
+    Args:
+        settings (dict, optional): HiInterface arguments overriding DEFAULT_SETTINGS
+
+    Returns:
+        HiInterface: Shared by every call in this process with the same settings
+    """
+    settings = resolve_settings(settings)
+    key = _settings_key(settings)
+    with _lock:
+        interface = _interfaces.get(key)
+        if interface is None:
+            start = time.perf_counter()
+            interface = HiInterface(**settings)
+            _stats["load_seconds"] = round(time.perf_counter() - start, 3)
+            _stats["loads"] += 1
+            _interfaces[key] = interface
+            print(f"Loaded background removal model on {settings['device']} in {_stats['load_seconds']:.2f}s")
+            _start_idle_checker()
+        _stats["last_used"] = time.monotonic()
+        return interface
 
-def remove_background(image_path, output_path=None, output_format="png"):
+
+def release_interfaces():
+    """
+    Drop every cached interface and free the memory its weights held
+
+    Returns:
+        int: Number of interfaces released
+    """
+    with _lock:
+        released = len(_interfaces)
+        _interfaces.clear()
+        if released:
+            _stats["releases"] += released
+            gc.collect()
+            if is_cuda_available():
+                import torch
+                torch.cuda.empty_cache()
+    return released
+
+
+def available_memory_mb():
+    """MemAvailable from /proc/meminfo in MB, or None where it cannot be read"""
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def under_memory_pressure():
+    """True if available memory is below MODEL_MIN_AVAILABLE_MB (or unknown)"""
+    available = available_memory_mb()
+    return available is None or available < MODEL_MIN_AVAILABLE_MB
+
+
+def _idle_seconds():
+    last_used = _stats["last_used"]
+    return None if last_used is None else time.monotonic() - last_used
+
+
+def _check_idle():
+    """Release the models if they have been idle too long under memory pressure; False once none are loaded"""
+    with _lock:
+        if not _interfaces:
+            return False
+        idle = _idle_seconds()
+        if idle is not None and idle >= MODEL_IDLE_SECONDS and under_memory_pressure():
+            count = release_interfaces()
+            print(f"Released {count} idle background removal model(s) after {idle:.0f}s (memory pressure)")
+            return False
+        return True
+
+
+def _idle_loop():
+    global _idle_checker
+    while True:
+        time.sleep(IDLE_CHECK_INTERVAL)
+        with _lock:
+            if not _check_idle():
+                _idle_checker = None
+                return
+
+
+def _start_idle_checker():
+    global _idle_checker
+    if IDLE_CHECK_INTERVAL and _idle_checker is None:
+        _idle_checker = threading.Thread(target=_idle_loop, name="utilix-model-idle", daemon=True)
+        _idle_checker.start()
+
+
+def warm_up_model(settings=None):
+    """
+    Load the model and run one small inference, so the first request pays neither
+
+    Used as a worker initializer, so failures are reported (and kept for
+    model_status), not raised.
+
+    Returns:
+        bool: True if the model is ready
+    """
+    start = time.perf_counter()
+    try:
+        with _lock:
+            get_interface(settings)([Image.new("RGB", (64, 64), "white")])
+    except Exception as e:
+        _stats["error"] = str(e)
+        print(f"❌ Background removal model warm-up failed: {e}")
+        return False
+    _stats["error"] = None
+    _stats["warmup_seconds"] = round(time.perf_counter() - start, 3)
+    print(f"Background removal model warm in {_stats['warmup_seconds']:.2f}s")
+    return True
+
+
+def model_status():
+    """
+    Model state of this process, for health checks
+
+    Returns:
+        dict: loaded, the devices and number of cached interfaces, load and
+        warm-up times (s), idle_seconds, loads/releases so far, available_mb
+        and the last warm-up error
+    """
+    with _lock:
+        idle = _idle_seconds()
+        return {
+            "pid": os.getpid(),
+            "loaded": bool(_interfaces),
+            "interfaces": len(_interfaces),
+            "devices": sorted({dict(key)["device"] for key in _interfaces}),
+            "load_seconds": _stats["load_seconds"],
+            "warmup_seconds": _stats["warmup_seconds"],
+            "idle_seconds": None if idle is None else round(idle, 1),
+            "loads": _stats["loads"],
+            "releases": _stats["releases"],
+            "idle_release_seconds": MODEL_IDLE_SECONDS or None,
+            "available_mb": available_memory_mb(),
+            "error": _stats["error"],
+        }
+
+
+def remove_background(image_path, output_path=None, output_format="png", as_bytes=False, settings=None):
     """
     Remove background from an image using CarveKit.
     
     Args:
-        image_path (str): Path to the input image
+        image_path (str | bytes | file-like): Path to the input image, or its bytes / a binary file object
         output_path (str, optional): Custom output path. If None, will use input filename with _no_bg suffix
         output_format (str, optional): Output format (png recommended for transparency)
+        as_bytes (bool, optional): Return the encoded result as bytes instead of writing a file
+        settings (dict, optional): HiInterface arguments overriding DEFAULT_SETTINGS; each
+            distinct set gets its own cached interface
     
     Returns:
-        str: Path to the saved output image
+        str | bytes: Path to the saved output image, or its bytes when as_bytes is set
     """
     # Create output path if not specified
-    if output_path is None:
-        input_filename = os.path.basename(image_path)
+    if output_path is None and not as_bytes:
+        input_filename = os.path.basename(image_path) if is_path(image_path) else "image"
         filename_no_ext = os.path.splitext(input_filename)[0]
         output_path = f"{filename_no_ext}_no_bg.{output_format}"
     
     try:
-        # Initialize with compatible parameters
-        interface = HiInterface(
-            object_type="auto",            # Auto-detect if it's a human or object
-            seg_mask_size=1024,            # Higher resolution mask
-            trimap_prob_threshold=231,     
-            trimap_dilation=30,
-            trimap_erosion_iters=5,
-            # model_type removed - not supported in your CarveKit version
-            device="cuda" if is_cuda_available() else "cpu"  # Auto-detect GPU
-        )
-        
-        # Process the image
-        image = Image.open(image_path).convert("RGB")
-        result = interface([image])[0]
+        # Decode outside the lock; only the inference needs the model
+        image = open_image(image_path).convert("RGB")
+        with _lock:
+            result = get_interface(settings)([image])[0]
+            _stats["last_used"] = time.monotonic()
+        if as_bytes:
+            return encode_image(result, output_format.upper())
         result.save(output_path)
         print(f"✅ Background removed successfully: {output_path}")
         return output_path
@@ -44,14 +253,19 @@ def remove_background(image_path, output_path=None, output_format="png"):
         print(f"❌ Error: {str(e)}")
         return None
 
+_cuda_available = None
+
 def is_cuda_available():
-    """Check if CUDA is available without importing torch directly"""
-    try:
-        # Only import torch if it's already installed
-        import torch
-        return torch.cuda.is_available()
-    except ImportError:
-        return False
+    """Check if CUDA is available without importing torch directly (checked once per process)"""
+    global _cuda_available
+    if _cuda_available is None:
+        try:
+            # Only import torch if it's already installed
+            import torch
+            _cuda_available = torch.cuda.is_available()
+        except ImportError:
+            _cuda_available = False
+    return _cuda_available
 
 def process_batch(directory, output_dir=None):
     """Process all images in a directory"""
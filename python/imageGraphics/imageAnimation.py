@@ -0,0 +1,360 @@
+"""
+Animated Images
+---------------
+Multi-frame GIF and WebP conversion. Frames are decoded one at a time with
+ImageSequence and resized as they are read, so only the frame being encoded
+(and, for GIF, the previous one) is held in memory instead of the whole
+animation.
+
+Inputs are read twice: a first pass collects frame durations, whether any
+frame is transparent and a sample of pixels for the palette, and the second
+pass encodes. Decoding is cheap next to encoding, and the first pass keeps no
+frames.
+
+GIF output is written frame by frame:
+    - one global palette of up to 255 colors, quantized from pixels sampled
+      across the animation, is shared by every frame; index 255 is reserved
+      for transparency
+    - each frame is cropped to the bounding box of the pixels that changed
+      since the previous one, and unchanged pixels inside the box are made
+      transparent so the previous frame shows through (LZW compresses them to
+      long runs)
+    - consecutive identical frames are merged into one with the summed duration
+A frame drawn over the previous one cannot make a pixel transparent again, so
+when a frame clears pixels the frame before it is disposed to transparent
+(widened to the whole canvas if the cleared pixels lie outside it).
+
+WebP output goes through libwebp's animation encoder, which does its own
+sub-frame cropping (minimize_size) and picks lossy or lossless per frame
+(allow_mixed). That cropping can leave transparent animations without the
+alpha flag (key frames are cropped to their opaque area, so no frame holds
+alpha), and decoders then show the transparent canvas as black; for those,
+minimize_size is not used and the flag is set on the finished file. Pillow's WebP writer makes a list of append_images, so the
+frames after the first are passed as one lazy FrameStream.
+
+    if is_animated(img):
+        save_animation(img, "out.webp", "WEBP", quality=80, size=(320, 240))
+"""
+import io
+
+import numpy as np
+from PIL import GifImagePlugin, Image, ImageSequence
+
+from python.imageGraphics.imageBuffers import resize_image
+
+# Output formats that keep every frame of an animated input
+ANIMATED_FORMATS = ["GIF", "WEBP"]
+
+# Palette index of transparent GIF pixels
+TRANSPARENT = 255
+
+# Alpha below which a pixel is transparent in GIF output
+ALPHA_THRESHOLD = 128
+
+# Largest number of frames, and pixels per frame, sampled for the GIF palette
+PALETTE_SAMPLE_FRAMES = 32
+PALETTE_SAMPLE_PIXELS = 64 * 1024
+
+# Frame duration (ms) used when the input has none
+DEFAULT_DURATION = 100
+
+# Offset of the VP8X feature flags in a WebP file, and the alpha flag
+VP8X_FLAGS = 20
+VP8X_ALPHA = 0x10
+
+
+def is_animated(img):
+    """True if img has more than one frame"""
+    return getattr(img, "is_animated", False) and getattr(img, "n_frames", 1) > 1
+
+
+def _frame_has_alpha(frame):
+    return frame.mode in ("RGBA", "LA", "PA") or "transparency" in frame.info
+
+
+def iter_frames(img, size=None, alpha=False):
+    """
+    Decode the frames of an animation one at a time
+
+    Args:
+        img: Animated PIL Image
+        size: (width, height) each frame is resized to (optional)
+        alpha: Return RGBA frames instead of RGB
+
+    Yields:
+        (frame, duration in ms); the frame is a new RGB/RGBA image
+    """
+    mode = "RGBA" if alpha else "RGB"
+    for frame in ImageSequence.Iterator(img):
+        duration = frame.info.get("duration") or DEFAULT_DURATION
+        frame = frame.convert(mode)
+        if size and tuple(size) != frame.size:
+            frame = resize_image(frame, size)
+        yield frame, duration
+
+
+def scan_frames(img, sample_palette=False):
+    """
+    First pass over an animation
+
+    Args:
+        img: Animated PIL Image
+        sample_palette: Also collect opaque pixels for a shared palette
+
+    Returns:
+        dict with "durations" (ms per frame), "alpha" (any transparent pixel)
+        and "samples" (RGB pixels as an (n, 3) uint8 array, or None)
+    """
+    durations = []
+    alpha = False
+    samples = []
+    step = 1
+    for index, frame in enumerate(ImageSequence.Iterator(img)):
+        durations.append(frame.info.get("duration") or DEFAULT_DURATION)
+        has_alpha = _frame_has_alpha(frame)
+        if not (sample_palette or has_alpha):
+            continue
+        rgba = np.asarray(frame.convert("RGBA" if has_alpha else "RGB"))
+        opaque = rgba[..., 3] >= ALPHA_THRESHOLD if has_alpha else None
+        if opaque is not None and not opaque.all():
+            alpha = True
+        if not sample_palette or index % step:
+            continue
+        pixels = rgba[..., :3][opaque] if opaque is not None else rgba.reshape(-1, 3)
+        if len(pixels) > PALETTE_SAMPLE_PIXELS:
+            pixels = pixels[::len(pixels) // PALETTE_SAMPLE_PIXELS + 1]
+        samples.append(pixels)
+        if len(samples) == PALETTE_SAMPLE_FRAMES:
+            # Keep every other sample and halve the sampling rate from here on
+            samples = samples[::2]
+            step *= 2
+    return {
+        "durations": durations,
+        "alpha": alpha,
+        "samples": np.concatenate(samples) if samples else None,
+    }
+
+
+def shared_palette(samples, colors=TRANSPARENT):
+    """
+    Palette for a whole animation
+
+    Args:
+        samples: (n, 3) uint8 array of RGB pixels
+        colors: Largest number of colors (default: 255, leaving the
+            transparent index free)
+
+    Returns:
+        P-mode image carrying the palette, for Image.quantize(palette=...)
+    """
+    if samples is None or not len(samples):
+        samples = np.zeros((1, 3), dtype=np.uint8)
+    strip = Image.fromarray(np.ascontiguousarray(samples).reshape(-1, 1, 3), "RGB")
+    quantized = strip.quantize(colors, method=Image.Quantize.MEDIANCUT)
+    palette = Image.new("P", (1, 1))
+    palette.putpalette(quantized.getpalette()[:colors * 3])
+    return palette
+
+
+def _indices(frame, palette, dither):
+    """Palette indices of an RGB/RGBA frame as a uint8 array"""
+    rgb = frame.convert("RGB") if frame.mode == "RGBA" else frame
+    quantized = rgb.quantize(palette=palette, dither=Image.Dither.FLOYDSTEINBERG if dither else Image.Dither.NONE)
+    indices = np.array(quantized, dtype=np.uint8)
+    if frame.mode == "RGBA":
+        indices[np.asarray(frame.getchannel("A")) < ALPHA_THRESHOLD] = TRANSPARENT
+    return indices
+
+
+def _changed_box(indices, previous):
+    """(left, top, right, bottom) of the pixels that differ, or None"""
+    changed = indices != previous
+    rows = np.flatnonzero(changed.any(axis=1))
+    if not len(rows):
+        return None
+    cols = np.flatnonzero(changed.any(axis=0))
+    return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
+
+
+def write_gif(img, fp, size=None, crop=True, dither=False):
+    """
+    Write an animation as an optimized GIF, one frame at a time
+
+    Args:
+        img: Animated PIL Image
+        fp: Binary file object the GIF is written to
+        size: (width, height) each frame is resized to (optional)
+        crop: Store only the region of each frame that changed (default:
+            True); otherwise every frame is stored whole
+        dither: Floyd-Steinberg dither frames to the shared palette; off by
+            default, as dither noise differs between frames and defeats crop
+
+    Returns:
+        Number of frames written (after merging identical frames)
+    """
+    scan = scan_frames(img, sample_palette=True)
+    palette = shared_palette(scan["samples"])
+    palette_bytes = palette.getpalette()
+    palette_bytes += [0] * (768 - len(palette_bytes))
+
+    def frame_image(indices):
+        return Image.frombytes("P", (indices.shape[1], indices.shape[0]), indices.tobytes())
+
+    written = 0
+    previous = None  # palette indices on screen once the pending frame is drawn
+    pending = None  # {"indices", "offset", "duration", "disposal"} of the frame not yet written
+
+    def flush():
+        nonlocal written
+        if written == 0:
+            first = frame_image(pending["indices"])
+            first.putpalette(palette_bytes)
+            info = {"duration": pending["duration"], "background": 0}
+            if img.info.get("loop") is not None:
+                info["loop"] = img.info["loop"]
+            header, _ = GifImagePlugin.getheader(first, info=info)
+            for block in header:
+                fp.write(block)
+        for block in GifImagePlugin.getdata(frame_image(pending["indices"]), pending["offset"],
+                                            duration=pending["duration"], disposal=pending["disposal"],
+                                            transparency=TRANSPARENT):
+            fp.write(block)
+        written += 1
+
+    for frame, duration in iter_frames(img, size, alpha=scan["alpha"]):
+        indices = _indices(frame, palette, dither)
+        if previous is None or not crop:
+            if pending is not None:
+                if np.array_equal(indices, previous):
+                    pending["duration"] += duration
+                    continue
+                flush()
+            # Whole frames (all of them without crop) clear the canvas after
+            # showing, so the next one can uncover transparency
+            pending = {"indices": indices, "offset": (0, 0), "duration": duration, "disposal": 1 if crop else 2}
+            previous = indices
+            continue
+
+        box = _changed_box(indices, previous)
+        if box is None:
+            # Same picture as the frame before: show that one for longer
+            pending["duration"] += duration
+            continue
+
+        canvas = previous
+        cleared = (indices == TRANSPARENT) & (previous != TRANSPARENT)
+        if cleared.any():
+            # Restore the pending frame's area to transparent once it has been shown
+            left, top = pending["offset"]
+            height, width = pending["indices"].shape
+            outside = cleared.copy()
+            outside[top:top + height, left:left + width] = False
+            if outside.any():
+                pending["indices"], pending["offset"] = previous, (0, 0)
+                left, top, height, width = 0, 0, *previous.shape
+            pending["disposal"] = 2
+            canvas = previous.copy()
+            canvas[top:top + height, left:left + width] = TRANSPARENT
+            box = _changed_box(indices, canvas) or (0, 0, 1, 1)
+        flush()
+
+        left, top, right, bottom = box
+        patch = indices[top:bottom, left:right].copy()
+        patch[patch == canvas[top:bottom, left:right]] = TRANSPARENT
+        pending = {"indices": patch, "offset": (left, top), "duration": duration, "disposal": 1}
+        previous = indices
+    if pending is not None:
+        flush()
+    fp.write(b";")
+    return written
+
+
+class FrameStream:
+    """
+    Lazy multi-frame image over an iterator of frames
+
+    Stands in for a list of images in Pillow's append_images: seek(n) decodes
+    up to frame n, which must not be behind the current frame, and other
+    attributes are those of the current frame.
+    """
+
+    def __init__(self, frames, n_frames):
+        self._frames = iter(frames)
+        self._frame = None
+        self._index = -1
+        self.n_frames = n_frames
+
+    def seek(self, index):
+        if index < self._index:
+            raise EOFError("FrameStream cannot seek backwards")
+        while self._index < index:
+            self._frame = next(self._frames)
+            self._index += 1
+
+    def tell(self):
+        return self._index
+
+    def __getattr__(self, name):
+        if self._frame is None:
+            self.seek(0)
+        return getattr(self._frame, name)
+
+
+def write_webp(img, fp, size=None, quality=80, lossless=False, method=4):
+    """
+    Write an animation as an animated WebP
+
+    Args:
+        img: Animated PIL Image
+        fp: Binary file object the WebP is written to
+        size: (width, height) each frame is resized to (optional)
+        quality: Quality of lossy frames (1-100)
+        lossless: Encode every frame losslessly instead of choosing per frame
+        method: libwebp effort (0-6)
+
+    Returns:
+        Number of frames written
+    """
+    scan = scan_frames(img)
+    durations = scan["durations"]
+    frames = (frame for frame, _ in iter_frames(img, size, alpha=scan["alpha"]))
+    first = next(frames)
+    rest = FrameStream(frames, len(durations) - 1)
+    output = io.BytesIO()
+    first.save(
+        output, format="WEBP", save_all=True, append_images=[rest] if rest.n_frames else [],
+        duration=durations, loop=img.info.get("loop", 0), quality=quality,
+        lossless=lossless, allow_mixed=not lossless, minimize_size=not scan["alpha"], method=method,
+    )
+    data = output.getbuffer()
+    if scan["alpha"] and data[12:16] == b"VP8X":
+        # The canvas outside each frame is transparent; say so even if no frame holds alpha
+        data[VP8X_FLAGS] |= VP8X_ALPHA
+    fp.write(data)
+    return len(durations)
+
+
+def save_animation(img, fp, output_format, quality=95, size=None, crop=True):
+    """
+    Convert an animated image, keeping every frame
+
+    Args:
+        img: Animated PIL Image
+        fp: Binary file object the output is written to
+        output_format: GIF or WEBP
+        quality: WebP quality (1-100); GIF output is always 255 colors
+        size: (width, height) each frame is resized to (optional)
+        crop: For GIF, store only the changed region of each frame (default: True)
+
+    Returns:
+        Number of frames written
+
+    Raises:
+        ValueError: If output_format is not an animated format
+    """
+    output_format = output_format.upper()
+    if output_format == "GIF":
+        return write_gif(img, fp, size, crop=crop)
+    if output_format == "WEBP":
+        return write_webp(img, fp, size, quality=quality)
+    raise ValueError(f"{output_format} cannot hold an animation; use one of {', '.join(ANIMATED_FORMATS)}")
@@ -0,0 +1,406 @@
+"""
+Incremental Batch Conversion
+----------------------------
+Non-interactive directory conversion for asset pipelines. A manifest in the
+output directory records, for every converted source, its size, mtime and
+SHA-256 along with the conversion parameters and the output file, so a
+re-run only converts images that are new or changed:
+    - size, mtime and parameters unchanged: skipped without reading the file
+    - size or mtime changed: the worker hashes the file first and only
+      converts it if the content differs (a touched file costs one read)
+    - parameters changed (format, quality, resize): converted again
+Sources that fail keep the entry of their last good conversion, if any, and
+are retried on the next run.
+
+Conversions run in a process pool; workers read, hash, convert and write
+the output themselves, so only small result records come back. Progress and
+throughput are printed every few seconds, and the manifest is saved
+periodically so an interrupted run keeps its progress. With --metrics, the
+SSIM and PSNR of every output are stored in its manifest entry and
+summarized at the end.
+
+Usage (from the repository root):
+    python -m python.imageGraphics.imageConvertor assets/ -o public/img -f webp -q 80 --resize 1600x1600 -j 8 -r
+    python -m python.imageGraphics.imageBatch assets/ -o public/img -f auto --resize 50
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from python.imageGraphics.imageConvertor import convert_image, is_image_name, output_name
+
+# Manifest file kept in the output directory
+MANIFEST_NAME = ".utilix-manifest.json"
+MANIFEST_VERSION = 1
+
+# Seconds between progress lines, and between manifest saves
+PROGRESS_INTERVAL = 5.0
+MANIFEST_SAVE_INTERVAL = 30.0
+
+# Output formats accepted by --format
+CLI_FORMATS = ["JPEG", "PNG", "WEBP", "GIF", "BMP", "TIFF", "ICO", "AUTO"]
+
+
+def parse_resize(value):
+    """
+    Parse a --resize value
+
+    Args:
+        value: "WIDTHxHEIGHT" or a percentage ("50" or "50%")
+
+    Returns:
+        (width, height) tuple or a float percentage
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is malformed
+    """
+    try:
+        if "x" in value.lower():
+            width, height = (int(part) for part in value.lower().split("x"))
+            if width > 0 and height > 0:
+                return (width, height)
+        else:
+            percentage = float(value.rstrip("%"))
+            if percentage > 0:
+                return percentage
+    except ValueError:
+        pass
+    raise argparse.ArgumentTypeError(f"Invalid resize {value!r}: use WIDTHxHEIGHT or a percentage")
+
+
+def load_manifest(path):
+    """Entries of the manifest at path, or an empty dict if there is none"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable manifest {path}: {e}")
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("entries", {})
+
+
+def save_manifest(path, entries):
+    """Write the manifest atomically (temporary file, then rename)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "entries": entries}, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def iter_sources(input_dir, recursive=False, exclude=()):
+    """
+    Find the images of a directory
+
+    Args:
+        input_dir: Directory to scan
+        recursive: Also scan subdirectories
+        exclude: Absolute directory paths to skip (e.g. the output directory)
+
+    Yields:
+        (relative path with "/" separators, os.stat_result), in sorted order
+    """
+    stack = [""]
+    while stack:
+        relative_dir = stack.pop()
+        directory = os.path.join(input_dir, relative_dir)
+        subdirs = []
+        with os.scandir(directory) as entries:
+            for entry in sorted(entries, key=lambda e: e.name):
+                relative = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive and os.path.abspath(entry.path) not in exclude:
+                        subdirs.append(relative)
+                elif entry.is_file() and is_image_name(entry.name):
+                    yield relative, entry.stat()
+        stack.extend(reversed(subdirs))
+
+
+def _convert_file(source, output_dir, relative, params, known=None, metrics=False):
+    """
+    Convert one source file into the output tree (runs in a worker process)
+
+    Args:
+        source: Path to the source image
+        output_dir: Root of the output tree
+        relative: Source path relative to the input directory
+        params: {"format", "quality", "resize"}
+        known: Manifest entry of the source from the last run, if any
+        metrics: Measure SSIM and PSNR of the output (see quality_metrics)
+
+    Returns:
+        dict with "sha256", "output" (relative to output_dir), "converted"
+        (False if the content turned out unchanged), the byte counts and,
+        with metrics, "metrics"
+
+    Raises:
+        ValueError: If the image could not be converted, or the output
+            would replace the source
+    """
+    with open(source, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    if (known and known.get("sha256") == digest and known.get("params") == params
+            and os.path.exists(os.path.join(output_dir, known["output"]))):
+        return {"sha256": digest, "output": known["output"], "converted": False,
+                "bytes_in": len(data), "bytes_out": 0}
+
+    resize = tuple(params["resize"]) if isinstance(params["resize"], list) else params["resize"]
+    result = convert_image(data, output_format=params["format"], quality=params["quality"],
+                           resize=resize, as_bytes=True, metrics=metrics)
+    fmt = params["format"]
+    measured = None
+    if fmt == "AUTO" and result:
+        # (bytes, report) of the format that won
+        result, report = result
+        fmt = report["format"]
+        measured = report.get("metrics")
+    elif metrics and result:
+        result, measured = result
+    if not result:
+        raise ValueError("conversion failed")
+
+    relative_dir = os.path.dirname(relative)
+    output = f"{relative_dir}/{output_name(relative, fmt)}" if relative_dir else output_name(relative, fmt)
+    destination = os.path.join(output_dir, output)
+    if os.path.abspath(destination) == os.path.abspath(source):
+        raise ValueError("output would overwrite the source; use another output directory")
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    tmp_path = f"{destination}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(result)
+    os.replace(tmp_path, destination)
+    return {"sha256": digest, "output": output, "converted": True,
+            "bytes_in": len(data), "bytes_out": len(result), "metrics": measured}
+
+
+def _format_duration(seconds):
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds // 60:.0f}m{seconds % 60:02.0f}s"
+    return f"{seconds // 3600:.0f}h{seconds % 3600 // 60:02.0f}m"
+
+
+class Progress:
+    """Counters of a batch run and the periodic progress line"""
+
+    def __init__(self, interval=PROGRESS_INTERVAL, quiet=False):
+        self.interval = interval
+        self.quiet = quiet
+        self.started = time.perf_counter()
+        self._last_report = self.started
+        self.scanned = 0
+        self.queued = 0
+        self.counts = {"converted": 0, "unchanged": 0, "skipped": 0, "errors": 0}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.ssim = []
+
+    @property
+    def done(self):
+        return self.counts["converted"] + self.counts["unchanged"] + self.counts["errors"]
+
+    def line(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        rate = self.done / elapsed
+        text = (f"[{self.done}/{self.queued} processed, {self.scanned} scanned] "
+                f"{self.counts['converted']} converted, {self.counts['unchanged']} unchanged, "
+                f"{self.counts['skipped']} skipped, {self.counts['errors']} errors | "
+                f"{rate:.1f} img/s, {self.bytes_in / elapsed / 1e6:.1f} MB/s in")
+        remaining = self.queued - self.done
+        if rate and remaining:
+            text += f", ETA {_format_duration(remaining / rate)}"
+        return text
+
+    def tick(self, force=False):
+        now = time.perf_counter()
+        if not self.quiet and (force or now - self._last_report >= self.interval):
+            self._last_report = now
+            print(self.line(), flush=True)
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        quality = {}
+        if self.ssim:
+            quality = {"mean_ssim": round(sum(self.ssim) / len(self.ssim), 5), "min_ssim": min(self.ssim)}
+        return {
+            **self.counts,
+            "scanned": self.scanned,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "seconds": round(elapsed, 3),
+            "images_per_second": round(self.done / elapsed, 2) if elapsed else 0.0,
+            **quality,
+        }
+
+
+def convert_directory(input_dir, output_dir=None, output_format="WEBP", quality=95, resize=None,
+                      workers=None, recursive=False, force=False, manifest_path=None,
+                      progress_interval=PROGRESS_INTERVAL, quiet=False, metrics=False):
+    """
+    Convert the new and changed images of a directory
+
+    Args:
+        input_dir: Directory of source images
+        output_dir: Root of the output tree (default: <input_dir>/converted);
+            subdirectories mirror the input when recursive
+        output_format: Format to convert to, or AUTO (see convert_image)
+        quality: JPEG/WebP quality (1-100) (default: 95)
+        resize: Tuple of (width, height) or percentage to resize (optional)
+        workers: Number of processes (default: CPU count)
+        recursive: Also convert images in subdirectories
+        force: Convert everything, ignoring the manifest
+        manifest_path: Manifest file (default: MANIFEST_NAME in output_dir)
+        progress_interval: Seconds between progress lines
+        quiet: Print only the final summary
+        metrics: Store the SSIM and PSNR of each new output in its manifest
+            entry
+
+    Returns:
+        Summary dict: converted, unchanged (content identical despite a new
+        mtime), skipped (not read at all), errors, scanned, bytes_in,
+        bytes_out, seconds and images_per_second; with metrics, mean_ssim and
+        min_ssim of the outputs made in this run
+
+    Raises:
+        FileNotFoundError: If input_dir is not a directory
+    """
+    if not os.path.isdir(input_dir):
+        raise FileNotFoundError(f"Input directory '{input_dir}' not found")
+    output_dir = output_dir or os.path.join(input_dir, "converted")
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = manifest_path or os.path.join(output_dir, MANIFEST_NAME)
+    workers = workers or os.cpu_count() or 1
+    params = {"format": output_format.upper(), "quality": quality,
+              "resize": list(resize) if isinstance(resize, tuple) else resize}
+
+    previous = {} if force else load_manifest(manifest_path)
+    progress = Progress(progress_interval, quiet)
+    # Outputs written into the input directory by earlier runs are not sources
+    in_place = os.path.abspath(output_dir) == os.path.abspath(input_dir)
+    outputs = {entry["output"] for entry in previous.values()}
+
+    # Scan everything first (stat only): outputs written during the run must
+    # not be picked up as sources, and the total gives an ETA
+    entries = {}
+    todo = []
+    for relative, stat in iter_sources(input_dir, recursive, exclude={os.path.abspath(output_dir)}):
+        if in_place and relative in outputs:
+            continue
+        progress.scanned += 1
+        known = previous.get(relative)
+        if (known and known.get("params") == params and known.get("size") == stat.st_size
+                and known.get("mtime_ns") == stat.st_mtime_ns
+                and os.path.exists(os.path.join(output_dir, known["output"]))):
+            entries[relative] = known
+            progress.counts["skipped"] += 1
+        else:
+            todo.append((relative, stat, known))
+    progress.queued = len(todo)
+    if not quiet:
+        print(f"{progress.scanned} images found, {len(todo)} new or changed", flush=True)
+
+    def current_manifest():
+        # Sources not converted (yet) keep their old entry, so they are retried
+        kept = {relative: known for relative, _, known in todo if known}
+        return {**kept, **entries}
+
+    sources = iter(todo)
+    last_save = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            running = {}
+
+            def submit_next():
+                item = next(sources, None)
+                if item is None:
+                    return False
+                relative, stat, known = item
+                future = pool.submit(_convert_file, os.path.join(input_dir, relative), output_dir,
+                                     relative, params, known, metrics)
+                running[future] = (relative, stat, known)
+                return True
+
+            # At most two files per worker are queued at a time
+            while len(running) < 2 * workers and submit_next():
+                pass
+            while running:
+                done, _ = wait(running, timeout=progress_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    relative, stat, known = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"Error converting {relative}: {e}")
+                        progress.counts["errors"] += 1
+                    else:
+                        entry = {
+                            "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": result["sha256"],
+                            "params": params, "output": result["output"],
+                        }
+                        if result.get("metrics"):
+                            entry["metrics"] = {key: result["metrics"][key] for key in ("ssim", "psnr")}
+                            progress.ssim.append(entry["metrics"]["ssim"])
+                        elif not result["converted"] and known and "metrics" in known:
+                            entry["metrics"] = known["metrics"]
+                        entries[relative] = entry
+                        progress.counts["converted" if result["converted"] else "unchanged"] += 1
+                        progress.bytes_in += result["bytes_in"]
+                        progress.bytes_out += result["bytes_out"]
+                    submit_next()
+                progress.tick()
+                if time.perf_counter() - last_save >= MANIFEST_SAVE_INTERVAL:
+                    save_manifest(manifest_path, current_manifest())
+                    last_save = time.perf_counter()
+    finally:
+        save_manifest(manifest_path, current_manifest())
+
+    progress.tick(force=True)
+    return progress.summary()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convert the new and changed images of a directory",
+        epilog="Run without arguments through imageConvertor for the interactive menu.",
+    )
+    parser.add_argument("input_dir", help="Directory of source images")
+    parser.add_argument("-o", "--output", help="Output directory (default: INPUT_DIR/converted)")
+    parser.add_argument("-f", "--format", default="WEBP", type=str.upper, choices=CLI_FORMATS,
+                        help="Output format (default: WEBP); AUTO keeps the smallest acceptable encoding")
+    parser.add_argument("-q", "--quality", type=int, default=95, help="JPEG/WebP quality 1-100 (default: 95)")
+    parser.add_argument("--resize", type=parse_resize, help="WIDTHxHEIGHT or a percentage, e.g. 1600x1200 or 50")
+    parser.add_argument("-j", "--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Also convert subdirectories")
+    parser.add_argument("--force", action="store_true", help="Convert everything, ignoring the manifest")
+    parser.add_argument("--manifest", help=f"Manifest file (default: OUTPUT/{MANIFEST_NAME})")
+    parser.add_argument("--progress-interval", type=float, default=PROGRESS_INTERVAL,
+                        help=f"Seconds between progress lines (default: {PROGRESS_INTERVAL:g})")
+    parser.add_argument("--metrics", action="store_true", help="Record SSIM and PSNR of each output in the manifest")
+    parser.add_argument("--quiet", action="store_true", help="Print only the summary")
+    args = parser.parse_args(argv)
+
+    try:
+        summary = convert_directory(
+            args.input_dir, args.output, output_format=args.format, quality=min(max(args.quality, 1), 100),
+            resize=args.resize, workers=args.workers, recursive=args.recursive, force=args.force,
+            manifest_path=args.manifest, progress_interval=args.progress_interval, quiet=args.quiet,
+            metrics=args.metrics,
+        )
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        return 2
+    print(json.dumps(summary))
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,348 @@
+import io
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, PngImagePlugin, TiffImagePlugin
+
+# Largest input (width x height) the convert and compress functions accept;
+# checked from the image header before any pixels are decoded. Only PNG and
+# TIFF inputs, which they can downscale in strips, may exceed Pillow's
+# decompression-bomb guard (Image.MAX_IMAGE_PIXELS, left at its default).
+MAX_IMAGE_PIXELS = int(os.getenv("UTILIX_MAX_IMAGE_PIXELS", "1000000000"))
+
+# Decoded size (bytes) an input may take in memory. Larger PNG and TIFF
+# inputs are downscaled strip by strip (see imageTiles); others are rejected.
+IMAGE_MEMORY_LIMIT = int(os.getenv("UTILIX_IMAGE_MEMORY_MB", "512")) * 1024 * 1024
+
+# Largest input of tools that always decode the whole image (background
+# removal, QR logos): Pillow's guard, or less if the memory limit cannot
+# hold that many 4-byte pixels
+DECODE_MAX_PIXELS = min(Image.MAX_IMAGE_PIXELS, IMAGE_MEMORY_LIMIT // 4)
+
+# Formats open_image may open past Pillow's guard (those imageTiles reads in strips)
+_UNGUARDED_FORMATS = (PngImagePlugin.PngImageFile, TiffImagePlugin.TiffImageFile)
+
+
+class ImageTooLarge(ValueError):
+    """The image exceeds the pixel budget or cannot be processed within the memory limit"""
+
+
+def is_path(source):
+    """Return True if source is a filesystem path rather than in-memory data"""
+    return isinstance(source, (str, os.PathLike))
+
+
+def _open_unguarded(source):
+    """Open a PNG or TIFF without Pillow's decompression-bomb check, or return None"""
+    for image_class in _UNGUARDED_FORMATS:
+        if not is_path(source):
+            source.seek(0)
+        try:
+            # The plugin classes read the header; only Image.open checks its size
+            return image_class(source)
+        except SyntaxError:
+            continue
+    return None
+
+
+def open_image(source, max_pixels=None):
+    """
+    Open an image from a path, raw bytes or a binary file-like object
+
+    Args:
+        source: Path to the image, bytes/bytearray/memoryview, or an object with read()
+        max_pixels: For callers that downscale large PNG/TIFF inputs in strips:
+            open PNG and TIFF images of up to this many pixels even past
+            Pillow's decompression-bomb guard (default: keep the guard)
+
+    Returns:
+        PIL Image (lazily loaded, like Image.open)
+
+    Raises:
+        ImageTooLarge: If the header reports more than twice Pillow's
+            MAX_IMAGE_PIXELS (its decompression-bomb guard), unless it is a
+            PNG or TIFF within max_pixels
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    elif not is_path(source) and not hasattr(source, "read"):
+        raise TypeError(f"Unsupported image source: {type(source).__name__}")
+    try:
+        return Image.open(source)
+    except Image.DecompressionBombError as e:
+        img = _open_unguarded(source) if max_pixels else None
+        if img is None:
+            raise ImageTooLarge(str(e))
+        check_pixel_budget(img, max_pixels)
+        return img
+
+
+def pixel_bytes(mode):
+    """Bytes Pillow uses per pixel in memory for an image mode"""
+    if mode in ("1", "L", "P"):
+        return 1
+    if mode.startswith("I;16"):
+        return 2
+    # Multi-band modes are stored as 4 bytes per pixel, as are I and F
+    return 4
+
+
+def decoded_bytes(img):
+    """Memory a full decode of img takes, from its header"""
+    return img.width * img.height * pixel_bytes(img.mode)
+
+
+def check_pixel_budget(img, max_pixels=None):
+    """
+    Reject an image by its header size, before any pixels are decoded
+
+    Args:
+        img: PIL Image as returned by open_image (not yet loaded)
+        max_pixels: Largest width x height accepted (default: MAX_IMAGE_PIXELS)
+
+    Raises:
+        ImageTooLarge: If the image has more pixels than the budget
+    """
+    max_pixels = max_pixels or MAX_IMAGE_PIXELS
+    if img.width * img.height > max_pixels:
+        raise ImageTooLarge(
+            f"Image is {img.width}x{img.height} ({img.width * img.height:,} pixels), "
+            f"over the limit of {max_pixels:,} pixels"
+        )
+
+
+def pixel_budget_error(source, max_pixels=None, whole=False):
+    """
+    Header-only check of an encoded image against the pixel budget
+
+    Args:
+        source: Path, bytes or binary file-like object (read from its current position)
+        max_pixels: Largest width x height accepted (default: MAX_IMAGE_PIXELS,
+            or DECODE_MAX_PIXELS with whole)
+        whole: The image will be decoded whole, not downscaled in strips
+
+    Returns:
+        The reason the image is rejected, or None if it is within budget (or
+        not an image Pillow recognizes, which is left to the decoder to report)
+    """
+    max_pixels = max_pixels or (DECODE_MAX_PIXELS if whole else MAX_IMAGE_PIXELS)
+    try:
+        check_pixel_budget(open_image(source, None if whole else max_pixels), max_pixels)
+    except ImageTooLarge as e:
+        return str(e)
+    except Exception:
+        return None
+    return None
+
+
+# How much larger than the target an image is kept before the final LANCZOS
+# pass; at 2 the result is visually the same as a full-resolution resize (the
+# default Pillow uses for thumbnails)
+REDUCING_GAP = 2.0
+
+
+def resize_image(img, size, resample=Image.LANCZOS):
+    """
+    Resize an image, shrinking it cheaply first when it is much larger than size
+
+    JPEGs not yet decoded are decoded at a reduced DCT scale (draft), and
+    larger images are then shrunk by an integer factor with reduce() (box
+    averaging), in both cases keeping at least REDUCING_GAP times the target
+    size for the final resample pass. Upscales and small reductions go
+    straight to img.resize.
+
+    Args:
+        img: PIL Image; call this before anything forces a full decode
+        size: Target (width, height)
+        resample: Filter of the final pass (default: LANCZOS)
+
+    Returns:
+        The resized image
+    """
+    width, height = size
+    if width >= img.width or height >= img.height:
+        return img.resize(size, resample)
+
+    # draft() only acts on JPEGs not yet loaded, and never goes below the requested size
+    if img.format == "JPEG":
+        img.draft(None, (int(width * REDUCING_GAP), int(height * REDUCING_GAP)))
+
+    factor_x = int(img.width / width / REDUCING_GAP)
+    factor_y = int(img.height / height / REDUCING_GAP)
+    if factor_x > 1 or factor_y > 1:
+        try:
+            img = img.reduce((max(factor_x, 1), max(factor_y, 1)))
+        except ValueError:
+            # Modes reduce() does not support (P, 1, I;16) are resized directly
+            pass
+
+    return img.resize(size, resample)
+
+
+def encode_image(img, format, **save_kwargs):
+    """
+    Encode an image into memory
+
+    Args:
+        img: PIL Image to encode
+        format: Pillow format name (PNG, JPEG, WEBP, ...)
+        **save_kwargs: Format-specific options passed to Image.save
+
+    Returns:
+        Encoded image as bytes
+    """
+    buffer = io.BytesIO()
+    img.save(buffer, format=format, **save_kwargs)
+    return buffer.getvalue()
+
+
+def shared_copy(img):
+    """
+    New Image object sharing img's pixel data (no copy)
+
+    Image.save stores its options on the Image object, so threads encoding
+    the same image concurrently must each save through their own copy. Load
+    img before handing it to several threads.
+    """
+    img.load()
+    return img._new(img.im)
+
+
+def encode_to_target(img, format, target_bytes, min_quality=40, max_quality=95, threads=4,
+                     min_side=16, **save_kwargs):
+    """
+    Encode an image as close to target_bytes as possible without going over
+
+    Quality is searched first: each round encodes `threads` candidate
+    qualities in parallel threads (Pillow releases the GIL while encoding)
+    and narrows the range to the gap between the best one that fits and the
+    next one that does not. If even min_quality is too large, the image is
+    downscaled in proportion to the overshoot and the search repeats. All
+    candidates are encoded in memory.
+
+    Args:
+        img: PIL Image, already in a mode the format accepts
+        format: Pillow format name with a quality setting (JPEG, WEBP)
+        target_bytes: Maximum size of the encoded image
+        min_quality: Lowest quality tried before downscaling (default: 40)
+        max_quality: Highest quality tried (default: 95)
+        threads: Candidates encoded per round (default: 4)
+        min_side: Smallest width/height the image is scaled down to (default: 16)
+        **save_kwargs: Other options passed to Image.save (e.g. optimize)
+
+    Returns:
+        (bytes, info) where info has quality, width, height, scale, bytes and
+        fits (False when even the smallest attempt exceeded the target; the
+        smallest attempt is returned then)
+    """
+    original_width = img.width
+    threads = max(threads, 1)
+    # Decode before the threads start, so they never load the file concurrently
+    img.load()
+
+    def encode(image, quality):
+        return quality, encode_image(shared_copy(image), format, quality=quality, **save_kwargs)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        while True:
+            best = None  # (quality, data) of the highest quality that fits
+            smallest = None  # (quality, data) of the lowest quality tried
+            low, high = min_quality, max_quality
+            while low <= high:
+                # Candidates spread over [low, high], both ends included
+                count = min(threads, high - low + 1)
+                candidates = sorted({round(low + i * (high - low) / max(count - 1, 1)) for i in range(count)})
+                results = dict(pool.map(lambda q: encode(img, q), candidates))
+                if smallest is None or candidates[0] < smallest[0]:
+                    smallest = (candidates[0], results[candidates[0]])
+
+                fitting = [q for q in candidates if len(results[q]) <= target_bytes]
+                if fitting:
+                    best = (fitting[-1], results[fitting[-1]])
+                    low = fitting[-1] + 1
+                too_big = [q for q in candidates if q >= low and len(results[q]) > target_bytes]
+                if too_big:
+                    high = too_big[0] - 1
+
+            if best is not None or min(img.size) <= min_side:
+                quality, data = best if best is not None else smallest
+                return data, {
+                    "quality": quality,
+                    "width": img.width,
+                    "height": img.height,
+                    "scale": round(img.width / original_width, 4),
+                    "bytes": len(data),
+                    "fits": best is not None,
+                }
+
+            # Shrink in proportion to how far the smallest encode overshot
+            factor = max(min((target_bytes / len(smallest[1])) ** 0.5 * 0.95, 0.9), 0.1)
+            size = (max(int(img.width * factor), min_side), max(int(img.height * factor), min_side))
+            img = resize_image(img, size)
+
+
+def save_or_encode(img, output_path, format, as_bytes=False, **save_kwargs):
+    """Save img to output_path, or return the encoded bytes when as_bytes is set"""
+    if as_bytes:
+        return encode_image(img, format, **save_kwargs)
+    img.save(output_path, format=format, **save_kwargs)
+    return output_path
+
+
+class _DrainBuffer:
+    """Write-only stream whose contents are handed out and dropped as they are produced"""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ZipStream:
+    """
+    Build a ZIP archive incrementally so it can be streamed to a client
+
+    Each add() returns the archive bytes produced by that entry, and close()
+    returns the central directory. Entries are stored uncompressed by default,
+    since encoded images do not shrink further. Repeated names get a numeric
+    suffix instead of overwriting each other.
+    """
+
+    def __init__(self, compression=zipfile.ZIP_STORED):
+        self._buffer = _DrainBuffer()
+        self._zip = zipfile.ZipFile(self._buffer, "w", compression=compression)
+        self._names = set()
+
+    def _unique(self, name):
+        base, ext = os.path.splitext(name)
+        candidate, n = name, 1
+        while candidate in self._names:
+            candidate = f"{base}-{n}{ext}"
+            n += 1
+        self._names.add(candidate)
+        return candidate
+
+    def add(self, name, data):
+        """Add one file; returns the bytes to send"""
+        self._zip.writestr(self._unique(name), data)
+        return self._buffer.drain()
+
+    def close(self):
+        """Finish the archive; returns the remaining bytes to send"""
+        self._zip.close()
+        return self._buffer.drain()
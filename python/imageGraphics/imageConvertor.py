@@ -1,29 +1,369 @@
 from PIL import Image
+import io
+import math
 import os
 import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from python.imageGraphics.imageBuffers import (
+    is_path, open_image, save_or_encode, encode_image, resize_image, shared_copy, encode_to_target,
+    check_pixel_budget, ImageTooLarge, REDUCING_GAP, MAX_IMAGE_PIXELS
+)
+from python.imageGraphics.imageTiles import fits_in_memory, resize_in_strips, resize_within_memory
+from python.imageGraphics.imageQuality import SSIMReference, has_alpha, quality_metrics, describe_metrics
+from python.imageGraphics.imageAnimation import ANIMATED_FORMATS, is_animated, save_animation
+from python.png_compress import quantize_image
 
-def convert_image(input_path, output_path=None, output_format=None, quality=95, resize=None):
+# Input file types accepted by the converter
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp', '.tiff', '.ico']
+
+# Widths and formats produced by the variants mode when no targets are given
+DEFAULT_VARIANT_TARGETS = [
+    {"width": width, "format": fmt, "quality": 80}
+    for width in (320, 640, 1280, 2048) for fmt in ("WEBP", "JPEG")
+]
+
+# Favicon set added by the variants mode: (file name, format, sizes)
+FAVICON_SET = [
+    ("favicon.ico", "ICO", [16, 32, 48]),
+    ("apple-touch-icon.png", "PNG", [180]),
+    ("icon-192.png", "PNG", [192]),
+    ("icon-512.png", "PNG", [512]),
+]
+
+# Output formats with a quality setting, which support target_bytes
+TARGET_SIZE_FORMATS = ['JPEG', 'JPG', 'WEBP']
+
+# File extensions of output formats whose name differs from the extension
+FORMAT_EXTENSIONS = {"JPEG": "jpg", "TIFF": "tif"}
+
+# Encodings raced by the auto format mode: (name, format); JPEG is skipped
+# for images with transparency
+AUTO_CANDIDATES = [
+    ("webp", "WEBP"),
+    ("jpeg", "JPEG"),
+    ("png", "PNG"),
+    ("png-quantized", "PNG"),
+]
+
+# Lowest SSIM against the original an auto-mode candidate may score
+AUTO_MIN_SSIM = float(os.getenv("UTILIX_AUTO_MIN_SSIM", "0.98"))
+
+def save_options(img, output_format, quality=95):
+    """
+    Format-specific encoder options
+
+    Args:
+        img: PIL Image about to be saved
+        output_format: Format it is saved as
+        quality: JPEG/WebP quality (1-100)
+
+    Returns:
+        (image, save kwargs); the image is converted when the format needs it
+    """
+    save_kwargs = {}
+    
+    if output_format.upper() in ['JPEG', 'JPG']:
+        # JPEG quality
+        save_kwargs['quality'] = quality
+        save_kwargs['optimize'] = True
+        
+        # Convert RGBA to RGB since JPEG doesn't support transparency
+        if img.mode == 'RGBA':
+            img = img.convert('RGB')
+            
+    elif output_format.upper() == 'PNG':
+        # PNG compression level
+        save_kwargs['optimize'] = True
+        save_kwargs['compress_level'] = 9  # Maximum compression
+        
+    elif output_format.upper() == 'WEBP':
+        # WebP quality
+        save_kwargs['quality'] = quality
+        save_kwargs['method'] = 6  # Highest quality method
+        
+    elif output_format.upper() == 'TIFF':
+        save_kwargs['compression'] = 'tiff_lzw'  # Lossless compression
+
+    return img, save_kwargs
+
+def parse_variant_targets(targets):
+    """
+    Normalize variant targets
+
+    Args:
+        targets: List of {"width", "format", "quality"} dicts or (width, format, quality)
+            tuples; format defaults to WEBP and quality to 80
+
+    Returns:
+        List of dicts with an int width, an upper-case format and an int quality
+
+    Raises:
+        ValueError: If a target is malformed
+    """
+    parsed = []
+    for target in targets:
+        if isinstance(target, dict):
+            width, fmt, quality = target.get("width"), target.get("format", "WEBP"), target.get("quality", 80)
+        elif isinstance(target, (list, tuple)) and 1 <= len(target) <= 3:
+            width, fmt, quality = (list(target) + ["WEBP", 80][len(target) - 1:])[:3]
+        else:
+            raise ValueError(f"Invalid variant target: {target!r}")
+        try:
+            width = int(width)
+            quality = min(max(int(quality), 1), 100)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid variant target: {target!r}")
+        if width < 1:
+            raise ValueError(f"Variant width must be positive: {target!r}")
+        fmt = str(fmt).upper()
+        fmt = "JPEG" if fmt == "JPG" else fmt
+        Image.init()
+        if fmt not in Image.SAVE:
+            raise ValueError(f"Unsupported variant format: {fmt}")
+        parsed.append({"width": width, "format": fmt, "quality": quality})
+    return parsed
+
+def _square(img):
+    """Center-crop to a square, for icons"""
+    side = min(img.size)
+    left, top = (img.width - side) // 2, (img.height - side) // 2
+    return img.crop((left, top, left + side, top + side))
+
+def _encode_variant(img, output_format, quality, **extra):
+    # Variants of the same size share one image and are encoded concurrently
+    img, save_kwargs = save_options(shared_copy(img), output_format, quality)
+    save_kwargs.update(extra)
+    return save_or_encode(img, None, output_format, as_bytes=True, **save_kwargs)
+
+def convert_variants(input_path, targets=None, favicon=False, base_name=None, workers=None, metrics=False):
+    """
+    Produce several sizes and formats of one image from a single decode
+
+    The source is decoded once (JPEGs at the smallest DCT scale that still
+    serves the largest target). Variants are resized largest first, each from
+    the smallest image already made that is at least REDUCING_GAP times its
+    size, so the small sizes are cheap. All encodes run in parallel threads.
+
+    Args:
+        input_path: Path to the input image, or its bytes / a binary file-like object
+        targets: List of (width, format, quality) targets (see parse_variant_targets);
+            default DEFAULT_VARIANT_TARGETS. Widths above the original are capped.
+        favicon: Also produce the FAVICON_SET icons from a square center crop
+        base_name: Prefix of the variant file names (default: the input file
+            name, or "image" for in-memory input)
+        workers: Encoder threads (default: CPU count)
+        metrics: Add the SSIM and PSNR of each variant against the resized
+            image it was encoded from to its manifest entry
+
+    Returns:
+        (manifest, files): manifest is a list of dicts describing each output
+        (name, width, height, format, quality, bytes, and ssim, psnr and
+        metrics_ms with metrics); files maps name to bytes
+    """
+    targets = parse_variant_targets(targets if targets is not None else DEFAULT_VARIANT_TARGETS)
+    img = open_image(input_path, MAX_IMAGE_PIXELS)
+    check_pixel_budget(img)
+    if not base_name:
+        base_name = os.path.splitext(os.path.basename(input_path))[0] if is_path(input_path) else "image"
+
+    original_size = img.size
+    # Width the decoded image needs: the largest target, and for favicons
+    # enough that the square crop (the shorter side) covers the largest icon
+    needed = max([t["width"] for t in targets] + [0])
+    if favicon:
+        icon_side = max(max(sizes) for _, _, sizes in FAVICON_SET)
+        needed = max(needed, math.ceil(icon_side * img.width / min(img.size)))
+    needed = min(needed, img.width)
+    height = max(round(img.height * needed / img.width), 1)
+    if not fits_in_memory(img, (needed, height) if needed else None):
+        # Downscale in strips to the largest size needed, and make the rest from that
+        if not needed or needed >= img.width:
+            raise ImageTooLarge("Image is too large to decode within the memory limit")
+        img = resize_in_strips(input_path, img, (needed, height))
+    elif img.format == "JPEG" and needed:
+        img.draft(None, (int(needed * REDUCING_GAP), int(height * REDUCING_GAP)))
+    img.load()
+
+    # Progressive downscale chain: width -> resized image
+    levels = {}
+
+    def level(width):
+        if width >= img.width:
+            return img
+        if width not in levels:
+            sources = [levels[w] for w in levels if w >= width * REDUCING_GAP]
+            source = min(sources, key=lambda im: im.width) if sources else img
+            height = max(round(img.height * width / img.width), 1)
+            levels[width] = resize_image(source, (width, height))
+        return levels[width]
+
+    jobs = []
+    for target in sorted(targets, key=lambda t: t["width"], reverse=True):
+        variant = level(min(target["width"], img.width))
+        ext = FORMAT_EXTENSIONS.get(target["format"], target["format"].lower())
+        name = f"{base_name}-{variant.width}w.{ext}"
+        jobs.append(({"name": name, "width": variant.width, "height": variant.height,
+                      "format": target["format"], "quality": target["quality"]},
+                     variant, target["format"], target["quality"], {}))
+
+    if favicon:
+        square = _square(img)
+        for name, fmt, sizes in FAVICON_SET:
+            side = max(sizes)
+            icon = resize_image(square, (side, side)) if square.width != side else square
+            extra = {"sizes": [(size, size) for size in sizes]} if fmt == "ICO" else {}
+            jobs.append(({"name": name, "width": side, "height": side, "format": fmt, "quality": None},
+                         icon, fmt, 95, extra))
+
+    def encode(job):
+        entry, variant, fmt, quality, extra = job
+        data = _encode_variant(variant, fmt, quality, **extra)
+        if metrics:
+            entry.update(quality_metrics(variant, data))
+        return data
+
+    # Pillow releases the GIL while encoding, so threads encode in parallel
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        encoded = list(pool.map(encode, jobs))
+
+    manifest, files = [], {}
+    seen = set()
+    for (entry, *_), data in zip(jobs, encoded):
+        if entry["name"] in seen:
+            # Two targets capped to the same size and format
+            continue
+        seen.add(entry["name"])
+        entry["bytes"] = len(data)
+        entry["source_width"], entry["source_height"] = original_size
+        manifest.append(entry)
+        files[entry["name"]] = data
+    return manifest, files
+
+def _race_candidate(reference, name, output_format, img, quality):
+    start = time.perf_counter()
+    img = shared_copy(img)
+    if name == "png-quantized":
+        img = quantize_image(img)
+    img, save_kwargs = save_options(img, output_format, quality)
+    data = encode_image(img, output_format, **save_kwargs)
+    encoded = time.perf_counter()
+    # Lossless PNG needs no scoring
+    score = 1.0 if name == "png" else reference.score(Image.open(io.BytesIO(data)))
+    return data, {
+        "name": name,
+        "format": output_format,
+        "bytes": len(data),
+        "ssim": round(score, 5),
+        "encode_ms": round((encoded - start) * 1000, 1),
+        "score_ms": round((time.perf_counter() - encoded) * 1000, 1),
+    }
+
+def race_formats(img, quality=95, min_ssim=None, workers=None):
+    """
+    Encode an image in every AUTO_CANDIDATES encoding at once and keep the
+    smallest one that still looks like the original
+
+    Candidates are encoded and scored with a fast SSIM (see imageQuality)
+    in parallel threads. Lossless PNG always qualifies, so there is always
+    a winner.
+
+    Args:
+        img: PIL Image (loaded before the threads start)
+        quality: WebP/JPEG quality (1-100) (default: 95)
+        min_ssim: Lowest acceptable SSIM (default: AUTO_MIN_SSIM, UTILIX_AUTO_MIN_SSIM)
+        workers: Encoder threads (default: one per candidate)
+
+    Returns:
+        (bytes, report): report has the winning "format" and "name",
+        "min_ssim", and "candidates", a list with each candidate's name,
+        format, bytes, ssim, encode_ms, score_ms and accepted flag
+    """
+    min_ssim = AUTO_MIN_SSIM if min_ssim is None else min_ssim
+    if img.mode not in ("RGB", "RGBA", "L"):
+        img = img.convert("RGBA" if has_alpha(img) else "RGB")
+    img.load()
+    reference = SSIMReference(img)
+    candidates = [(name, fmt) for name, fmt in AUTO_CANDIDATES if not (fmt == "JPEG" and has_alpha(img))]
+
+    with ThreadPoolExecutor(max_workers=workers or len(candidates)) as pool:
+        results = list(pool.map(lambda c: _race_candidate(reference, c[0], c[1], img, quality), candidates))
+
+    for _, entry in results:
+        entry["accepted"] = entry["ssim"] >= min_ssim
+    data, best = min((result for result in results if result[1]["accepted"]), key=lambda result: len(result[0]))
+    return data, {
+        "format": best["format"],
+        "name": best["name"],
+        "min_ssim": min_ssim,
+        "candidates": [entry for _, entry in results],
+    }
+
+def convert_image(input_path, output_path=None, output_format=None, quality=95, resize=None,
+                  as_bytes=False, variants=None, target_bytes=None, max_pixels=None, memory_limit=None,
+                  min_ssim=None, metrics=False):
     """
     Convert an image from one format to another with options for quality and resizing
     
     Args:
-        input_path: Path to the input image
+        input_path: Path to the input image, or its bytes / a binary file-like object
         output_path: Path for the output image (optional)
-        output_format: Format to convert to (optional)
+        output_format: Format to convert to (optional); "AUTO" races WebP,
+            JPEG and PNG and keeps the smallest acceptable one (see race_formats).
+            Animated inputs converted to GIF or WEBP keep every frame (see
+            imageAnimation); other formats get the first frame
         quality: JPEG/WebP quality (1-100) (default: 95)
         resize: Tuple of (width, height) or percentage to resize (optional)
+        as_bytes: Return the encoded image as bytes instead of writing a file (default: False)
+        variants: List of (width, format, quality) targets; switches to the
+            variants mode (see convert_variants), which ignores output_format,
+            quality and resize
+        target_bytes: For JPEG/WebP, the largest acceptable output size; quality
+            is searched (up to `quality`) and the image downscaled if needed
+            (see encode_to_target)
+        max_pixels: Largest input (width x height) accepted, checked before
+            decoding (default: MAX_IMAGE_PIXELS, UTILIX_MAX_IMAGE_PIXELS)
+        memory_limit: Bytes a decode may use (default: IMAGE_MEMORY_LIMIT);
+            larger PNG/TIFF inputs are downscaled in strips (see imageTiles)
+        min_ssim: Quality floor of the AUTO format (default: AUTO_MIN_SSIM)
+        metrics: Also measure SSIM and PSNR of the output against the
+            (resized) image that was encoded (see quality_metrics); not
+            done for animations
     
     Returns:
-        Path to the converted image
+        Path to the converted image, or its bytes when as_bytes is set. In the
+        variants mode, (manifest, files) when as_bytes is set, otherwise the
+        manifest after writing the files into output_path (a directory). With
+        the AUTO format, (bytes, report) when as_bytes is set, otherwise the
+        path, whose extension is that of the chosen format. With metrics,
+        (that result, metrics dict), except that AUTO with as_bytes keeps
+        returning (bytes, report) and puts them in report["metrics"]
+
+    Raises:
+        ImageTooLarge: If the input is over max_pixels, or too large for
+            memory_limit and not a downscale that can be done in strips
     """
+    if variants is not None:
+        manifest, files = convert_variants(input_path, variants)
+        if as_bytes:
+            return manifest, files
+        output_dir = output_path or "."
+        os.makedirs(output_dir, exist_ok=True)
+        for name, data in files.items():
+            with open(os.path.join(output_dir, name), "wb") as f:
+                f.write(data)
+        return manifest
+
     try:
         # Check if input file exists
-        if not os.path.exists(input_path):
+        if is_path(input_path) and not os.path.exists(input_path):
             print(f"Error: Input file '{input_path}' not found!")
             return None
             
-        # Open the image
-        img = Image.open(input_path)
+        # Open the image and check its size from the header alone
+        img = open_image(input_path, max_pixels or MAX_IMAGE_PIXELS)
+        check_pixel_budget(img, max_pixels)
         
         # Get original format if no output format specified
         original_format = img.format
@@ -31,73 +371,181 @@ def convert_image(input_path, output_path=None, output_format=None, quality=95,
             output_format = original_format
             
         # Handle output path
-        if not output_path:
+        if not output_path and not as_bytes:
             # If no output path provided, create one based on input filename
-            file_name, _ = os.path.splitext(os.path.basename(input_path))
+            if is_path(input_path):
+                file_name, _ = os.path.splitext(os.path.basename(input_path))
+            else:
+                file_name = "converted"
             output_path = f"{file_name}.{output_format.lower()}"
         
         # Check if output_path has an extension, if not add it
-        if not os.path.splitext(output_path)[1]:
+        if output_path and not os.path.splitext(output_path)[1]:
             output_path = f"{output_path}.{output_format.lower()}"
         
         # Resize image if requested
+        size = None
         if resize:
             original_width, original_height = img.size
             
             if isinstance(resize, tuple) and len(resize) == 2:
                 # Resize to specific dimensions
-                new_width, new_height = resize
-                img = img.resize((new_width, new_height), Image.LANCZOS)
+                size = tuple(resize)
             elif isinstance(resize, (int, float)):
                 # Resize by percentage
                 scale = resize / 100.0
-                new_width = int(original_width * scale)
-                new_height = int(original_height * scale)
-                img = img.resize((new_width, new_height), Image.LANCZOS)
+                size = (int(original_width * scale), int(original_height * scale))
+
+        if is_animated(img) and output_format.upper() in ANIMATED_FORMATS:
+            # Every frame is kept, decoded and resized one at a time
+            with (io.BytesIO() if as_bytes else open(output_path, "wb")) as f:
+                frames = save_animation(img, f, output_format, quality, size)
+                result = f.getvalue() if as_bytes else output_path
+            print(f"Animation: {img.n_frames} frames in, {frames} out")
+            if not as_bytes:
+                print(f"Successfully converted: {input_path} → {output_path}")
+            return (result, None) if metrics else result
+
+        # Inputs too large to decode whole are downscaled in strips (PNG/TIFF) or rejected
+        img = resize_within_memory(input_path, img, size, memory_limit)
         
+        if output_format.upper() == 'AUTO':
+            result, report = race_formats(img, quality, min_ssim)
+            print("Auto format: " + ", ".join(
+                f"{c['name']} {c['bytes']} bytes (SSIM {c['ssim']}, {c['encode_ms']} ms)" for c in report["candidates"]
+            ) + f" -> {report['name']}")
+            measured = quality_metrics(img, result) if metrics else None
+            if as_bytes:
+                if metrics:
+                    report["metrics"] = measured
+                return result, report
+            fmt = report["format"]
+            output_path = f"{os.path.splitext(output_path)[0]}.{FORMAT_EXTENSIONS.get(fmt, fmt.lower())}"
+            with open(output_path, "wb") as f:
+                f.write(result)
+            print(f"Successfully converted: {input_path} → {output_path}")
+            return (output_path, measured) if metrics else output_path
+
         # Convert image and save
-        save_kwargs = {}
-        
-        # Format-specific options
-        if output_format.upper() in ['JPEG', 'JPG']:
-            # JPEG quality
-            save_kwargs['quality'] = quality
-            save_kwargs['optimize'] = True
-            
-            # Convert RGBA to RGB since JPEG doesn't support transparency
-            if img.mode == 'RGBA':
-                img = img.convert('RGB')
-                
-        elif output_format.upper() == 'PNG':
-            # PNG compression level
-            save_kwargs['optimize'] = True
-            save_kwargs['compress_level'] = 9  # Maximum compression
-            
-        elif output_format.upper() == 'WEBP':
-            # WebP quality
-            save_kwargs['quality'] = quality
-            save_kwargs['method'] = 6  # Highest quality method
-            
-        elif output_format.upper() == 'TIFF':
-            save_kwargs['compression'] = 'tiff_lzw'  # Lossless compression
-            
-        # Save with the appropriate format
-        img.save(output_path, format=output_format.upper(), **save_kwargs)
-        
-        print(f"Successfully converted: {input_path} → {output_path}")
-        return output_path
+        source = img
+        img, save_kwargs = save_options(img, output_format, quality)
+
+        if target_bytes and output_format.upper() in TARGET_SIZE_FORMATS:
+            # Search quality (then size) in memory for the largest output that fits
+            save_kwargs.pop('quality', None)
+            fmt = 'JPEG' if output_format.upper() == 'JPG' else output_format.upper()
+            result, info = encode_to_target(img, fmt, target_bytes, max_quality=quality, **save_kwargs)
+            print(f"Target {target_bytes} bytes: quality {info['quality']}, scale {info['scale']}, {info['bytes']} bytes")
+        else:
+            # Save with the appropriate format (in memory when it is measured)
+            result = save_or_encode(img, output_path, output_format.upper(), as_bytes or metrics, **save_kwargs)
+
+        measured = None
+        if metrics:
+            measured = quality_metrics(source, result)
+            print(f"Quality: {describe_metrics(measured)}")
+        if not as_bytes:
+            if isinstance(result, bytes):
+                with open(output_path, "wb") as f:
+                    f.write(result)
+                result = output_path
+            print(f"Successfully converted: {input_path} → {output_path}")
+        return (result, measured) if metrics else result
         
+    except ImageTooLarge as e:
+        # Callers tell an over-budget input apart from a failed conversion
+        print(f"Error converting image: {e}")
+        raise
     except Exception as e:
         print(f"Error converting image: {e}")
         return None
 
+def is_image_name(name):
+    """Return True if name has one of the supported image extensions"""
+    return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+def output_name(name, output_format):
+    """Name of the converted file: the input's base name with the new extension"""
+    return f"{os.path.splitext(os.path.basename(name))[0]}.{output_format.lower()}"
+
+def iter_zip_images(source):
+    """
+    Read the images out of a ZIP archive one at a time
+
+    Args:
+        source: Path to the archive, its bytes, or a binary file-like object
+
+    Yields:
+        (name, bytes) for every image entry, skipping folders, macOS metadata
+        and files without a supported image extension
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    with zipfile.ZipFile(source) as archive:
+        for info in archive.infolist():
+            name = info.filename
+            if info.is_dir() or name.startswith("__MACOSX/") or not is_image_name(name):
+                continue
+            yield os.path.basename(name), archive.read(info)
+
+def batch_convert_images(inputs, output_format, quality=95, resize=None, workers=None):
+    """
+    Convert many images in parallel across a process pool
+
+    At most two conversions per worker are queued at a time, so inputs can be
+    a lazy iterator over hundreds of files without holding them all in memory.
+
+    Args:
+        inputs: Iterable of (name, source) pairs; source is a path or the image bytes
+        output_format: Format to convert to
+        quality: JPEG/WebP quality (1-100) (default: 95)
+        resize: Tuple of (width, height) or percentage to resize (optional)
+        workers: Number of processes (default: CPU count)
+
+    Yields:
+        (output name, encoded bytes or None on failure), in completion order
+    """
+    workers = workers or os.cpu_count() or 1
+    inputs = iter(inputs)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+
+        def submit_next():
+            item = next(inputs, None)
+            if item is None:
+                return False
+            name, source = item
+            future = pool.submit(convert_image, source, output_format=output_format,
+                                 quality=quality, resize=resize, as_bytes=True)
+            pending[future] = name
+            return True
+
+        while len(pending) < 2 * workers and submit_next():
+            pass
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                fmt = output_format
+                try:
+                    result = future.result()
+                    if isinstance(result, tuple):
+                        # AUTO format: (bytes, report) of the format that won
+                        result, report = result
+                        fmt = report["format"]
+                except Exception as e:
+                    print(f"Error converting {name}: {e}")
+                    result = None
+                submit_next()
+                yield output_name(name, fmt), result
+
 def interactive_mode():
     """Run image converter in interactive mode"""
     print("\n===== Image Type Converter =====\n")
     
     # List supported formats
     print("Supported formats:")
-    formats = ["JPEG/JPG", "PNG", "WEBP", "GIF", "BMP", "TIFF", "ICO"]
+    formats = ["JPEG/JPG", "PNG", "WEBP", "GIF", "BMP", "TIFF", "ICO", "AUTO (smallest of WEBP/JPEG/PNG)"]
     for i, fmt in enumerate(formats, 1):
         print(f"{i}. {fmt}")
     
@@ -115,16 +563,17 @@ def interactive_mode():
         '4': 'GIF',
         '5': 'BMP',
         '6': 'TIFF',
-        '7': 'ICO'
+        '7': 'ICO',
+        '8': 'AUTO'
     }
     
-    format_choice = input("Select output format (1-7): ")
+    format_choice = input("Select output format (1-8): ")
     output_format = format_map.get(format_choice)
     
     if not output_format:
         # Try to interpret the input directly as a format name
         output_format = format_choice.upper()
-        if output_format not in [f.upper() for f in ["JPEG", "JPG", "PNG", "WEBP", "GIF", "BMP", "TIFF", "ICO"]]:
+        if output_format not in [f.upper() for f in ["JPEG", "JPG", "PNG", "WEBP", "GIF", "BMP", "TIFF", "ICO", "AUTO"]]:
             print(f"Invalid format: {format_choice}. Using PNG as default.")
             output_format = "PNG"
     
@@ -133,7 +582,7 @@ def interactive_mode():
     
     # Quality for JPEG and WebP
     quality = 95
-    if output_format.upper() in ['JPEG', 'JPG', 'WEBP']:
+    if output_format.upper() in ['JPEG', 'JPG', 'WEBP', 'AUTO']:
         quality_input = input(f"Quality (1-100, default: {quality}): ")
         if quality_input.isdigit():
             quality = min(100, max(1, int(quality_input)))
@@ -234,35 +683,33 @@ def batch_convert():
             except ValueError:
                 print("Invalid percentage. Skipping resize.")
     
-    # Process all images in the directory
-    image_extensions = ['.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp', '.tiff', '.ico']
+    # Process all images in the directory, in parallel
     converted_count = 0
     error_count = 0
     
-    for filename in os.listdir(input_dir):
-        file_path = os.path.join(input_dir, filename)
-        if os.path.isfile(file_path) and os.path.splitext(filename)[1].lower() in image_extensions:
-            # Create output filename
-            base_name = os.path.splitext(filename)[0]
-            output_path = os.path.join(output_dir, f"{base_name}.{output_format.lower()}")
-            
-            # Convert the image
-            result = convert_image(
-                input_path=file_path,
-                output_path=output_path,
-                output_format=output_format,
-                quality=quality,
-                resize=resize
-            )
-            
-            if result:
-                converted_count += 1
-            else:
-                error_count += 1
+    inputs = (
+        (filename, os.path.join(input_dir, filename))
+        for filename in sorted(os.listdir(input_dir))
+        if os.path.isfile(os.path.join(input_dir, filename)) and is_image_name(filename)
+    )
+    for name, result in batch_convert_images(inputs, output_format, quality=quality, resize=resize):
+        if result:
+            with open(os.path.join(output_dir, name), "wb") as f:
+                f.write(result)
+            print(f"Successfully converted: {name}")
+            converted_count += 1
+        else:
+            error_count += 1
     
     print(f"\nConversion complete: {converted_count} images converted, {error_count} errors")
 
-def main():
+def main(argv=None):
+    """Interactive menu, or the incremental batch CLI (see imageBatch) when given arguments"""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        from python.imageGraphics.imageBatch import main as batch_main
+        return batch_main(argv)
+
     print("\n===== Image Type Converter =====")
     print("1. Convert a single image")
     print("2. Batch convert multiple images")
@@ -277,4 +724,4 @@ def main():
         print("Invalid choice. Exiting.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,439 @@
+"""
+Strip Processing for Large Images
+---------------------------------
+Downscales PNG and TIFF images that are too large to decode whole, reading
+a horizontal band of rows at a time so peak memory stays near the memory
+limit instead of the full bitmap size.
+
+Each band is decoded by Pillow itself, from a small stand-alone file built
+around that part of the source:
+
+    PNG   the zlib stream is inflated incrementally and each band of filtered
+          rows is wrapped in its own PNG, preceded by the last row of the
+          previous band (unfiltered) so Up/Average/Paeth rows still decode.
+          Non-interlaced 8-bit images, and 1/2/4-bit palette or bilevel ones.
+    TIFF  strips (or rows of tiles) are compressed independently, so a band
+          is a TIFF holding a copy of the directory and just those strips.
+          Uncompressed images can be cut at any row. Chunky (not planar)
+          layouts only, and not BigTIFF.
+
+Bands are box-reduced and then resampled with resize(box=...) over a window
+that overlaps the neighbouring rows by the filter support, so the result
+matches a whole-image resize_image() without seams.
+"""
+import io
+import math
+import struct
+import zlib
+
+from PIL import Image, TiffImagePlugin, TiffTags
+
+from python.imageGraphics.imageBuffers import (
+    is_path, pixel_bytes, decoded_bytes, resize_image, ImageTooLarge, IMAGE_MEMORY_LIMIT, REDUCING_GAP
+)
+
+# Input formats that can be processed in strips
+STRIP_FORMATS = ("PNG", "TIFF")
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Samples per pixel of each PNG color type (grayscale, RGB, palette, gray+alpha, RGBA)
+PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+# Chunks before IDAT that affect decoding or the decoded image's info
+PNG_HEADER_CHUNKS = (b"PLTE", b"tRNS", b"gAMA", b"cHRM", b"sRGB", b"iCCP", b"sBIT")
+
+# TIFF tags copied into each band: layout, compression and color interpretation
+TIFF_BAND_TAGS = (
+    256, 257, 258, 259, 262, 266, 277, 278, 284, 317, 320, 322, 323, 338, 339,
+    347, 529, 530, 531, 532,
+)
+TIFF_STRIP_OFFSETS, TIFF_STRIP_BYTE_COUNTS = 273, 279
+TIFF_TILE_OFFSETS, TIFF_TILE_BYTE_COUNTS = 324, 325
+
+# Filter support (in pixels of the smaller image) of the resampling filters
+FILTER_SUPPORT = {
+    Image.NEAREST: 0.5, Image.BOX: 0.5, Image.BILINEAR: 1.0,
+    Image.HAMMING: 1.0, Image.BICUBIC: 2.0, Image.LANCZOS: 3.0,
+}
+
+
+def jpeg_draft_scale(img, size):
+    """DCT scale (1, 2, 4 or 8) resize_image's draft() will decode a JPEG at for size"""
+    if img.format != "JPEG":
+        return 1
+    wanted_width, wanted_height = (max(int(side * REDUCING_GAP), 1) for side in size)
+    scale = min(img.width // wanted_width, img.height // wanted_height)
+    return next((factor for factor in (8, 4, 2, 1) if scale >= factor), 1)
+
+
+def fits_in_memory(img, size=None, memory_limit=None):
+    """
+    True if img can be decoded whole within memory_limit
+
+    Args:
+        img: PIL Image, not yet loaded
+        size: Target size of a downscale (JPEGs are then decoded at a reduced scale)
+        memory_limit: Bytes allowed (default: IMAGE_MEMORY_LIMIT)
+    """
+    memory_limit = memory_limit or IMAGE_MEMORY_LIMIT
+    scale = jpeg_draft_scale(img, size) if size else 1
+    return decoded_bytes(img) / (scale * scale) <= memory_limit
+
+
+def _png_chunk(kind, *parts):
+    """Chunk bytes as a list of pieces, so large bodies are not copied to add the header"""
+    crc = zlib.crc32(kind)
+    for part in parts:
+        crc = zlib.crc32(part, crc)
+    return [struct.pack(">I", sum(len(part) for part in parts)) + kind, *parts, struct.pack(">I", crc)]
+
+
+def _png_stride(width, depth, color_type):
+    """Bytes per filtered row, including the filter type byte"""
+    return 1 + math.ceil(width * PNG_CHANNELS[color_type] * depth / 8)
+
+
+def _png_band(width, depth, color_type, extra_chunks, previous_row, rows):
+    """A stand-alone PNG of filtered rows, optionally preceded by an unfiltered row"""
+    height = len(rows) // _png_stride(width, depth, color_type)
+    # Stored (level 0) deflate: only a container for Pillow's decoder
+    deflate = zlib.compressobj(0)
+    idat = [deflate.compress(b"\x00" + previous_row)] if previous_row is not None else []
+    idat += [deflate.compress(rows), deflate.flush()]
+    if previous_row is not None:
+        height += 1
+    header = struct.pack(">IIBBBBB", width, height, depth, color_type, 0, 0, 0)
+    return b"".join([
+        PNG_SIGNATURE, *_png_chunk(b"IHDR", header), extra_chunks,
+        *_png_chunk(b"IDAT", *idat), *_png_chunk(b"IEND"),
+    ])
+
+
+def iter_png_bands(fp, rows):
+    """
+    Decode a PNG in bands of `rows` rows
+
+    Args:
+        fp: Seekable binary file positioned anywhere
+        rows: Rows per band
+
+    Yields:
+        Decoded bands (PIL Images) from top to bottom
+
+    Raises:
+        ImageTooLarge: If the PNG is interlaced or 16 bits per sample, or
+            grayscale at 2 or 4 bits
+    """
+    fp.seek(0)
+    if fp.read(8) != PNG_SIGNATURE:
+        raise ValueError("Not a PNG file")
+    width = depth = color_type = stride = None
+    extra_chunks = b""
+    inflater = zlib.decompressobj()
+    pending = bytearray()
+    previous_row = None
+
+    def band(data):
+        nonlocal previous_row
+        decoded = Image.open(io.BytesIO(_png_band(width, depth, color_type, extra_chunks, previous_row, data)))
+        decoded.load()
+        if previous_row is not None:
+            decoded = decoded.crop((0, 1, decoded.width, decoded.height))
+        # The next band's first row may be filtered against this band's last one
+        last = decoded.crop((0, decoded.height - 1, width, decoded.height))
+        previous_row = last.tobytes("raw", f"P;{depth}") if color_type == 3 and depth < 8 else last.tobytes()
+        return decoded
+
+    while True:
+        length, kind = struct.unpack(">I4s", fp.read(8))
+        body = fp.read(length)
+        fp.read(4)
+        if kind == b"IHDR":
+            width, _, depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", body)
+            # Depths whose rows Pillow can write back unfiltered: 8 bits, packed palettes, bilevel
+            packable = depth == 8 or (color_type == 3 and depth in (1, 2, 4)) or (color_type == 0 and depth == 1)
+            if interlace or color_type not in PNG_CHANNELS or not packable:
+                raise ImageTooLarge("Interlaced, 16-bit and 2/4-bit grayscale PNGs cannot be processed in strips")
+            stride = _png_stride(width, depth, color_type)
+        elif kind in PNG_HEADER_CHUNKS:
+            extra_chunks += b"".join(_png_chunk(kind, body))
+        elif kind == b"IDAT":
+            band_bytes = stride * rows
+            data = body
+            while data:
+                # Bounded inflate, so one huge IDAT never expands all at once
+                pending += inflater.decompress(data, band_bytes)
+                data = inflater.unconsumed_tail
+                while len(pending) >= band_bytes:
+                    with memoryview(pending) as view:
+                        decoded = band(view[:band_bytes])
+                    del pending[:band_bytes]
+                    yield decoded
+        elif kind == b"IEND" or not kind:
+            break
+    pending += inflater.flush()
+    usable = len(pending) - len(pending) % stride
+    if usable:
+        with memoryview(pending) as view:
+            decoded = band(view[:usable])
+        yield decoded
+
+
+def _tiff_band(prefix, tags, height, pieces, offsets_tag, counts_tag):
+    """A stand-alone TIFF with a copy of the directory tags and the given strips/tiles"""
+    ifd = TiffImagePlugin.ImageFileDirectory_v2(prefix=prefix)
+    for tag in TIFF_BAND_TAGS:
+        if tag in tags:
+            ifd[tag] = tags[tag]
+            ifd.tagtype[tag] = tags.tagtype[tag]
+    ifd[257] = height
+    ifd.tagtype[257] = TiffTags.LONG
+    endian = "<" if prefix == b"II" else ">"
+    header = prefix + (b"*\x00" if prefix == b"II" else b"\x00*") + struct.pack(endian + "I", 8)
+
+    relative = []
+    position = 0
+    for piece in pieces:
+        relative.append(position)
+        position += len(piece)
+    ifd[counts_tag] = tuple(len(piece) for piece in pieces)
+    ifd[offsets_tag] = tuple(relative)
+    ifd.tagtype[offsets_tag] = ifd.tagtype[counts_tag] = TiffTags.LONG
+    # tobytes() moves strip offsets past the directory itself; tile offsets
+    # need a second layout once the directory's length is known
+    directory = ifd.tobytes(8)
+    if offsets_tag == TIFF_TILE_OFFSETS:
+        ifd[offsets_tag] = tuple(len(header) + len(directory) + offset for offset in relative)
+        directory = ifd.tobytes(8)
+    return b"".join([header, directory] + list(pieces))
+
+
+def iter_tiff_bands(fp, img, rows):
+    """
+    Decode the first frame of a TIFF in bands of about `rows` rows
+
+    Compressed images are split at strip (or tile row) boundaries, so a band
+    holds at least one strip; uncompressed ones are split at any row. Strips
+    more than twice `rows` tall are refused before anything is read.
+
+    Args:
+        fp: Seekable binary file of the TIFF
+        img: The TIFF opened with Pillow (only its header is used)
+        rows: Rows per band
+
+    Yields:
+        Decoded bands (PIL Images) from top to bottom
+
+    Raises:
+        ImageTooLarge: If the layout cannot be split into bands that fit
+    """
+    fp.seek(0)
+    magic = fp.read(4)
+    prefix = magic[:2]
+    if magic[2:] in (b"+\x00", b"\x00+"):
+        raise ImageTooLarge("BigTIFF images cannot be processed in strips")
+    tags = img.tag_v2
+    if tags.get(284, 1) != 1:
+        raise ImageTooLarge("Planar TIFF images cannot be processed in strips")
+    width, height = img.size
+
+    def read(offset, count):
+        fp.seek(offset)
+        return fp.read(count)
+
+    if TIFF_TILE_OFFSETS in tags:
+        tile_width, tile_height = tags[322], tags[323]
+        offsets, counts = tags[TIFF_TILE_OFFSETS], tags[TIFF_TILE_BYTE_COUNTS]
+        across = math.ceil(width / tile_width)
+        if tile_height > 2 * rows:
+            raise ImageTooLarge("TIFF tiles are too tall to process within the memory limit")
+        tile_rows = max(rows // tile_height, 1)
+        for first in range(0, math.ceil(height / tile_height), tile_rows):
+            top = first * tile_height
+            band_height = min(tile_rows * tile_height, height - top)
+            count = math.ceil(band_height / tile_height) * across
+            pieces = [read(offsets[i], counts[i]) for i in range(first * across, first * across + count)]
+            yield _decode_tiff(prefix, tags, band_height, pieces, TIFF_TILE_OFFSETS, TIFF_TILE_BYTE_COUNTS)
+        return
+
+    offsets, counts = tags[TIFF_STRIP_OFFSETS], tags[TIFF_STRIP_BYTE_COUNTS]
+    rows_per_strip = min(tags.get(278, height), height)
+    if tags.get(259, 1) == 1:
+        # Uncompressed: row y is at a fixed position inside its strip
+        samples = tags.get(277, 1)
+        bits = tags.get(258, (8,))
+        bits = bits[0] if isinstance(bits, tuple) else bits
+        row_bytes = math.ceil(width * samples * bits / 8)
+        for top in range(0, height, rows):
+            band_height = min(rows, height - top)
+            data = bytearray()
+            y = top
+            while y < top + band_height:
+                strip, within = divmod(y, rows_per_strip)
+                take = min(rows_per_strip - within, top + band_height - y)
+                data += read(offsets[strip] + within * row_bytes, take * row_bytes)
+                y += take
+            band_tags = {**{tag: tags[tag] for tag in TIFF_BAND_TAGS if tag in tags}, 278: band_height}
+            yield _decode_tiff(prefix, _Tags(band_tags, tags.tagtype), band_height, [bytes(data)],
+                               TIFF_STRIP_OFFSETS, TIFF_STRIP_BYTE_COUNTS)
+        return
+
+    if rows_per_strip > 2 * rows:
+        raise ImageTooLarge("TIFF strips are too tall to process within the memory limit")
+    strips = max(rows // rows_per_strip, 1)
+    for first in range(0, len(offsets), strips):
+        top = first * rows_per_strip
+        if top >= height:
+            break
+        band_height = min(strips * rows_per_strip, height - top)
+        last = min(first + strips, len(offsets))
+        pieces = [read(offsets[i], counts[i]) for i in range(first, last)]
+        yield _decode_tiff(prefix, tags, band_height, pieces, TIFF_STRIP_OFFSETS, TIFF_STRIP_BYTE_COUNTS)
+
+
+class _Tags(dict):
+    """Tag values with the type table of the directory they came from"""
+
+    def __init__(self, values, tagtype):
+        super().__init__(values)
+        self.tagtype = tagtype
+
+
+def _decode_tiff(prefix, tags, height, pieces, offsets_tag, counts_tag):
+    band = Image.open(io.BytesIO(_tiff_band(prefix, tags, height, pieces, offsets_tag, counts_tag)))
+    band.load()
+    return band
+
+
+def iter_bands(source, img, rows):
+    """Decode a PNG or TIFF in bands of about `rows` rows (see iter_png_bands/iter_tiff_bands)"""
+    if is_path(source):
+        with open(source, "rb") as fp:
+            yield from iter_bands(fp, img, rows)
+        return
+    fp = io.BytesIO(source) if isinstance(source, (bytes, bytearray, memoryview)) else source
+    if img.format == "PNG":
+        yield from iter_png_bands(fp, rows)
+    elif img.format == "TIFF":
+        yield from iter_tiff_bands(fp, img, rows)
+    else:
+        raise ImageTooLarge(f"{img.format} images cannot be processed in strips")
+
+
+def _stack(top, bottom):
+    if top is None:
+        return bottom
+    stacked = Image.new(bottom.mode, (bottom.width, top.height + bottom.height))
+    stacked.paste(top, (0, 0))
+    stacked.paste(bottom, (0, top.height))
+    return stacked
+
+
+def resize_in_strips(source, img, size, memory_limit=None, resample=Image.LANCZOS):
+    """
+    Downscale a PNG or TIFF too large to decode whole
+
+    Bands of source rows are decoded one after another, box-reduced by the
+    same integer factor resize_image() would use, and kept in a window just
+    tall enough to resample each band of output rows (plus the filter
+    support above and below it). Bands are sized so the band being decoded,
+    its copies and the window together stay within memory_limit.
+
+    Args:
+        source: Path to the image, its bytes, or a seekable binary file-like object
+        img: The same image opened with Pillow, not yet loaded
+        size: Target (width, height), smaller than the image
+        memory_limit: Bytes to stay within (default: IMAGE_MEMORY_LIMIT)
+        resample: Filter of the final pass (default: LANCZOS)
+
+    Returns:
+        The resized image
+
+    Raises:
+        ImageTooLarge: If the format or its layout cannot be read in bands
+            small enough for memory_limit
+    """
+    memory_limit = memory_limit or IMAGE_MEMORY_LIMIT
+    if img.format not in STRIP_FORMATS:
+        raise ImageTooLarge(f"{img.format} images this large cannot be decoded within the memory limit")
+    width, height = size
+    factor_x = max(int(img.width / width / REDUCING_GAP), 1)
+    factor_y = max(int(img.height / height / REDUCING_GAP), 1)
+
+    row_bytes = img.width * pixel_bytes(img.mode)
+    # A band, its reduced copy, the window and the band it is stacked onto
+    rows = max(memory_limit // 8 // row_bytes, 1)
+    rows = max(rows // factor_y, 1) * factor_y
+    reduced_width = math.ceil(img.width / factor_x)
+    reduced_height = math.ceil(img.height / factor_y)
+    scale = reduced_height / height
+    margin = math.ceil(FILTER_SUPPORT.get(resample, 3.0) * max(scale, 1.0)) + 1
+    band_rows = max(int(rows / factor_y / scale), 1)
+
+    bands = iter_bands(source, img, rows)
+    output = None
+    window, window_top = None, 0  # reduced rows held, and the reduced row index of the first one
+    carry = None  # source rows not yet reduced (fewer than factor_y)
+    read_rows = 0  # source rows decoded so far
+    for top in range(0, height, band_rows):
+        bottom = min(top + band_rows, height)
+        needed_from = max(math.floor(top * scale) - margin, 0)
+        needed_to = min(math.ceil(bottom * scale) + margin, reduced_height)
+
+        while window_top + (window.height if window else 0) < needed_to:
+            band = next(bands, None)
+            if band is None:
+                raise ValueError("Image data ended before its last row")
+            if band.mode == "P":
+                # Resampling needs colors, not palette indices
+                band = band.convert("RGBA" if "transparency" in band.info else "RGB")
+            elif band.mode == "1":
+                band = band.convert("L")
+            read_rows += band.height
+            pending = _stack(carry, band)
+            usable = pending.height if read_rows >= img.height else pending.height - pending.height % factor_y
+            carry = pending.crop((0, usable, pending.width, pending.height)) if usable < pending.height else None
+            if usable:
+                chunk = pending.crop((0, 0, pending.width, usable)) if usable < pending.height else pending
+                if factor_x > 1 or factor_y > 1:
+                    try:
+                        chunk = chunk.reduce((factor_x, factor_y))
+                    except ValueError:
+                        raise ImageTooLarge(f"{chunk.mode} images cannot be processed in strips")
+                window = _stack(window, chunk)
+
+        if needed_from > window_top:
+            window = window.crop((0, needed_from - window_top, window.width, window.height))
+            window_top = needed_from
+        if output is None:
+            output = Image.new(window.mode, size)
+        part = window.resize((width, bottom - top), resample,
+                             box=(0, top * scale - window_top, reduced_width, bottom * scale - window_top))
+        output.paste(part, (0, top))
+
+    output.info.update(img.info)
+    return output
+
+
+def resize_within_memory(source, img, size=None, memory_limit=None):
+    """
+    resize_image(img, size), or img itself without a size, keeping the
+    decode within memory_limit
+
+    Args:
+        source: The image's path, bytes or seekable file-like object (re-read in strip mode)
+        img: The image opened from source with Pillow, not yet loaded
+        size: Target (width, height), or None to keep the size
+        memory_limit: Bytes a decode may use (default: IMAGE_MEMORY_LIMIT)
+
+    Raises:
+        ImageTooLarge: If a whole decode would exceed memory_limit and this
+            is not a downscale of a PNG or TIFF, which is done in strips
+    """
+    if fits_in_memory(img, size, memory_limit):
+        # Draft decoding and reduce() make large downscales cheap
+        return resize_image(img, size) if size else img
+    if not size or size[0] >= img.width or size[1] >= img.height:
+        raise ImageTooLarge(f"{img.width}x{img.height} image is too large to decode within the memory limit")
+    return resize_in_strips(source, img, size, memory_limit)
@@ -1,6 +1,7 @@
 import qrcode
 from PIL import Image, ImageDraw
 import os
+from python.imageGraphics.imageBuffers import is_path, open_image, encode_image
 
 def normalize_color(c: str) -> str:
     # If the string is already a valid color name or starts with '#', return as is
@@ -14,14 +15,14 @@ def normalize_color(c: str) -> str:
 
 def generate_qr(data, filename=None, logo=None, color="black", bg_color=None, 
                 transparent=False, border_style=None, border_width=4, border_color=None,
-                box_size=10, rounded=False, quiet_zone=4):
+                box_size=10, rounded=False, quiet_zone=4, as_bytes=False):
     """
     Generate a customized QR code
     
     Args:
         data: The text or URL to encode
         filename: Output filename (optional)
-        logo: Path to logo image (optional)
+        logo: Path to logo image, or its bytes / a binary file object (optional)
         color: QR code color (default: black)
         bg_color: Background color (default: white or transparent)
         transparent: Make background transparent (default: False)
@@ -31,6 +32,7 @@ def generate_qr(data, filename=None, logo=None, color="black", bg_color=None,
         box_size: Size of each QR code box in pixels (default: 10)
         rounded: Use rounded corners for QR code modules (default: False)
         quiet_zone: Size of quiet zone around QR code (default: 4)
+        as_bytes: Return the PNG as bytes instead of writing a file (default: False)
     """
     # Set default filename if none provided
     if not filename:
@@ -101,10 +103,10 @@ def generate_qr(data, filename=None, logo=None, color="black", bg_color=None,
             qr_img = qr_img.convert('RGBA')
     
     # Add logo if provided
-    if logo and os.path.exists(logo):
+    if logo and (not is_path(logo) or os.path.exists(logo)):
         try:
             # Open logo image
-            logo_img = Image.open(logo)
+            logo_img = open_image(logo)
             
             # Get QR code dimensions
             qr_width, qr_height = qr_img.size
@@ -182,6 +184,10 @@ def generate_qr(data, filename=None, logo=None, color="black", bg_color=None,
         
         qr_img = bordered_img
     
+    # Return the encoded QR code without touching disk
+    if as_bytes:
+        return encode_image(qr_img, "PNG")
+    
     # Save QR code
     qr_img.save(filename)
     print(f"QR code created successfully: {filename}")
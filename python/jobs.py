@@ -0,0 +1,678 @@
+"""
+Background Jobs
+---------------
+Runs long tools (background removal, PDF compression, large merges, AI image
+generation) outside the HTTP request. Submitting returns a job id at once, a
+worker runs the existing service function through python/executor.py, and
+clients poll GET /jobs/{id} or follow GET /jobs/{id}/events (Server-Sent
+Events) until the result can be downloaded.
+
+Service functions that accept a ``progress`` keyword argument get a callback
+progress(done, total) which publishes progress events and raises
+JobCancelled once the job is cancelled, so cancellation takes effect at the
+next progress step. Other functions are cancelled before they start, or
+their result is discarded when they finish.
+
+Brokers hold the job table and the queue of pending jobs:
+    memory   in this process (default)
+    sqlite   in a local SQLite file, shared by every server process on the
+             host and kept across restarts
+
+Configuration (environment):
+    UTILIX_JOB_BROKER     memory | sqlite (default: memory)
+    UTILIX_JOB_DB         database file of the sqlite broker (default: .cache/jobs.sqlite3)
+    UTILIX_JOB_WORKERS    jobs run concurrently by each server process (default: 4)
+    UTILIX_JOB_TTL        seconds a finished job and its result are kept (default: 3600)
+"""
+import asyncio
+import inspect
+import json
+import mimetypes
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional
+
+from python.artifact_store import artifact_store
+from python.executor import run_cpu, run_io, run_model
+from python.metrics import registry
+
+JOB_BROKER = os.getenv("UTILIX_JOB_BROKER", "memory")
+JOB_DB = os.getenv("UTILIX_JOB_DB", os.path.join(os.getcwd(), ".cache", "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("UTILIX_JOB_WORKERS", "4"))
+JOB_TTL = float(os.getenv("UTILIX_JOB_TTL", "3600"))
+
+# How often running jobs heartbeat and check for cancellation, in seconds
+POLL_INTERVAL = 1.0
+# Running jobs without a heartbeat for this long belonged to a stopped server
+HEARTBEAT_TIMEOUT = 30.0
+PRUNE_INTERVAL = 60.0
+KEEPALIVE_INTERVAL = 15.0
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+STATUSES = (QUEUED, RUNNING) + FINISHED
+
+Job = Dict[str, Any]
+
+
+class JobCancelled(Exception):
+    """Raised from a service function's progress callback once its job is cancelled."""
+
+
+def run_job_task(func: Callable[..., Any], params: Dict[str, Any], job_id: str, progress_queue, cancel_event) -> Any:
+    """
+    Worker-side entry point: call a service function for a job.
+
+    Runs in the process pool (or the thread pool), so it only receives
+    picklable objects: the function, its keyword arguments, and the queue /
+    event pair shared with the server process.
+    """
+    if cancel_event.is_set():
+        raise JobCancelled()
+
+    def progress(done, total=None, message=None):
+        if cancel_event.is_set():
+            raise JobCancelled()
+        progress_queue.put((job_id, done, total, message))
+
+    target = func.resolve() if hasattr(func, "resolve") else func
+    if "progress" in inspect.signature(target).parameters:
+        return target(**params, progress=progress)
+    return target(**params)
+
+
+class JobKind:
+    """A service function that can be submitted as a job."""
+
+    __slots__ = ("name", "function", "pool", "media_type")
+
+    def __init__(self, name: str, function: Callable[..., Any], pool: str, media_type: str):
+        self.name = name
+        self.function = function
+        self.pool = pool
+        self.media_type = media_type
+
+
+def _apply(job: Job, fields: Dict[str, Any]) -> Job:
+    """Update a job record and bump its version so event streams see the change."""
+    job.update(fields)
+    job["version"] = job.get("version", 0) + 1
+    return job
+
+
+class InProcessBroker:
+    """Job table and FIFO queue held in this process (the default broker)."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+
+    def _pending(self) -> asyncio.Queue:
+        # Created on first use so it belongs to the server's event loop
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        return self._queue
+
+    async def enqueue(self, job: Job) -> None:
+        self._jobs[job["id"]] = job
+        await self._pending().put(job["id"])
+
+    async def claim(self) -> Job:
+        """Wait for the next queued job and mark it running."""
+        while True:
+            job = self._jobs.get(await self._pending().get())
+            if job is not None and job["status"] == QUEUED:
+                now = time.time()
+                return _apply(job, {"status": RUNNING, "started_at": now, "heartbeat": now})
+
+    async def load(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def update(self, job_id: str, **fields: Any) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        return _apply(job, fields) if job is not None else None
+
+    async def touch(self, job_id: str) -> Optional[Job]:
+        """Record a heartbeat without notifying event streams."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job["heartbeat"] = time.time()
+        return job
+
+    async def delete(self, job_id: str) -> None:
+        self._jobs.pop(job_id, None)
+
+    async def find(self, statuses: Iterable[str], before: float, field: str) -> List[Job]:
+        """Jobs in one of the statuses whose timestamp field is older than before."""
+        statuses = set(statuses)
+        return [job for job in list(self._jobs.values())
+                if job["status"] in statuses and (job.get(field) or 0) <= before]
+
+    def counts(self) -> Dict[str, int]:
+        counts = dict.fromkeys(STATUSES, 0)
+        for job in list(self._jobs.values()):
+            counts[job["status"]] += 1
+        return counts
+
+
+class SQLiteBroker:
+    """
+    Job table and queue in a local SQLite database.
+
+    Several server processes can share one database: a queued job is
+    claimed by exactly one of them, and status, progress and cancellation
+    are visible to all. Jobs also survive a server restart.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = JOB_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._wakeup: Optional[asyncio.Event] = None
+        with closing(self._connect()) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS jobs ("
+                       "id TEXT PRIMARY KEY, status TEXT NOT NULL, created_at REAL NOT NULL, data TEXT NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def _write(self, db: sqlite3.Connection, job: Job) -> None:
+        db.execute("INSERT OR REPLACE INTO jobs (id, status, created_at, data) VALUES (?, ?, ?, ?)",
+                   (job["id"], job["status"], job["created_at"], json.dumps(job)))
+
+    def _insert(self, job: Job) -> None:
+        with closing(self._connect()) as db:
+            self._write(db, job)
+
+    def _claim(self) -> Optional[Job]:
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT data FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                             (QUEUED,)).fetchone()
+            job = None
+            if row is not None:
+                now = time.time()
+                job = _apply(json.loads(row[0]), {"status": RUNNING, "started_at": now, "heartbeat": now})
+                self._write(db, job)
+            db.execute("COMMIT")
+            return job
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+
+    def _load(self, job_id: str) -> Optional[Job]:
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _update(self, job_id: str, fields: Dict[str, Any], bump: bool) -> Optional[Job]:
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            job = None
+            if row is not None:
+                job = json.loads(row[0])
+                if bump:
+                    _apply(job, fields)
+                else:
+                    job.update(fields)
+                self._write(db, job)
+            db.execute("COMMIT")
+            return job
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+
+    def _delete(self, job_id: str) -> None:
+        with closing(self._connect()) as db:
+            db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def _find(self, statuses: List[str], before: float, field: str) -> List[Job]:
+        marks = ",".join("?" * len(statuses))
+        with closing(self._connect()) as db:
+            rows = db.execute(f"SELECT data FROM jobs WHERE status IN ({marks})", statuses).fetchall()
+        jobs = [json.loads(row[0]) for row in rows]
+        return [job for job in jobs if (job.get(field) or 0) <= before]
+
+    async def enqueue(self, job: Job) -> None:
+        await run_io(self._insert, job)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def claim(self) -> Job:
+        """Poll for the next queued job (submitted by any process) and mark it running."""
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        while True:
+            self._wakeup.clear()
+            job = await run_io(self._claim)
+            if job is not None:
+                return job
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def load(self, job_id: str) -> Optional[Job]:
+        return await run_io(self._load, job_id)
+
+    async def update(self, job_id: str, **fields: Any) -> Optional[Job]:
+        return await run_io(self._update, job_id, fields, True)
+
+    async def touch(self, job_id: str) -> Optional[Job]:
+        return await run_io(self._update, job_id, {"heartbeat": time.time()}, False)
+
+    async def delete(self, job_id: str) -> None:
+        await run_io(self._delete, job_id)
+
+    async def find(self, statuses: Iterable[str], before: float, field: str) -> List[Job]:
+        return await run_io(self._find, list(statuses), before, field)
+
+    def counts(self) -> Dict[str, int]:
+        counts = dict.fromkeys(STATUSES, 0)
+        with closing(self._connect()) as db:
+            for status, count in db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+                counts[status] = count
+        return counts
+
+
+BROKERS = {"memory": InProcessBroker, "sqlite": SQLiteBroker}
+
+
+def make_broker(name: str = JOB_BROKER):
+    """Create the broker named by UTILIX_JOB_BROKER."""
+    try:
+        return BROKERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown job broker '{name}'. Use one of: {', '.join(BROKERS)}")
+
+
+class _ThreadChannel:
+    """Progress channel for jobs running in the thread pool."""
+
+    def __init__(self, manager: "JobManager"):
+        self.manager = manager
+
+    def put(self, item) -> None:
+        self.manager._publish(item)
+
+
+def _remove_artifact(path: Optional[str]) -> None:
+    """Delete a job's file or directory now, whether or not it is tracked yet."""
+    if not path:
+        return
+    try:
+        # A lease held by an active download defers the delete until it ends
+        artifact_store.acquire(path)
+        artifact_store.release(path, delete=True)
+    except ValueError:
+        # Outside the managed roots; nothing of ours to delete
+        pass
+
+
+def job_view(job: Job) -> Dict[str, Any]:
+    """Public representation of a job (internal paths and parameters removed)."""
+    result = job.get("result")
+    return {
+        "id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": job.get("progress"),
+        "error": job.get("error"),
+        "cancel_requested": job.get("cancel_requested", False),
+        "created_at": job["created_at"],
+        "started_at": job.get("started_at"),
+        "finished_at": job.get("finished_at"),
+        "expires_at": job.get("expires_at"),
+        "result": {k: result[k] for k in ("filename", "media_type", "size")} if result else None,
+    }
+
+
+class JobManager:
+    """Submits, runs, tracks, cancels and expires jobs."""
+
+    def __init__(self, broker=None, workers: int = JOB_WORKERS, ttl: float = JOB_TTL):
+        self.broker = broker or make_broker()
+        self.workers = max(workers, 1)
+        self.ttl = ttl
+        self.kinds: Dict[str, JobKind] = {}
+        self.counters = {"submitted": 0, "succeeded": 0, "failed": 0, "cancelled": 0, "expired": 0}
+        self._tasks: List[asyncio.Task] = []
+        self._cancel_events: Dict[str, Any] = {}
+        self._changed = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._mp_manager = None
+        self._progress_queue = None
+        self._pump: Optional[threading.Thread] = None
+        self._mp_lock = threading.Lock()
+
+    def register_kind(self, name: str, function: Callable[..., Any], pool: str = "cpu",
+                      media_type: str = "application/octet-stream") -> None:
+        """
+        Make a service function available as a job.
+
+        Args:
+            name: Job kind, e.g. "compress-pdf"
+            function: Module-level (or lazy) function called with the job's parameters
+            pool: "cpu" for the process pool, "model" for the model inference
+                pool, "io" for the thread pool
+            media_type: Content type of the result when it cannot be guessed from its name
+        """
+        if pool not in ("cpu", "model", "io"):
+            raise ValueError("pool must be 'cpu', 'model' or 'io'")
+        self.kinds[name] = JobKind(name, function, pool, media_type)
+
+    # -- lifecycle ---------------------------------------------------------
+
+    async def start(self) -> None:
+        """Start the worker and pruning tasks; called from the FastAPI lifespan."""
+        self._loop = asyncio.get_running_loop()
+        await self.prune()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._pruner()))
+
+    async def stop(self) -> None:
+        """Stop workers and signal running jobs to cancel."""
+        for event in list(self._cancel_events.values()):
+            event.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        with self._mp_lock:
+            if self._progress_queue is not None:
+                try:
+                    self._progress_queue.put(None)
+                except Exception:
+                    pass
+            if self._mp_manager is not None:
+                self._mp_manager.shutdown()
+            self._mp_manager = self._progress_queue = None
+
+    # -- public API ---------------------------------------------------------
+
+    async def submit(self, kind: str, params: Dict[str, Any], cleanup: Iterable[str] = (),
+                     job_id: Optional[str] = None) -> Job:
+        """
+        Queue a job.
+
+        Args:
+            kind: A name passed to register_kind()
+            params: Keyword arguments for the service function (JSON-serializable)
+            cleanup: Paths (e.g. uploaded inputs) deleted once the job finishes
+            job_id: Id to use, for callers that name files after the job first
+
+        Returns:
+            The queued job record
+        """
+        if kind not in self.kinds:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        job = {
+            "id": job_id or uuid.uuid4().hex,
+            "kind": kind,
+            "status": QUEUED,
+            "params": params,
+            "cleanup": list(cleanup),
+            "progress": None,
+            "error": None,
+            "result": None,
+            "cancel_requested": False,
+            "created_at": time.time(),
+            "version": 0,
+        }
+        await self.broker.enqueue(job)
+        self.counters["submitted"] += 1
+        self._notify()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        """Return a job record, or None if it is unknown or has expired."""
+        job = await self.broker.load(job_id)
+        if job is None or (job.get("expires_at") and job["expires_at"] <= time.time()):
+            return None
+        return job
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancel a queued or running job.
+
+        Queued jobs are cancelled at once; running jobs stop at their next
+        progress step (or when the function returns, whose result is then
+        discarded). Finished jobs are returned unchanged.
+        """
+        job = await self.get(job_id)
+        if job is None or job["status"] in FINISHED:
+            return job
+        if job["status"] == QUEUED:
+            job = await self._finish(job, CANCELLED, error="Cancelled before it started")
+        else:
+            job = await self.broker.update(job_id, cancel_requested=True)
+            event = self._cancel_events.get(job_id)
+            if event is not None:
+                event.set()
+        self._notify()
+        return job
+
+    async def events(self, job_id: str) -> AsyncIterator[str]:
+        """
+        Server-Sent Events for one job: a "queued" or "progress" event on
+        every change and a final event named after the end status.
+        """
+        version = None
+        last_sent = time.monotonic()
+        while True:
+            changed = self._changed
+            job = await self.get(job_id)
+            if job is None:
+                yield self._event("error", {"detail": "Job not found or expired"})
+                return
+            if job.get("version") != version:
+                version = job.get("version")
+                status = job["status"]
+                name = status if status in FINISHED else ("progress" if status == RUNNING else QUEUED)
+                yield self._event(name, job_view(job))
+                last_sent = time.monotonic()
+                if status in FINISHED:
+                    return
+            elif time.monotonic() - last_sent >= KEEPALIVE_INTERVAL:
+                # Comment line; keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+            try:
+                await asyncio.wait_for(changed.wait(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def prune(self) -> int:
+        """Delete expired jobs with their results, and fail jobs lost with a stopped server."""
+        now = time.time()
+        for job in await self.broker.find([RUNNING], now - HEARTBEAT_TIMEOUT, "heartbeat"):
+            if job["id"] not in self._cancel_events:
+                await self._finish(job, FAILED, error="Interrupted: the server running this job stopped")
+        expired = await self.broker.find(FINISHED, now, "expires_at")
+        for job in expired:
+            await run_io(_remove_artifact, (job.get("result") or {}).get("path"))
+            await self.broker.delete(job["id"])
+            self.counters["expired"] += 1
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"broker": self.broker.name, "workers": self.workers, "ttl": self.ttl,
+                "jobs": self.broker.counts(), **self.counters}
+
+    def gauges(self):
+        """Job counts per status, for the metrics registry (blocking: the sqlite broker queries its database)."""
+        for status, count in self.broker.counts().items():
+            yield "utilix_jobs", {"status": status}, count
+
+    # -- internals ------------------------------------------------------------
+
+    @staticmethod
+    def _event(name: str, data: Dict[str, Any]) -> str:
+        return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+    def _notify(self) -> None:
+        """Wake every event stream waiting for a change."""
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def _publish(self, item) -> None:
+        """Hand a progress report from a worker thread to the event loop."""
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._record_progress(*item), self._loop)
+
+    async def _record_progress(self, job_id: str, done, total, message) -> None:
+        await self.broker.update(job_id, progress={"done": done, "total": total, "message": message})
+        self._notify()
+
+    def _ensure_mp_channel(self):
+        """Start the multiprocessing manager that relays progress from pool processes."""
+        with self._mp_lock:
+            if self._mp_manager is None:
+                self._mp_manager = multiprocessing.get_context("spawn").Manager()
+                self._progress_queue = self._mp_manager.Queue()
+                self._pump = threading.Thread(target=self._pump_progress, args=(self._progress_queue,),
+                                              name="utilix-job-progress", daemon=True)
+                self._pump.start()
+            return self._mp_manager, self._progress_queue
+
+    def _pump_progress(self, progress_queue) -> None:
+        while True:
+            try:
+                item = progress_queue.get()
+            except (EOFError, OSError):
+                return
+            if item is None:
+                return
+            self._publish(item)
+
+    async def _channels(self, pool: str):
+        """Return the (progress queue, cancel event) pair for a job in the given pool."""
+        if pool == "io":
+            return _ThreadChannel(self), threading.Event()
+        mp_manager, progress_queue = await run_io(self._ensure_mp_channel)
+        return progress_queue, await run_io(mp_manager.Event)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self.broker.claim()
+            self._notify()
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Job {job['id']} crashed: {e}")
+                await self._finish(job, FAILED, error=str(e))
+
+    async def _pruner(self) -> None:
+        while True:
+            await asyncio.sleep(PRUNE_INTERVAL)
+            try:
+                await self.prune()
+            except Exception as e:
+                print(f"Job pruning failed: {e}")
+
+    async def _run(self, job: Job) -> None:
+        kind = self.kinds.get(job["kind"])
+        if kind is None:
+            await self._finish(job, FAILED, error=f"Unknown job kind '{job['kind']}'")
+            return
+
+        progress_queue, cancel_event = await self._channels(kind.pool)
+        self._cancel_events[job["id"]] = cancel_event
+        run = {"cpu": run_cpu, "model": run_model}.get(kind.pool, run_io)
+        future = asyncio.ensure_future(
+            run(run_job_task, kind.function, job["params"], job["id"], progress_queue, cancel_event)
+        )
+        try:
+            while not future.done():
+                await asyncio.wait({future}, timeout=POLL_INTERVAL)
+                current = await self.broker.touch(job["id"])
+                if current is not None and current.get("cancel_requested"):
+                    cancel_event.set()
+                if cancel_event.is_set() and not future.done():
+                    # The function has no progress hook to stop at; let it
+                    # finish in the background and throw its output away
+                    future.add_done_callback(lambda f: self._discard(f, job))
+                    await self._finish(job, CANCELLED, error="Cancelled while running")
+                    return
+            try:
+                result = future.result()
+            except JobCancelled:
+                await self._finish(job, CANCELLED, error="Cancelled while running")
+                return
+            except Exception as e:
+                await self._finish(job, FAILED, error=str(e) or type(e).__name__)
+                return
+            path = self._result_path(job, result)
+            if cancel_event.is_set():
+                await run_io(_remove_artifact, path)
+                await self._finish(job, CANCELLED, error="Cancelled while running")
+            elif path is None:
+                await self._finish(job, FAILED, error="The tool produced no result")
+            else:
+                await self._finish(job, SUCCEEDED, result_path=path, media_type=kind.media_type)
+        finally:
+            self._cancel_events.pop(job["id"], None)
+
+    @staticmethod
+    def _result_path(job: Job, result: Any) -> Optional[str]:
+        """The file a job produced: its return value if that is a path, else its output_path."""
+        for candidate in (result, job["params"].get("output_path")):
+            if isinstance(candidate, str) and os.path.isfile(candidate):
+                return candidate
+        return None
+
+    def _discard(self, future: asyncio.Future, job: Job) -> None:
+        if future.cancelled() or future.exception() is not None:
+            return
+        path = self._result_path(job, future.result())
+        if path is not None:
+            asyncio.ensure_future(run_io(_remove_artifact, path))
+
+    async def _finish(self, job: Job, status: str, error: Optional[str] = None,
+                      result_path: Optional[str] = None, media_type: Optional[str] = None) -> Optional[Job]:
+        now = time.time()
+        result = None
+        if result_path is not None:
+            filename = os.path.basename(result_path)
+            result = {
+                "path": result_path,
+                "filename": filename,
+                "media_type": mimetypes.guess_type(filename)[0] or media_type,
+                "size": os.path.getsize(result_path),
+            }
+            try:
+                # Keep the file exactly as long as the job record
+                artifact_store.register(result_path, ttl=self.ttl)
+            except ValueError:
+                pass
+        for path in job.get("cleanup", []):
+            await run_io(_remove_artifact, path)
+        updated = await self.broker.update(job["id"], status=status, error=error, result=result,
+                                           finished_at=now, expires_at=now + self.ttl)
+        self.counters[status] += 1
+        self._notify()
+        return updated
+
+
+# Process-wide manager used by fastapi_server.py; started in the lifespan
+job_manager = JobManager()
+registry.register_gauge_source(job_manager.gauges)
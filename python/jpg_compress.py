@@ -1,24 +1,67 @@
 from PIL import Image
 import os
+from python.imageGraphics.imageBuffers import (
+    open_image, encode_to_target, save_or_encode, check_pixel_budget, MAX_IMAGE_PIXELS
+)
+from python.imageGraphics.imageTiles import resize_within_memory
+from python.imageGraphics.imageQuality import quality_metrics, describe_metrics
 
-def compress_jpg(input_path, output_path, quality=60, resize_factor=1.0):
+def compress_jpg(input_path, output_path=None, quality=60, resize_factor=1.0, target_bytes=None,
+                 as_bytes=False, metrics=False):
     """
     Compress a JPG image by reducing quality and size.
 
     Args:
-        input_path: Path to the input JPG file
-        output_path: Path to save compressed image
-        quality: JPEG quality (1–95)
+        input_path: Path to the input JPG file, or its bytes / a binary file-like object
+        output_path: Path to save compressed image (not needed with as_bytes)
+        quality: JPEG quality (1–95); the highest quality tried with target_bytes
         resize_factor: Scale down image size (e.g. 0.5 = 50%)
+        target_bytes: Maximum file size; quality is searched in memory and the
+            image downscaled further if needed (optional)
+        as_bytes: Return the compressed image as bytes instead of writing a file
+        metrics: Also measure SSIM and PSNR of the output against the
+            (resized) image that was encoded (see quality_metrics)
+
+    Returns:
+        The compressed bytes when as_bytes is set; otherwise, with target_bytes,
+        the chosen quality, size and scale (see encode_to_target). With
+        metrics, (that result, metrics dict)
     """
-    img = Image.open(input_path)
+    img = open_image(input_path, MAX_IMAGE_PIXELS)
+    check_pixel_budget(img)
 
+    new_size = None
     if resize_factor < 1.0:
         new_size = (int(img.width * resize_factor), int(img.height * resize_factor))
-        img = img.resize(new_size, resample=Image.Resampling.LANCZOS)
+    # Downscales PNG/TIFF inputs too large to decode whole in strips, rejects others
+    img = resize_within_memory(input_path, img, new_size)
+
+    if img.mode not in ("RGB", "L", "CMYK"):
+        img = img.convert("RGB")
+
+    if target_bytes:
+        data, info = encode_to_target(img, "JPEG", target_bytes, max_quality=quality, optimize=True)
+        result = data if as_bytes else info
+        if not as_bytes:
+            with open(output_path, "wb") as f:
+                f.write(data)
+            print(f"✅ Compressed image saved as: {output_path} (quality {info['quality']}, {info['bytes']} bytes)")
+    else:
+        # Measuring needs the encoded bytes, so the file is written from memory
+        data = save_or_encode(img, output_path, "JPEG", as_bytes or metrics, quality=quality, optimize=True)
+        result = data if as_bytes else None
+        if not as_bytes:
+            if metrics:
+                with open(output_path, "wb") as f:
+                    f.write(data)
+            print(f"✅ Compressed image saved as: {output_path}")
 
-    img.save(output_path, "JPEG", quality=quality, optimize=True)
-    print(f"✅ Compressed image saved as: {output_path}")
+    if metrics:
+        measured = quality_metrics(img, data)
+        if not as_bytes:
+            print(f"Quality: {describe_metrics(measured)}")
+        return result, measured
+    return result
 
 # Example usage
 if __name__ == "__main__":
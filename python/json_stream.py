@@ -0,0 +1,117 @@
+"""
+Incremental JSON Parser
+-----------------------
+Consumes an LLM response chunk by chunk and reports every object in the
+first (outermost) JSON array as soon as its closing brace arrives, so a list
+of recommendations can be shown one item at a time while the model is still
+writing the rest. Objects nested deeper inside those items are not reported
+separately.
+
+Text before the first '{' or '[' (such as a ```json fence) is skipped, and
+parsing stops at the end of the first top-level value.
+
+    parser = JsonItemStream()
+    for chunk in chunks:
+        for item in parser.feed(chunk):
+            ...
+    document = parser.result()
+"""
+import ast
+import json
+from typing import Any, List, Optional, Tuple
+
+
+class JsonItemStream:
+    """Tracks nesting and string state across chunks of a JSON document."""
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._start: Optional[int] = None
+        self._end: Optional[int] = None
+        # Open containers as (bracket, start offset)
+        self._stack: List[Tuple[str, int]] = []
+        # Offset of the array whose elements are reported
+        self._items_array: Optional[int] = None
+        self._in_string = False
+        self._escape = False
+
+    @property
+    def done(self) -> bool:
+        """True once the top-level value has been closed."""
+        return self._end is not None
+
+    def feed(self, chunk: str) -> List[Any]:
+        """
+        Add the next chunk of text.
+
+        Returns:
+            The item objects completed by this chunk, in order
+        """
+        self.text += chunk
+        items = []
+        text = self.text
+        i = self._pos
+        while i < len(text) and self._end is None:
+            c = text[i]
+            if self._start is None:
+                if c in "{[":
+                    self._start = i
+                    if c == "[":
+                        self._items_array = i
+                    self._stack.append((c, i))
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+            elif c == '"':
+                self._in_string = True
+            elif c in "{[":
+                if c == "[" and self._items_array is None:
+                    self._items_array = i
+                self._stack.append((c, i))
+            elif c in "}]" and self._stack:
+                bracket, begin = self._stack.pop()
+                if not self._stack:
+                    self._end = i + 1
+                elif c == "}" and self._stack[-1][1] == self._items_array:
+                    try:
+                        items.append(json.loads(text[begin:i + 1]))
+                    except ValueError:
+                        # Not strict JSON; it still appears in result()
+                        pass
+            i += 1
+        self._pos = i
+        return items
+
+    def result(self) -> Any:
+        """
+        Parse the complete top-level value.
+
+        Falls back to Python literal syntax (single quotes, True/None), which
+        models sometimes emit instead of JSON.
+
+        Raises:
+            ValueError: If no complete value was received or it cannot be parsed
+        """
+        if self._start is None:
+            raise ValueError("No JSON value in response")
+        document = self.text[self._start:self._end] if self._end else self.text[self._start:]
+        try:
+            return json.loads(document)
+        except ValueError:
+            pass
+        try:
+            return ast.literal_eval(document)
+        except (ValueError, SyntaxError) as e:
+            raise ValueError(f"Invalid JSON response: {e}")
+
+
+def parse_json_response(text: str) -> Any:
+    """Parse a complete LLM response (fences and surrounding text are ignored)."""
+    parser = JsonItemStream()
+    parser.feed(text)
+    return parser.result()
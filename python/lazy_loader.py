@@ -0,0 +1,87 @@
+"""
+Lazy Tool Loader
+----------------
+Defers importing tool modules (and their heavy dependencies such as
+carvekit/torch, google-genai, Faker, PyPDF2 or python-barcode) until a
+function from them is first called, and records how long each import took.
+
+    remove_background = lazy("python.imageGraphics.bgRemover", "remove_background")
+
+LazyFunction objects pickle by module and attribute name, so they can be
+sent to the process pool and are imported inside the worker that runs them.
+
+Modules listed in UTILIX_WARMUP_MODULES (comma-separated) are imported at
+startup instead, for endpoints whose first request must not pay the cost.
+"""
+import importlib
+import os
+import sys
+import time
+from typing import Any, Dict, Iterable, List
+
+WARMUP_MODULES = [m.strip() for m in os.getenv("UTILIX_WARMUP_MODULES", "").split(",") if m.strip()]
+
+# Seconds spent importing each module through this loader, in load order
+IMPORT_TIMES: Dict[str, float] = {}
+
+
+def load_module(name: str):
+    """Import a module, timing the import the first time it happens."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    # importlib serializes concurrent imports of the same module itself
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    IMPORT_TIMES.setdefault(name, time.perf_counter() - start)
+    return module
+
+
+class LazyFunction:
+    """Stand-in for a module-level function that imports its module on first call."""
+
+    __slots__ = ("module", "name")
+
+    def __init__(self, module: str, name: str):
+        self.module = module
+        self.name = name
+
+    @property
+    def __name__(self) -> str:
+        return self.name
+
+    def resolve(self):
+        """Import the module (if needed) and return the real function."""
+        return getattr(load_module(self.module), self.name)
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self.resolve()(*args, **kwargs)
+
+    def __reduce__(self):
+        return (LazyFunction, (self.module, self.name))
+
+    def __repr__(self) -> str:
+        return f"<lazy {self.module}.{self.name}>"
+
+
+def lazy(module: str, *names: str):
+    """Return one LazyFunction per name (a single object if one name is given)."""
+    functions = tuple(LazyFunction(module, name) for name in names)
+    return functions[0] if len(functions) == 1 else functions
+
+
+def warm_up(modules: Iterable[str] = WARMUP_MODULES) -> None:
+    """Import the given modules now; failures are reported, not raised."""
+    for name in modules:
+        try:
+            load_module(name)
+        except Exception as e:
+            print(f"Warm-up import of {name} failed: {e}")
+
+
+def import_report() -> List[Dict[str, Any]]:
+    """Import time per lazily loaded module, slowest first."""
+    return [
+        {"module": name, "seconds": round(seconds, 4)}
+        for name, seconds in sorted(IMPORT_TIMES.items(), key=lambda item: item[1], reverse=True)
+    ]
@@ -1,51 +1,49 @@
-import os
-from google import genai
 from google.genai import types
-from dotenv import load_dotenv
+from python.llm_gateway import generate_text, generate_text_async, stream_text_async
+from python.llm_cache import llm_cache
+from python.json_stream import parse_json_response
 
-load_dotenv()
+CACHE_NAMESPACE = "web-preview"
+SYSTEM_PROMPT = "systemprompt1.txt"
 
-def generate(user_query: str):
-    client = genai.Client(
-        api_key=os.getenv("GEMINI_API_KEY"),
-    )
-
-    model = "gemini-2.0-flash"
-
-    contents = [
-        types.Content(
-            role="user",
-            parts=[
-                types.Part.from_text(text=user_query),
-            ],
-        ),
-    ]
-    tools = [
-        types.Tool(google_search=types.GoogleSearch())
-    ]
-
-    # Read the system prompt from external file
-    with open("python/systemprompt1.txt", "r", encoding="utf-8") as sp:
-        system_prompt_text = sp.read()
-
-    generate_content_config = types.GenerateContentConfig(
+def request_options():
+    return dict(
+        system_prompt=SYSTEM_PROMPT,
         temperature=2,
         top_p=0.95,
         top_k=40,
         max_output_tokens=8192,
-        tools=tools,
+        tools=[types.Tool(google_search=types.GoogleSearch())],
         response_mime_type="text/plain",
-        system_instruction=[
-            types.Part.from_text(text=system_prompt_text)
-        ],
     )
 
-    response_text = ""
-    for chunk in client.models.generate_content_stream(
-        model=model,
-        contents=contents,
-        config=generate_content_config,
-    ):
-        response_text += chunk.text
+def generate(user_query: str):
+    # Shared client and cached system prompt from the LLM gateway
+    return generate_text(user_query, **request_options())
+
+async def generate_async(user_query: str):
+    """Same request as generate(), awaited on the event loop."""
+    return await generate_text_async(user_query, **request_options())
+
+async def generate_cached(user_query: str):
+    """
+    generate_async() behind the LLM response cache: repeated (normalized)
+    queries are answered from the cache and concurrent identical ones share
+    a single upstream call. Only responses that parse as JSON are cached.
+    """
+    return await llm_cache.get_or_compute(
+        CACHE_NAMESPACE, user_query, SYSTEM_PROMPT,
+        lambda: generate_async(user_query), validate=parse_json_response
+    )
 
-    return response_text
\ No newline at end of file
+async def stream_async(user_query: str):
+    """Same request as generate(), yielding text pieces as they arrive."""
+    cached = llm_cache.lookup(CACHE_NAMESPACE, user_query, SYSTEM_PROMPT)
+    if cached is not None:
+        yield cached
+        return
+    pieces = []
+    async for piece in stream_text_async(user_query, **request_options()):
+        pieces.append(piece)
+        yield piece
+    llm_cache.store(CACHE_NAMESPACE, user_query, "".join(pieces), SYSTEM_PROMPT, validate=parse_json_response)
@@ -0,0 +1,227 @@
+"""
+LLM Response Cache
+------------------
+Caches Gemini responses for the tool finder and web preview. Queries that
+differ only in case, whitespace or punctuation share one entry, and the key
+also covers a hash of the system prompt, so editing a prompt file retires
+the answers produced with the old one.
+
+Concurrent identical queries are coalesced (singleflight): the first caller
+starts the upstream request and the others await its result. The request
+runs as its own task, so a caller that goes away (its client disconnected)
+cancels only its own wait, never the answer the others are waiting for.
+
+Entries expire after a TTL, the least recently used ones are evicted past
+the size limit, and the cache is saved to a JSON file so it survives
+restarts.
+
+Configuration (environment):
+    UTILIX_LLM_CACHE_TTL       seconds an answer stays valid (default: 86400)
+    UTILIX_LLM_CACHE_ENTRIES   maximum number of cached answers (default: 2000)
+    UTILIX_LLM_CACHE_FILE      persistence file (default: .cache/llm_cache.json)
+    UTILIX_LLM_CACHE_FLUSH     seconds between saves of a changed cache (default: 60)
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from python.executor import run_io
+
+LLM_CACHE_TTL = float(os.getenv("UTILIX_LLM_CACHE_TTL", "86400"))
+LLM_CACHE_ENTRIES = int(os.getenv("UTILIX_LLM_CACHE_ENTRIES", "2000"))
+LLM_CACHE_FILE = os.getenv("UTILIX_LLM_CACHE_FILE", os.path.join(os.getcwd(), ".cache", "llm_cache.json"))
+LLM_CACHE_FLUSH = float(os.getenv("UTILIX_LLM_CACHE_FLUSH", "60"))
+
+_PUNCTUATION = re.compile(r"[^\w\s]", re.UNICODE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Lower-case, drop punctuation and collapse whitespace."""
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", query.casefold())).strip()
+
+
+def prompt_hash(system_prompt: Optional[str]) -> str:
+    """Short hash of a system prompt file's current text."""
+    if not system_prompt:
+        return "-"
+    # Imported here so loading this module does not pull in google-genai
+    from python.llm_gateway import load_prompt
+    return hashlib.sha256(load_prompt(system_prompt).encode("utf-8")).hexdigest()[:16]
+
+
+class LLMCache:
+    """TTL + LRU cache of response texts with singleflight and JSON persistence."""
+
+    def __init__(self, path: str = LLM_CACHE_FILE, ttl: float = LLM_CACHE_TTL,
+                 max_entries: int = LLM_CACHE_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # key -> (expires_at, value)
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0, "sets": 0, "evictions": 0, "expired": 0}
+        self.load()
+
+    def key(self, namespace: str, query: str, system_prompt: Optional[str] = None) -> str:
+        material = f"{namespace}\0{prompt_hash(system_prompt)}\0{normalize_query(query)}"
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                self.counters["expired"] += 1
+                self._dirty = True
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            self.counters["sets"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+            self._dirty = True
+
+    def lookup(self, namespace: str, query: str, system_prompt: Optional[str] = None) -> Optional[str]:
+        """Return a cached answer, counting the hit or miss."""
+        value = self._get(self.key(namespace, query, system_prompt))
+        with self._lock:
+            self.counters["hits" if value is not None else "misses"] += 1
+        return value
+
+    def store(self, namespace: str, query: str, value: str, system_prompt: Optional[str] = None,
+              validate: Optional[Callable[[str], Any]] = None) -> bool:
+        """Cache an answer unless validate(value) raises. Returns True if stored."""
+        if validate is not None:
+            try:
+                validate(value)
+            except Exception:
+                return False
+        self._set(self.key(namespace, query, system_prompt), value)
+        return True
+
+    async def get_or_compute(self, namespace: str, query: str, system_prompt: Optional[str],
+                             compute: Callable[[], Awaitable[str]],
+                             validate: Optional[Callable[[str], Any]] = None) -> str:
+        """
+        Return the cached answer for a query, calling compute() at most once
+        for all concurrent callers on a miss.
+
+        Args:
+            namespace: Feature name, keeps e.g. tool finder and web preview apart
+            query: User query (normalized for the key)
+            system_prompt: Prompt file name; its content hash is part of the key
+            compute: Coroutine function producing the answer upstream
+            validate: Called with a fresh answer; if it raises, the answer is
+                not cached and the error is raised to every waiting caller
+        """
+        key = self.key(namespace, query, system_prompt)
+        value = self._get(key)
+        if value is not None:
+            with self._lock:
+                self.counters["hits"] += 1
+            return value
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            with self._lock:
+                self.counters["coalesced"] += 1
+            return await asyncio.shield(pending)
+
+        with self._lock:
+            self.counters["misses"] += 1
+        task = asyncio.ensure_future(self._compute(key, compute, validate))
+        # Retrieve the outcome so a failure nobody awaits any more is not logged
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._inflight[key] = task
+        # Shielded like the waiters: cancelling this caller leaves the task running
+        return await asyncio.shield(task)
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[str]],
+                       validate: Optional[Callable[[str], Any]]) -> str:
+        """Upstream call of a coalesced miss; caches the answer even if its first caller left."""
+        try:
+            value = await compute()
+            if validate is not None:
+                validate(value)
+            self._set(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def load(self) -> None:
+        """Read unexpired entries from the persistence file, if any."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable LLM cache file {self.path}: {e}")
+            return
+        now = time.time()
+        with self._lock:
+            # Saved oldest first, so LRU order is restored
+            for key, (expires_at, value) in saved.items():
+                if expires_at > now:
+                    self._entries[key] = (expires_at, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def save(self) -> None:
+        """Write the cache to its file atomically, if it changed since the last save."""
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = dict(self._entries)
+            self._dirty = False
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saving LLM cache: {e}")
+            with self._lock:
+                self._dirty = True
+
+    async def run_flusher(self, interval: float = LLM_CACHE_FLUSH) -> None:
+        """Save periodically; started as a task from the FastAPI lifespan."""
+        while True:
+            await asyncio.sleep(interval)
+            await run_io(self.save)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            served = self.counters["hits"] + self.counters["coalesced"]
+            lookups = served + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "in_flight": len(self._inflight),
+            }
+
+
+# Process-wide cache used by python/llm.py and python/llm1.py
+llm_cache = LLMCache()
@@ -0,0 +1,147 @@
+"""
+LLM Gateway
+-----------
+Single entry point for Gemini calls. Every AI feature (tool finder, web
+preview, palette suggestions, image generation) shares one process-wide
+google-genai client, so HTTP connections and TLS sessions are reused instead
+of being set up again for every request.
+
+System prompts are read once and kept in memory; a prompt file is re-read
+only when its modification time changes, so edits still apply without a
+restart.
+
+    text = generate_text("query", system_prompt="systemprompt.txt", temperature=2)
+    text = await generate_text_async("query", system_prompt="systemprompt.txt")
+    async for piece in stream_text_async("query", system_prompt="systemprompt.txt"): ...
+
+Configuration (environment):
+    GEMINI_API_KEY     API key (also read from a .env file)
+    GEMINI_MODEL       default model (default: gemini-2.0-flash)
+    GEMINI_BASE_URL    send requests to this server instead of the Gemini API,
+                       e.g. the stand-in in python/benchmarks/gemini_standin.py
+"""
+import os
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
+
+from dotenv import load_dotenv
+from google import genai
+from google.genai import types
+
+load_dotenv()
+
+DEFAULT_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+BASE_URL = os.getenv("GEMINI_BASE_URL")
+# Relative prompt names are resolved against this directory
+PROMPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+Contents = Union[str, List[types.Content]]
+
+_client: Optional[genai.Client] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> genai.Client:
+    """Return the shared Gemini client, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            if BASE_URL:
+                # A stand-in server does not check the key, but the SDK requires one
+                _client = genai.Client(api_key=os.getenv("GEMINI_API_KEY") or "stand-in",
+                                       http_options=types.HttpOptions(base_url=BASE_URL))
+            else:
+                _client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+        return _client
+
+
+class PromptCache:
+    """In-memory copies of prompt files, refreshed when a file's mtime changes."""
+
+    def __init__(self):
+        self._prompts: Dict[str, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> str:
+        mtime = os.stat(path).st_mtime
+        with self._lock:
+            cached = self._prompts.get(path)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        with self._lock:
+            self._prompts[path] = (mtime, text)
+        return text
+
+
+prompt_cache = PromptCache()
+
+
+def load_prompt(name: str) -> str:
+    """Return the text of a system prompt file (absolute, or relative to python/)."""
+    path = name if os.path.isabs(name) else os.path.join(PROMPT_DIR, name)
+    return prompt_cache.get(path)
+
+
+def user_contents(text: str) -> List[types.Content]:
+    """Wrap a plain prompt as a single user turn."""
+    return [types.Content(role="user", parts=[types.Part.from_text(text=text)])]
+
+
+def make_config(system_prompt: Optional[str] = None, **options: Any) -> types.GenerateContentConfig:
+    """
+    Build a request config.
+
+    Args:
+        system_prompt: Prompt file name (see load_prompt), sent as the system instruction
+        **options: Any other GenerateContentConfig field (temperature, tools, ...)
+    """
+    if system_prompt:
+        options["system_instruction"] = [types.Part.from_text(text=load_prompt(system_prompt))]
+    return types.GenerateContentConfig(**options)
+
+
+def _request(contents: Contents, model: Optional[str], system_prompt: Optional[str], options: Dict[str, Any]):
+    if isinstance(contents, str):
+        contents = user_contents(contents)
+    return {"model": model or DEFAULT_MODEL, "contents": contents, "config": make_config(system_prompt, **options)}
+
+
+def stream(contents: Contents, model: Optional[str] = None, system_prompt: Optional[str] = None,
+           **options: Any) -> Iterator[types.GenerateContentResponse]:
+    """Stream response chunks from the shared client."""
+    return get_client().models.generate_content_stream(**_request(contents, model, system_prompt, options))
+
+
+def generate_text(contents: Contents, model: Optional[str] = None, system_prompt: Optional[str] = None,
+                  **options: Any) -> str:
+    """
+    Generate a text response (blocking).
+
+    Args:
+        contents: Prompt text, or a list of types.Content turns
+        model: Model name (default: GEMINI_MODEL)
+        system_prompt: Prompt file name used as the system instruction (optional)
+        **options: Extra GenerateContentConfig fields
+
+    Returns:
+        The concatenated response text
+    """
+    return "".join(chunk.text or "" for chunk in stream(contents, model, system_prompt, **options))
+
+
+async def generate_text_async(contents: Contents, model: Optional[str] = None,
+                              system_prompt: Optional[str] = None, **options: Any) -> str:
+    """Non-blocking variant of generate_text for use on the event loop."""
+    response = await get_client().aio.models.generate_content(**_request(contents, model, system_prompt, options))
+    return response.text or ""
+
+
+async def stream_text_async(contents: Contents, model: Optional[str] = None,
+                            system_prompt: Optional[str] = None, **options: Any) -> AsyncIterator[str]:
+    """Yield response text pieces as the model produces them."""
+    chunks = await get_client().aio.models.generate_content_stream(**_request(contents, model, system_prompt, options))
+    async for chunk in chunks:
+        if chunk.text:
+            yield chunk.text
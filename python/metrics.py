@@ -0,0 +1,249 @@
+"""
+Request & Service Metrics
+-------------------------
+Per-route latency, throughput, byte counts, in-flight requests and errors,
+plus timings of the service functions run through python/executor.py, all
+rendered in the Prometheus text exposition format for GET /metrics.
+
+Request time is split into three parts so slow endpoints can be diagnosed:
+    utilix_request_body_seconds      receiving the request body (uploads)
+    utilix_service_seconds           running the tool function in a pool
+    utilix_response_send_seconds     sending the response body
+"""
+import bisect
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUANTILES = (0.5, 0.95, 0.99)
+# Recent observations kept per series for quantile estimates
+RESERVOIR_SIZE = 2048
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a sliding window for quantiles."""
+
+    __slots__ = ("counts", "total", "count", "recent")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+        self.recent.append(value)
+
+    def quantile(self, q: float) -> float:
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class MetricsRegistry:
+    """Holds every counter, gauge and histogram exported on /metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.gauges: Dict[str, Dict[Labels, float]] = {}
+        self.help: Dict[str, str] = {}
+        self._gauge_sources: List[Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]] = []
+
+    @staticmethod
+    def _labels(labels: Dict[str, str]) -> Labels:
+        return tuple(sorted(labels.items()))
+
+    def observe(self, name: str, value: float, help: str = "", **labels: str) -> None:
+        with self._lock:
+            self.help.setdefault(name, help)
+            series = self.histograms.setdefault(name, {})
+            key = self._labels(labels)
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1, help: str = "", **labels: str) -> None:
+        with self._lock:
+            self.help.setdefault(name, help)
+            series = self.counters.setdefault(name, {})
+            key = self._labels(labels)
+            series[key] = series.get(key, 0) + amount
+
+    def add_gauge(self, name: str, amount: float, help: str = "", **labels: str) -> None:
+        with self._lock:
+            self.help.setdefault(name, help)
+            series = self.gauges.setdefault(name, {})
+            key = self._labels(labels)
+            series[key] = series.get(key, 0) + amount
+
+    def register_gauge_source(self, source: Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]) -> None:
+        """
+        Add a callable polled at scrape time.
+
+        It must yield (metric_name, labels, value) tuples, e.g. queue depths
+        owned by another module.
+        """
+        self._gauge_sources.append(source)
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text format (version 0.0.4).
+
+        Gauge sources may block (the sqlite job broker queries its database),
+        so call this off the event loop, e.g. through run_io.
+        """
+        lines: List[str] = []
+
+        def fmt(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+            pairs = list(labels) + ([extra] if extra else [])
+            if not pairs:
+                return ""
+            escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+        def header(name: str, kind: str) -> None:
+            if self.help.get(name):
+                lines.append(f"# HELP {name} {self.help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        # Poll gauge sources before taking the lock: some query a database
+        # (job counts), and observe() on the event loop must not wait for them
+        polled: Dict[str, Dict[Labels, float]] = {}
+        for source in self._gauge_sources:
+            try:
+                for name, labels, value in source():
+                    polled.setdefault(name, {})[self._labels(labels)] = value
+            except Exception as e:
+                print(f"Metrics gauge source failed: {e}")
+
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                header(name, "counter")
+                for labels, value in series.items():
+                    lines.append(f"{name}{fmt(labels)} {value}")
+
+            gauges = {name: dict(series) for name, series in self.gauges.items()}
+            for name, series in polled.items():
+                gauges.setdefault(name, {}).update(series)
+            for name, series in sorted(gauges.items()):
+                header(name, "gauge")
+                for labels, value in series.items():
+                    lines.append(f"{name}{fmt(labels)} {value}")
+
+            for name, series in sorted(self.histograms.items()):
+                header(name, "histogram")
+                for labels, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{fmt(labels, ('le', str(bound)))} {cumulative}")
+                    lines.append(f"{name}_bucket{fmt(labels, ('le', '+Inf'))} {histogram.count}")
+                    lines.append(f"{name}_sum{fmt(labels)} {histogram.total}")
+                    lines.append(f"{name}_count{fmt(labels)} {histogram.count}")
+
+                # Quantiles over the most recent observations of each series
+                quantile_name = f"{name}_quantile"
+                lines.append(f"# HELP {quantile_name} p50/p95/p99 of the last {RESERVOIR_SIZE} observations")
+                lines.append(f"# TYPE {quantile_name} gauge")
+                for labels, histogram in series.items():
+                    for q in QUANTILES:
+                        lines.append(f"{quantile_name}{fmt(labels, ('quantile', str(q)))} {histogram.quantile(q)}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry
+registry = MetricsRegistry()
+
+
+def record_service(function: str, pool: str, seconds: float, wait_seconds: float, ok: bool) -> None:
+    """Record one service-function call made through the executor."""
+    registry.observe("utilix_service_seconds", seconds,
+                     "Time spent running service functions in a worker", function=function, pool=pool)
+    registry.observe("utilix_executor_wait_seconds", wait_seconds,
+                     "Queueing and transfer overhead of executor calls", function=function, pool=pool)
+    if not ok:
+        registry.inc("utilix_service_errors_total", 1,
+                     "Service function calls that raised", function=function, pool=pool)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route request metrics.
+
+    Routes are labelled by their path template (e.g. /jobs/{job_id}) so the
+    label set stays bounded; requests that match no route use "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        start = time.perf_counter()
+        status = {"code": 500}
+        sizes = {"request": 0, "response": 0}
+        body_done = {"at": None}
+        send_timing = {"first": None, "last": None}
+
+        async def timed_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                sizes["request"] += len(message.get("body", b""))
+                if not message.get("more_body", False):
+                    body_done["at"] = time.perf_counter()
+            return message
+
+        async def timed_send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                send_timing["first"] = time.perf_counter()
+            elif message["type"] == "http.response.body":
+                sizes["response"] += len(message.get("body", b""))
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                send_timing["last"] = time.perf_counter()
+
+        registry.add_gauge("utilix_requests_in_flight", 1, "Requests currently being handled", method=method)
+        try:
+            await self.app(scope, timed_receive, timed_send)
+        except Exception:
+            status["code"] = 500
+            raise
+        finally:
+            registry.add_gauge("utilix_requests_in_flight", -1, method=method)
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            labels = {"route": path, "method": method}
+            elapsed = time.perf_counter() - start
+
+            registry.observe("utilix_request_duration_seconds", elapsed,
+                             "End-to-end request latency", **labels)
+            registry.inc("utilix_requests_total", 1, "Requests handled",
+                         status=str(status["code"]), **labels)
+            registry.inc("utilix_request_bytes_total", sizes["request"], "Request body bytes received", **labels)
+            registry.inc("utilix_response_bytes_total", sizes["response"], "Response body bytes sent", **labels)
+            if status["code"] >= 500:
+                registry.inc("utilix_request_errors_total", 1, "Requests that failed with a 5xx status", **labels)
+            if body_done["at"] is not None:
+                registry.observe("utilix_request_body_seconds", body_done["at"] - start,
+                                 "Time spent receiving the request body", **labels)
+            if send_timing["first"] is not None and send_timing["last"] is not None:
+                registry.observe("utilix_response_send_seconds", send_timing["last"] - send_timing["first"],
+                                 "Time spent sending the response body", **labels)
@@ -1,16 +1,71 @@
 import fitz  # PyMuPDF
 import os
+from PIL import Image
+from python.imageGraphics.imageQuality import quality_metrics, describe_metrics
 
-def compress_pdf(input_path, output_path, zoom_x=0.5, zoom_y=0.5):
+# Pages compared by the metrics option, spread evenly over the document
+METRICS_PAGES = 5
+
+def _render(page, zoom_x=1.0, zoom_y=1.0):
+    """Render a page to an RGB PIL Image (zoom 1 = 72 dpi)"""
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom_x, zoom_y), alpha=False)
+    return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+def measure_pages(doc, new_doc, zoom_x, zoom_y, pages=METRICS_PAGES):
+    """
+    SSIM and PSNR of compressed pages against the originals
+
+    Both are rendered at 72 dpi (the compressed page scaled back up by
+    1/zoom), so the scores measure the detail lost to the lower resolution.
+
+    Args:
+        doc: Original document
+        new_doc: Compressed document with the same pages
+        zoom_x, zoom_y: Zoom the compressed pages were rendered at
+        pages: Number of pages compared
+
+    Returns:
+        dict with "ssim" and "psnr" of the worst page, "pages" (1-based
+        numbers of the pages compared) and "metrics_ms"
+    """
+    count = len(doc)
+    sample = sorted({round(i * (count - 1) / max(pages - 1, 1)) for i in range(min(pages, count))})
+    scores = []
+    for number in sample:
+        original = _render(doc.load_page(number))
+        compressed = _render(new_doc.load_page(number), 1 / zoom_x, 1 / zoom_y)
+        if compressed.size != original.size:
+            # Off by a pixel from rounding the page size at the lower zoom
+            compressed = compressed.resize(original.size)
+        scores.append(quality_metrics(original, compressed))
+    return {
+        "ssim": min((s["ssim"] for s in scores), default=1.0),
+        "psnr": min((s["psnr"] for s in scores), default=0.0),
+        "pages": [number + 1 for number in sample],
+        "metrics_ms": round(sum(s["metrics_ms"] for s in scores), 1),
+    }
+
+def compress_pdf(input_path, output_path=None, zoom_x=0.5, zoom_y=0.5, progress=None, as_bytes=False,
+                 metrics=False):
     """
     Compress a PDF by rendering and rewriting each page at lower resolution.
     Args:
-        input_path: Original PDF path
-        output_path: Compressed PDF path
+        input_path: Original PDF path, or the PDF's bytes
+        output_path: Compressed PDF path (not needed with as_bytes)
         zoom_x: Horizontal zoom (0.5 = 50% scale)
         zoom_y: Vertical zoom (0.5 = 50% scale)
+        progress: Optional callback, called as progress(pages_done, total_pages)
+        as_bytes: Return the compressed PDF as bytes instead of writing a file
+        metrics: Also compare up to METRICS_PAGES pages with the original
+            (see measure_pages)
+    Returns:
+        The compressed PDF bytes when as_bytes is set. With metrics, (that
+        result, metrics dict)
     """
-    doc = fitz.open(input_path)
+    if isinstance(input_path, (bytes, bytearray, memoryview)):
+        doc = fitz.open(stream=bytes(input_path), filetype="pdf")
+    else:
+        doc = fitz.open(input_path)
     new_doc = fitz.open()
 
     for page_num in range(len(doc)):
@@ -22,9 +77,20 @@ def compress_pdf(input_path, output_path, zoom_x=0.5, zoom_y=0.5):
         img_page.insert_image(rect, pixmap=pix)
 
         new_doc.insert_pdf(img_pdf)
+        if progress:
+            progress(page_num + 1, len(doc))
+
+    measured = measure_pages(doc, new_doc, zoom_x, zoom_y) if metrics else None
 
-    new_doc.save(output_path, deflate=True, clean=True)
-    print(f"✅ Compressed PDF saved as: {output_path}")
+    if as_bytes:
+        result = new_doc.tobytes(deflate=True, clean=True)
+    else:
+        result = None
+        new_doc.save(output_path, deflate=True, clean=True)
+        print(f"✅ Compressed PDF saved as: {output_path}")
+        if measured:
+            print(f"Quality (worst of pages {measured['pages']}): {describe_metrics(measured)}")
+    return (result, measured) if metrics else result
 
 # Example usage
 if __name__ == "__main__":
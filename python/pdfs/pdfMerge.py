@@ -1,15 +1,17 @@
 import os
 from PyPDF2 import PdfMerger
 
-def merge_pdfs(pdf_paths, output_path="merged_output.pdf"):
+def merge_pdfs(pdf_paths, output_path="merged_output.pdf", progress=None):
     merger = PdfMerger()
 
-    for path in pdf_paths:
+    for index, path in enumerate(pdf_paths, 1):
         if os.path.exists(path) and path.endswith(".pdf"):
             print(f"📄 Adding: {path}")
             merger.append(path)
         else:
             print(f"❌ Skipped (invalid or not found): {path}")
+        if progress:
+            progress(index, len(pdf_paths))
 
     if merger.pages:
         merger.write(output_path)
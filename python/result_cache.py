@@ -0,0 +1,215 @@
+"""
+Content-Addressed Result Cache
+------------------------------
+Caches outputs of deterministic generators (QR codes, barcodes, color and
+palette results, JSON/XML/YAML formatting) under a hash of the canonicalized
+request parameters plus any uploaded bytes.
+
+Two tiers:
+    memory  LRU of encoded values, bounded by UTILIX_CACHE_MEMORY_MB (default: 64)
+    disk    files under UTILIX_CACHE_DIR, bounded by UTILIX_CACHE_DISK_MB (default: 512)
+
+Both tiers evict least-recently-used entries once their byte budget is
+exceeded. Setting a budget to 0 disables that tier.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from python.executor import run_io
+
+CACHE_DIR = os.getenv("UTILIX_CACHE_DIR", os.path.join(os.getcwd(), ".cache", "results"))
+CACHE_MEMORY_BYTES = int(float(os.getenv("UTILIX_CACHE_MEMORY_MB", "64")) * 1024 * 1024)
+CACHE_DISK_BYTES = int(float(os.getenv("UTILIX_CACHE_DISK_MB", "512")) * 1024 * 1024)
+
+
+def make_key(namespace: str, params: Dict[str, Any], *blobs: Optional[bytes]) -> str:
+    """
+    Build a cache key from a namespace, request parameters and raw uploads.
+
+    Parameters are serialized as sorted, compact JSON so that key order and
+    formatting never produce different keys for the same request.
+    """
+    digest = hashlib.sha256()
+    digest.update(namespace.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(json.dumps(params, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8"))
+    for blob in blobs:
+        digest.update(b"\0")
+        if blob is not None:
+            digest.update(hashlib.sha256(blob).digest())
+    return f"{namespace}-{digest.hexdigest()}"
+
+
+class ResultCache:
+    """Two-tier (memory + disk) LRU cache of bytes values keyed by make_key()."""
+
+    def __init__(self, disk_dir: str = CACHE_DIR, memory_bytes: int = CACHE_MEMORY_BYTES,
+                 disk_bytes: int = CACHE_DISK_BYTES):
+        self.disk_dir = disk_dir
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_size = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_size = 0
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "sets": 0, "evictions": 0}
+        if self.disk_bytes > 0:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._load_disk_index()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key)
+
+    def _load_disk_index(self) -> None:
+        """Rebuild the disk LRU order from file modification times."""
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            path = os.path.join(self.disk_dir, name)
+            if name.endswith(".tmp"):
+                # Leftover from an interrupted write
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._disk[name] = size
+            self._disk_size += size
+        self._evict_disk()
+
+    def _store_memory(self, key: str, value: bytes) -> None:
+        if len(value) > self.memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old)
+        self._memory[key] = value
+        self._memory_size += len(value)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+            self.counters["evictions"] += 1
+
+    def _evict_disk(self) -> None:
+        while self._disk_size > self.disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            self.counters["evictions"] += 1
+            try:
+                os.remove(self._disk_path(key))
+            except OSError:
+                pass
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached value for key, or None on a miss."""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return value
+            on_disk = key in self._disk
+            if on_disk:
+                self._disk.move_to_end(key)
+
+        if on_disk:
+            path = self._disk_path(key)
+            try:
+                with open(path, "rb") as f:
+                    value = f.read()
+                # Refresh mtime so the LRU order survives a restart
+                os.utime(path, None)
+            except OSError:
+                value = None
+
+        with self._lock:
+            if value is None:
+                if on_disk:
+                    # The file vanished underneath us; forget it
+                    size = self._disk.pop(key, None)
+                    if size is not None:
+                        self._disk_size -= size
+                self.counters["misses"] += 1
+                return None
+            self.counters["disk_hits"] += 1
+            if self.memory_bytes > 0:
+                self._store_memory(key, value)
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        """Store value under key in both tiers."""
+        with self._lock:
+            self.counters["sets"] += 1
+            if self.memory_bytes > 0:
+                self._store_memory(key, value)
+        if self.disk_bytes <= 0 or len(value) > self.disk_bytes:
+            return
+
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error writing cache entry {key}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            old = self._disk.pop(key, None)
+            if old is not None:
+                self._disk_size -= old
+            self._disk[key] = len(value)
+            self._disk_size += len(value)
+            self._evict_disk()
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Optional[bytes]]]) -> Optional[bytes]:
+        """
+        Return the cached value for key, computing and storing it on a miss.
+
+        Disk reads and writes run in the I/O thread pool. A compute result of
+        None is treated as a failure and is not cached.
+        """
+        value = await run_io(self.get, key)
+        if value is not None:
+            return value
+        value = await compute()
+        if value is not None:
+            await run_io(self.set, key, value)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current tier sizes."""
+        with self._lock:
+            hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+            lookups = hits + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_size,
+                "memory_limit_bytes": self.memory_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_size,
+                "disk_limit_bytes": self.disk_bytes,
+                "timestamp": time.time(),
+            }
+
+
+# Process-wide cache used by fastapi_server.py
+result_cache = ResultCache()
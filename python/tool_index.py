@@ -0,0 +1,210 @@
+"""
+Local Tool Index
+----------------
+BM25 search over the AI tool catalog (python/tool_catalog.json), so the AI
+tool finder can answer common lookups without a Gemini round trip. The
+inverted index is built once at startup; a query is answered locally only
+when its best match is confident enough, otherwise /generate2 falls back
+to the LLM.
+
+Fields are weighted (name > tags, category > description) by counting
+their terms several times, and a search can be limited to one category.
+
+Confidence is a tool's score divided by the best score any document could
+reach for the query: BM25 saturates at idf * (k1 + 1) per term however
+often (or in however heavily weighted a field) the term occurs, so a
+single name hit cannot reach 1.0. A match is only answered locally when
+    - its confidence reaches the threshold,
+    - it matches most (more than half) of the query terms, so a query with
+      words the catalog has never seen goes to the LLM, and
+    - it leads the runner-up by at least the margin, so ties between
+      equally good tools go to the LLM instead of being decided arbitrarily.
+
+Configuration (environment):
+    UTILIX_TOOL_CATALOG          catalog file (default: python/tool_catalog.json)
+    UTILIX_TOOL_INDEX_THRESHOLD  minimum confidence for a local answer (default: 0.6)
+    UTILIX_TOOL_INDEX_MARGIN     minimum confidence lead over the runner-up (default: 0.1)
+"""
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+from python.metrics import registry
+
+TOOL_CATALOG = os.getenv("UTILIX_TOOL_CATALOG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tool_catalog.json"))
+TOOL_INDEX_THRESHOLD = float(os.getenv("UTILIX_TOOL_INDEX_THRESHOLD", "0.6"))
+TOOL_INDEX_MARGIN = float(os.getenv("UTILIX_TOOL_INDEX_MARGIN", "0.1"))
+
+# Share of the query terms a local answer must match (strictly more than this)
+MIN_COVERAGE = 0.5
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Times each field's terms are counted
+FIELD_WEIGHTS = {"name": 3, "tags": 2, "category": 2, "description": 1}
+
+# English stop words plus the filler of tool-finder queries ("best AI tool for ...")
+STOP_WORDS = frozenset("""
+    a an and are as at be best by can could do does for from good how i in is it me my
+    need of on or please recommend should some something that the this to tool tools
+    use using want what which with would you your ai app apps free help find online
+    software website site top
+""".split())
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_SUFFIXES = ("ing", "ers", "er", "ed", "es", "s", "e")
+
+
+def stem(word: str) -> str:
+    """Strip one common suffix so "summarizing" and "summarize" share a term."""
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(word) for word in _TOKEN.findall(text.lower()) if word not in STOP_WORDS]
+
+
+class ToolIndex:
+    """Inverted index with BM25 scoring over the catalog entries."""
+
+    def __init__(self, path: str = TOOL_CATALOG, threshold: float = TOOL_INDEX_THRESHOLD,
+                 margin: float = TOOL_INDEX_MARGIN):
+        self.path = path
+        self.threshold = threshold
+        self.margin = margin
+        self.tools: List[Dict[str, Any]] = []
+        # term -> [(tool position, weighted term frequency)]
+        self.postings: Dict[str, List[tuple]] = {}
+        self.lengths: List[float] = []
+        self.avg_length = 1.0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.counters = {"local": 0, "fallback": 0}
+
+    def load(self) -> None:
+        """(Re)build the index from the catalog file."""
+        with open(self.path, "r", encoding="utf-8") as f:
+            tools = json.load(f)
+
+        postings = defaultdict(list)
+        lengths = []
+        for position, tool in enumerate(tools):
+            terms = Counter()
+            for field, weight in FIELD_WEIGHTS.items():
+                value = tool.get(field) or ""
+                if isinstance(value, list):
+                    value = " ".join(value)
+                for term in tokenize(value):
+                    terms[term] += weight
+            for term, frequency in terms.items():
+                postings[term].append((position, frequency))
+            lengths.append(sum(terms.values()))
+
+        with self._lock:
+            self.tools = tools
+            self.postings = dict(postings)
+            self.lengths = lengths
+            self.avg_length = (sum(lengths) / len(lengths)) if lengths else 1.0
+            self._loaded = True
+        print(f"Tool index built: {len(tools)} tools, {len(postings)} terms")
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self.load()
+
+    def idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        n = len(self.tools)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def categories(self) -> List[str]:
+        self._ensure_loaded()
+        return sorted({tool.get("category", "") for tool in self.tools})
+
+    def search(self, query: str, category: Optional[str] = None, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Rank catalog tools for a query.
+
+        Args:
+            query: Free-text query
+            category: Only return tools of this category (optional)
+            limit: Maximum number of results
+
+        Returns:
+            Tool entries with "score", "confidence" and "coverage" (share of
+            the query terms the tool matches) added, best first
+        """
+        self._ensure_loaded()
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        wanted = category.lower() if category else None
+
+        scores: Dict[int, float] = defaultdict(float)
+        matched: Dict[int, int] = defaultdict(int)
+        ideal = 0.0
+        for term in terms:
+            idf = self.idf(term)
+            # The most a term can add: the BM25 limit as its frequency grows
+            ideal += idf * (K1 + 1)
+            for position, frequency in self.postings.get(term, ()):
+                if wanted and self.tools[position].get("category", "").lower() != wanted:
+                    continue
+                norm = K1 * (1 - B + B * self.lengths[position] / self.avg_length)
+                scores[position] += idf * frequency * (K1 + 1) / (frequency + norm)
+                matched[position] += 1
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [
+            {**self.tools[position], "score": round(score, 4),
+             "confidence": round(min(score / ideal, 1.0), 4) if ideal else 0.0,
+             "coverage": round(matched[position] / len(terms), 4)}
+            for position, score in ranked
+        ]
+
+    def best_match(self, query: str, category: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Return the top tool if it is a confident, clear answer, else None (the
+        caller should ask the LLM): its confidence must reach the threshold,
+        it must match most query terms and lead the runner-up by the margin.
+        Outcomes are counted for stats().
+        """
+        results = self.search(query, category, limit=2)
+        match = None
+        if results:
+            top = results[0]
+            runner_up = results[1]["confidence"] if len(results) > 1 else 0.0
+            if (top["confidence"] >= self.threshold and top["coverage"] > MIN_COVERAGE
+                    and top["confidence"] - runner_up >= self.margin):
+                match = top
+        outcome = "local" if match else "fallback"
+        with self._lock:
+            self.counters[outcome] += 1
+        registry.inc("utilix_tool_index_queries_total", 1,
+                     "Tool finder queries answered locally or sent to the LLM", outcome=outcome)
+        return match
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            answered = self.counters["local"] + self.counters["fallback"]
+            return {
+                **self.counters,
+                "local_rate": round(self.counters["local"] / answered, 4) if answered else 0.0,
+                "tools": len(self.tools),
+                "terms": len(self.postings),
+                "threshold": self.threshold,
+                "margin": self.margin,
+            }
+
+
+# Process-wide index used by /generate2, built in the FastAPI lifespan
+tool_index = ToolIndex()
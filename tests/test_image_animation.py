@@ -0,0 +1,31 @@
+"""Animated GIF/WebP conversion keeps every frame and its transparency."""
+import io
+
+import pytest
+from PIL import Image
+
+from python.imageGraphics.imageConvertor import convert_image
+
+
+def transparent_gif():
+    """Three frames of a red square moving over a transparent background."""
+    frames = []
+    for index in range(3):
+        frame = Image.new("RGBA", (40, 40), (0, 0, 0, 0))
+        frame.paste((255, 0, 0, 255), (index * 10, 0, index * 10 + 10, 10))
+        frames.append(frame)
+    buffer = io.BytesIO()
+    frames[0].save(buffer, "GIF", save_all=True, append_images=frames[1:], duration=100, loop=0, disposal=2)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("output_format", ["WEBP", "GIF"])
+def test_transparent_pixels_stay_transparent(output_format):
+    converted = Image.open(io.BytesIO(convert_image(transparent_gif(), output_format=output_format, as_bytes=True)))
+    assert converted.n_frames == 3
+    for index in range(3):
+        converted.seek(index)
+        frame = converted.convert("RGBA")
+        assert frame.getpixel((39, 39))[3] == 0
+        red, _, _, alpha = frame.getpixel((index * 10 + 5, 5))
+        assert red > 200 and alpha == 255
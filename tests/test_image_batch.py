@@ -0,0 +1,57 @@
+"""Incremental batch conversion and its manifest."""
+import os
+
+import numpy as np
+from PIL import Image
+
+from python.imageGraphics.imageBatch import convert_directory, load_manifest, MANIFEST_NAME
+
+
+def make_sources(directory):
+    """A flat image (encodes losslessly enough for SSIM 1.0) and two noisy ones."""
+    Image.new("RGB", (64, 64), (200, 120, 40)).save(directory / "a.png")
+    noise = np.random.default_rng(0).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+    Image.fromarray(noise).save(directory / "m.png")
+    Image.fromarray(noise[::-1]).save(directory / "z.png")
+
+
+def run(directory):
+    return convert_directory(str(directory), str(directory / "out"), output_format="WEBP", quality=30,
+                             workers=1, quiet=True, metrics=True)
+
+
+def manifest(directory):
+    return load_manifest(str(directory / "out" / MANIFEST_NAME))
+
+
+def test_unchanged_files_are_skipped(tmp_path):
+    make_sources(tmp_path)
+    assert run(tmp_path)["converted"] == 3
+    summary = run(tmp_path)
+    assert summary["converted"] == 0 and summary["skipped"] == 3
+
+
+def test_touched_file_keeps_its_own_metrics(tmp_path):
+    make_sources(tmp_path)
+    run(tmp_path)
+    before = manifest(tmp_path)
+    assert before["a.png"]["metrics"] != before["z.png"]["metrics"]
+
+    # New mtime, same content: the file is read and hashed but not reconverted
+    stat = os.stat(tmp_path / "a.png")
+    os.utime(tmp_path / "a.png", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    summary = run(tmp_path)
+    assert summary["unchanged"] == 1 and summary["skipped"] == 2
+
+    after = manifest(tmp_path)
+    for name in ("a.png", "m.png", "z.png"):
+        assert after[name]["metrics"] == before[name]["metrics"]
+    assert after["a.png"]["mtime_ns"] == stat.st_mtime_ns + 10 ** 9
+
+
+def test_changed_file_is_reconverted(tmp_path):
+    make_sources(tmp_path)
+    run(tmp_path)
+    Image.new("RGB", (64, 64), (0, 0, 255)).save(tmp_path / "m.png")
+    summary = run(tmp_path)
+    assert summary["converted"] == 1 and summary["skipped"] == 2
@@ -0,0 +1,43 @@
+"""Target-size encoding."""
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from python.imageGraphics.imageBuffers import encode_image, encode_to_target
+
+
+@pytest.fixture(scope="module")
+def photo():
+    rng = np.random.default_rng(2)
+    gradient = np.add.outer(np.arange(256), np.arange(320))[..., None] * 0.4
+    return Image.fromarray(np.clip(gradient + rng.normal(0, 25, (256, 320, 3)), 0, 255).astype(np.uint8))
+
+
+@pytest.mark.parametrize("fmt", ["JPEG", "WEBP"])
+@pytest.mark.parametrize("target_bytes", [20_000, 30_000, 45_000])
+def test_quality_search_fits_under_target(photo, fmt, target_bytes):
+    data, info = encode_to_target(photo.copy(), fmt, target_bytes)
+    assert info["fits"] and info["scale"] == 1.0
+    assert len(data) == info["bytes"] <= target_bytes
+    assert Image.open(io.BytesIO(data)).size == photo.size
+    # The highest quality that fits: one step up would not
+    if info["quality"] < 95:
+        assert len(encode_image(photo.copy(), fmt, quality=info["quality"] + 1)) > target_bytes
+
+
+@pytest.mark.parametrize("fmt", ["JPEG", "WEBP"])
+def test_downscales_when_min_quality_is_too_large(photo, fmt):
+    target_bytes = len(encode_image(photo.copy(), fmt, quality=40)) // 3
+    data, info = encode_to_target(photo.copy(), fmt, target_bytes)
+    assert info["fits"] and info["scale"] < 1.0
+    assert len(data) <= target_bytes
+    assert Image.open(io.BytesIO(data)).size == (info["width"], info["height"])
+
+
+def test_unreachable_target_returns_smallest_attempt(photo):
+    data, info = encode_to_target(photo.copy(), "JPEG", 50)
+    assert not info["fits"]
+    assert min(info["width"], info["height"]) <= 16
+    assert len(data) == info["bytes"] > 50
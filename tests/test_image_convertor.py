@@ -0,0 +1,43 @@
+"""Multi-size variants from a single decode."""
+import io
+
+import pytest
+from PIL import Image
+
+from python.imageGraphics import imageConvertor
+from python.imageGraphics.imageConvertor import convert_variants
+
+
+def jpeg(size):
+    buffer = io.BytesIO()
+    Image.radial_gradient("L").resize(size).convert("RGB").save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def resizes(monkeypatch):
+    """(source size, target size) of every resize convert_variants makes."""
+    calls = []
+    resize_image = imageConvertor.resize_image
+
+    def recording(img, size, *args, **kwargs):
+        calls.append((img.size, tuple(size)))
+        return resize_image(img, size, *args, **kwargs)
+
+    monkeypatch.setattr(imageConvertor, "resize_image", recording)
+    return calls
+
+
+@pytest.mark.parametrize("size", [(4000, 3000), (3000, 4000)])
+def test_jpeg_favicons_are_not_upscaled(resizes, size):
+    manifest, files = convert_variants(jpeg(size), targets=[(100, "WEBP", 80)], favicon=True)
+    assert Image.open(io.BytesIO(files["icon-512.png"])).size == (512, 512)
+    assert {entry["name"] for entry in manifest} >= {"image-100w.webp", "favicon.ico", "icon-512.png"}
+    for source, target in resizes:
+        assert source[0] >= target[0] and source[1] >= target[1], f"{source} upscaled to {target}"
+
+
+def test_jpeg_without_favicons_is_decoded_small(resizes):
+    convert_variants(jpeg((4000, 3000)), targets=[(100, "WEBP", 80)])
+    # Drafted to a DCT scale near the target instead of the full 4000 px
+    assert all(source[0] <= 500 for source, _ in resizes)
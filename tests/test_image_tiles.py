@@ -0,0 +1,63 @@
+"""Strip-mode downscaling matches a whole-image resize."""
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from python.imageGraphics.imageBuffers import ImageTooLarge, open_image, resize_image
+from python.imageGraphics.imageTiles import resize_in_strips, resize_within_memory
+
+# Small enough for dozens of bands on a 600x400 image, large enough for
+# the 64 KB strips Pillow writes in compressed TIFFs
+MEMORY_LIMIT = 512 * 1024
+
+
+def source():
+    rng = np.random.default_rng(1)
+    gradient = np.add.outer(np.arange(400), np.arange(600))[..., None] * 0.2
+    return Image.fromarray(np.clip(gradient + rng.normal(0, 20, (400, 600, 3)), 0, 255).astype(np.uint8))
+
+
+def encode(img, fmt, **options):
+    buffer = io.BytesIO()
+    img.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+CASES = {
+    "png-rgb": lambda img: encode(img, "PNG"),
+    "png-rgba": lambda img: encode(img.convert("RGBA"), "PNG"),
+    "png-l": lambda img: encode(img.convert("L"), "PNG"),
+    "png-palette": lambda img: encode(img.quantize(64), "PNG"),
+    "tiff-raw": lambda img: encode(img, "TIFF"),
+    "tiff-rgba-raw": lambda img: encode(img.convert("RGBA"), "TIFF"),
+    "tiff-lzw": lambda img: encode(img, "TIFF", compression="tiff_lzw"),
+    "tiff-deflate-l": lambda img: encode(img.convert("L"), "TIFF", compression="tiff_adobe_deflate"),
+}
+
+
+@pytest.mark.parametrize("size", [(150, 100), (97, 61), (400, 250)])
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_strips_match_resize_image(case, size):
+    data = CASES[case](source())
+    strips = resize_in_strips(data, open_image(data), size, memory_limit=MEMORY_LIMIT)
+
+    whole = open_image(data)
+    if whole.mode == "P":
+        # Strip mode resamples colors, not palette indices
+        whole = whole.convert("RGB")
+    expected = resize_image(whole, size)
+
+    assert strips.size == size and strips.mode == expected.mode
+    difference = np.abs(np.asarray(strips, dtype=int) - np.asarray(expected, dtype=int))
+    assert difference.max() <= 1
+
+
+def test_resize_within_memory_uses_strips_only_when_needed():
+    data = CASES["png-rgb"](source())
+    img = open_image(data)
+    assert resize_within_memory(data, img, (150, 100), memory_limit=MEMORY_LIMIT).size == (150, 100)
+    # Keeping the full size cannot be done in strips
+    with pytest.raises(ImageTooLarge):
+        resize_within_memory(data, open_image(data), None, memory_limit=MEMORY_LIMIT)
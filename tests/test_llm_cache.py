@@ -0,0 +1,59 @@
+"""Request coalescing in the LLM response cache."""
+import asyncio
+
+import pytest
+
+from python.llm_cache import LLMCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(path=str(tmp_path / "llm_cache.json"))
+
+
+def test_cancelled_leader_does_not_cancel_waiters(cache):
+    async def scenario():
+        calls = 0
+        release = asyncio.Event()
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "answer"
+
+        leader = asyncio.ensure_future(cache.get_or_compute("tools", "pdf", None, compute))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(cache.get_or_compute("tools", "PDF!", None, compute))
+        await asyncio.sleep(0)
+
+        # The leader's client disconnects while the upstream call is running
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await waiter == "answer"
+        assert leader.cancelled()
+        assert calls == 1
+        assert cache.lookup("tools", "pdf") == "answer"
+
+    asyncio.run(scenario())
+
+
+def test_failure_reaches_every_waiter_and_is_not_cached(cache):
+    async def scenario():
+        async def compute():
+            await asyncio.sleep(0.01)
+            return "not json"
+
+        def validate(value):
+            raise ValueError(value)
+
+        results = await asyncio.gather(
+            *(cache.get_or_compute("tools", "pdf", None, compute, validate) for _ in range(3)),
+            return_exceptions=True,
+        )
+        assert all(isinstance(result, ValueError) for result in results)
+        assert cache.lookup("tools", "pdf") is None
+
+    asyncio.run(scenario())
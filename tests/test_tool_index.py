@@ -0,0 +1,39 @@
+"""Regression tests for local tool finder answers on the shipped catalog."""
+import pytest
+
+from python.tool_index import ToolIndex
+
+
+@pytest.fixture(scope="module")
+def index():
+    index = ToolIndex()
+    index.load()
+    return index
+
+
+@pytest.mark.parametrize("query", [
+    # A single name hit ("builder") on an unrelated tool
+    "resume builder",
+    # A video tool outranking the music generator
+    "generate music for my youtube video",
+    # Two equally good tools: a tie is not a confident answer
+    "pdf summarizing",
+])
+def test_ambiguous_or_partial_queries_go_to_the_llm(index, query):
+    assert index.best_match(query) is None
+
+
+@pytest.mark.parametrize("query, name", [
+    ("chat with pdf", "ChatPDF"),
+    ("music generation", "Suno"),
+    ("transcribe audio", "Whisper"),
+])
+def test_clear_queries_are_answered_locally(index, query, name):
+    match = index.best_match(query)
+    assert match is not None and match["name"] == name
+
+
+def test_confidence_is_bounded_by_the_best_possible_score(index):
+    results = index.search("pdf summarizing")
+    assert all(0 < result["confidence"] < 1 for result in results)
+    assert results[0]["confidence"] - results[1]["confidence"] < index.margin